@@ -2,8 +2,12 @@ from django.contrib import admin
 from .models import (
     Articulo, Galpon, Lote, RegistroBajas,
     MovimientoInterno, Entidad, CabeceraTransaccion, DetalleTransaccion,
-    Receta, LogArticulo, RegistroVacunacion
+    Receta, LogArticulo, RegistroVacunacion, EventoPoblacion,
+    OutboxEvento, EstadoOutbox, CurvaEstandar, PerfilPeticion, Granja
 )
+from django.utils import timezone
+from . import transacciones
+from django.utils.html import format_html, format_html_join
 
 class DetalleTransaccionInline(admin.TabularInline):
     model = DetalleTransaccion
@@ -13,6 +17,15 @@ class CabeceraTransaccionAdmin(admin.ModelAdmin):
     inlines = [DetalleTransaccionInline]
     list_display = ('id_transaccion', 'tipo_operacion', 'entidad', 'fecha', 'monto_total', 'estado_pago')
     list_filter = ('tipo_operacion', 'estado_pago', 'fecha')
+    actions = ['marcar_pagadas', 'anular']
+
+    @admin.action(description='Marcar como pagadas (pendientes)')
+    def marcar_pagadas(self, request, queryset):
+        self.message_user(request, f"{transacciones.pagar(queryset)} transacciones marcadas como pagadas.")
+
+    @admin.action(description='Anular transacciones seleccionadas (revierte stock)')
+    def anular(self, request, queryset):
+        self.message_user(request, f"{transacciones.anular(queryset)} transacciones anuladas.")
 
 class LoteAdmin(admin.ModelAdmin):
     list_display = ('id_lote', 'galpon', 'raza', 'fecha_inicio', 'aves_actuales', 'estado')
@@ -31,10 +44,75 @@ class LogArticuloAdmin(admin.ModelAdmin):
     list_filter = ('tipo', 'articulo')
     readonly_fields = ('fecha', 'articulo', 'tipo', 'cantidad', 'saldo_anterior', 'saldo_posterior', 'descripcion')
 
+class EventoPoblacionAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'lote', 'tipo', 'delta', 'baja', 'registrado')
+    list_filter = ('tipo', 'lote')
+    readonly_fields = ('fecha', 'lote', 'tipo', 'delta', 'baja', 'registrado')
+
+class OutboxEventoAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'clave', 'estado', 'intentos', 'creado', 'procesado')
+    list_filter = ('estado', 'tipo')
+    readonly_fields = ('tipo', 'clave', 'payload', 'creado', 'procesado', 'error')
+    actions = ['reintentar']
+
+    @admin.action(description='Reintentar eventos seleccionados')
+    def reintentar(self, request, queryset):
+        n = queryset.exclude(estado=EstadoOutbox.PROCESADO).update(
+            estado=EstadoOutbox.PENDIENTE, intentos=0, disponible_desde=timezone.now()
+        )
+        self.message_user(request, f"{n} eventos vuelven a la cola.")
+
+class CurvaEstandarAdmin(admin.ModelAdmin):
+    list_display = ('raza', 'semana', 'tasa_puesta', 'consumo_ave_g', 'mortalidad_pct')
+    list_filter = ('raza',)
+    list_editable = ('tasa_puesta', 'consumo_ave_g', 'mortalidad_pct')
+
 class RegistroVacunacionAdmin(admin.ModelAdmin):
     list_display = ('lote', 'nombre_vacuna', 'fecha', 'proxima_fecha_sugerida')
     list_filter = ('lote', 'fecha')
 
+class GranjaAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'creada')
+    filter_horizontal = ('usuarios',)
+
+class PerfilPeticionAdmin(admin.ModelAdmin):
+    list_display = ('creado', 'metodo', 'ruta', 'status', 'duracion_ms', 'sql_ms', 'plantillas_ms', 'num_consultas', 'usuario')
+    list_filter = ('metodo', 'status')
+    search_fields = ('ruta',)
+    fields = (
+        ('creado', 'usuario'), ('metodo', 'ruta', 'status'),
+        ('duracion_ms', 'sql_ms', 'plantillas_ms', 'num_consultas'),
+        'tabla_funciones', 'arbol_llamadas', 'tabla_consultas',
+    )
+    readonly_fields = (
+        'creado', 'usuario', 'metodo', 'ruta', 'status', 'duracion_ms', 'sql_ms', 'plantillas_ms', 'num_consultas',
+        'tabla_funciones', 'arbol_llamadas', 'tabla_consultas',
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Funciones (por tiempo propio)')
+    def tabla_funciones(self, obj):
+        filas = format_html_join('', '<tr><td><code>{}</code></td><td>{}</td><td>{}</td><td>{}</td></tr>', (
+            (f['funcion'], f['llamadas'], f['propio_ms'], f['acumulado_ms']) for f in obj.funciones
+        ))
+        return format_html('<table><tr><th>Función</th><th>Llamadas</th><th>Propio ms</th><th>Acumulado ms</th></tr>{}</table>', filas)
+
+    @admin.display(description='Árbol de llamadas')
+    def arbol_llamadas(self, obj):
+        return format_html('<pre style="max-height:40em;overflow:auto">{}</pre>', obj.arbol)
+
+    @admin.display(description='Consultas SQL')
+    def tabla_consultas(self, obj):
+        filas = format_html_join('', '<tr><td>{}</td><td>{}</td><td><code>{}</code></td></tr>', (
+            (i, c['ms'], c['sql']) for i, c in enumerate(obj.consultas, 1)
+        ))
+        return format_html('<table><tr><th>#</th><th>ms</th><th>SQL</th></tr>{}</table>', filas)
+
 admin.site.register(Articulo, ArticuloAdmin)
 admin.site.register(Galpon)
 admin.site.register(Lote, LoteAdmin)
@@ -45,3 +123,8 @@ admin.site.register(CabeceraTransaccion, CabeceraTransaccionAdmin)
 admin.site.register(Receta, RecetaAdmin)
 admin.site.register(LogArticulo, LogArticuloAdmin)
 admin.site.register(RegistroVacunacion, RegistroVacunacionAdmin)
+admin.site.register(EventoPoblacion, EventoPoblacionAdmin)
+admin.site.register(OutboxEvento, OutboxEventoAdmin)
+admin.site.register(CurvaEstandar, CurvaEstandarAdmin)
+admin.site.register(PerfilPeticion, PerfilPeticionAdmin)
+admin.site.register(Granja, GranjaAdmin)
@@ -0,0 +1,143 @@
+"""
+Low-stock alerts and reorder list.
+
+Articulo.bajo_minimo is kept up to date wherever stock moves (indexed flag, no scan).
+Days of cover come from the daily outflow of the kardex (CONSUMO / VENTA entries) over
+the last VENTANA_DIAS days, as a NumPy articles x days matrix: the rate is the larger of
+the short and long moving averages, so a recent spike is not averaged away.
+
+The reorder list is cached; stock changes only mark their article as dirty and the
+next read recomputes just those rows. Marks are an append-only log, so concurrent writers
+and readers never lose one: a mark takes the next number of a per-list counter (atomic
+incr) and stores its article under that number; the cached list remembers the last
+number it has applied.
+"""
+import datetime
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import granjas
+from .cantidades import CantidadField
+from .models import Articulo, LogArticulo
+
+VENTANA_DIAS = 28
+VENTANA_CORTA_DIAS = 7
+HORIZONTE_ALERTA_DIAS = 7       # Alert when the stock lasts less than this
+COBERTURA_OBJETIVO_DIAS = 21    # Suggested purchase covers this many days above the minimum
+
+CACHE_KEY = 'alertas:reorden'
+CACHE_SUCIOS = 'alertas:sucios'
+CACHE_TIMEOUT = 60 * 60         # Moving averages roll forward at least hourly
+MAX_MARCAS = 500                # More pending marks than this: recompute the whole list
+
+
+def marcar(articulo_id, granja_id):
+    """
+    Flags an article whose stock changed; its row is recomputed on the next read (after
+    commit). Only the lists that hold the article are flagged: its farm's and the unscoped one.
+    """
+    def _marcar():
+        for sufijo in granjas.sufijos(granja_id):
+            contador = f'{CACHE_SUCIOS}:{sufijo}'
+            try:
+                n = cache.incr(contador)
+            except ValueError: # No list cached under this suffix: nothing to refresh
+                continue
+            cache.set(f'{contador}:{n}', articulo_id, CACHE_TIMEOUT)
+    transaction.on_commit(_marcar)
+
+
+def consumo_diario(articulo_ids, hoy=None):
+    """
+    Returns (ids, matrix) where matrix[i, d] is the outflow of ids[i] on day d of the
+    window (last column = today).
+    """
+    hoy = hoy or timezone.localdate()
+    desde = hoy - datetime.timedelta(days=VENTANA_DIAS - 1)
+    ids = list(articulo_ids)
+    fila = {pk: i for i, pk in enumerate(ids)}
+    matriz = np.zeros((len(ids), VENTANA_DIAS))
+
+    salidas = (
+        LogArticulo.objects
+        .filter(articulo_id__in=ids, tipo__in=['CONSUMO', 'VENTA'], fecha__date__gte=desde)
+        .annotate(dia=TruncDate('fecha'))
+        .values('articulo_id', 'dia')
+        .annotate(salida=Sum(F('saldo_anterior') - F('saldo_posterior'), output_field=CantidadField()))
+    )
+    for s in salidas:
+        if s['salida'] and s['salida'] > 0 and s['dia'] <= hoy:
+            matriz[fila[s['articulo_id']], (s['dia'] - desde).days] = float(s['salida'])
+    return ids, matriz
+
+
+def _filas(articulos):
+    articulos = list(articulos)
+    ids, matriz = consumo_diario(a.pk for a in articulos)
+    if not ids:
+        return {}
+
+    tasa = np.maximum(matriz[:, -VENTANA_CORTA_DIAS:].mean(axis=1), matriz.mean(axis=1))
+    stock = np.array([float(a.stock_actual) for a in articulos])
+    minimo = np.array([float(a.stock_minimo) for a in articulos])
+    with np.errstate(divide='ignore'):
+        cobertura = np.where(tasa > 0, np.maximum(stock, 0) / tasa, np.inf)
+    sugerido = np.maximum(tasa * COBERTURA_OBJETIVO_DIAS + minimo - stock, 0)
+
+    return {
+        a.pk: {
+            'articulo_id': a.pk,
+            'nombre': a.nombre,
+            'unidad': a.unidad_medida,
+            'stock_actual': a.stock_actual,
+            'stock_minimo': a.stock_minimo,
+            'bajo_minimo': a.bajo_minimo,
+            'consumo_diario': round(float(tasa[i]), 2),
+            'dias_cobertura': None if np.isinf(cobertura[i]) else round(float(cobertura[i]), 1),
+            'sugerido': round(float(sugerido[i]), 2),
+        }
+        for i, a in enumerate(articulos)
+    }
+
+
+def _en_alerta(fila):
+    return fila['bajo_minimo'] or (fila['dias_cobertura'] is not None and fila['dias_cobertura'] < HORIZONTE_ALERTA_DIAS)
+
+
+def lista_reorden():
+    """
+    Articles below minimum or running out within HORIZONTE_ALERTA_DIAS, most urgent
+    first, with days of cover and a suggested purchase quantity.
+    """
+    clave, contador = f'{CACHE_KEY}:{granjas.sufijo()}', f'{CACHE_SUCIOS}:{granjas.sufijo()}'
+    datos = cache.get_many([clave, contador])
+    aplicada, filas = datos.get(clave, (None, None))
+    actual = datos.get(contador)
+
+    if actual is None:
+        cache.add(contador, 0, None)
+        actual, filas = cache.get(contador), None
+    if filas is not None and aplicada != actual:
+        marcas = {}
+        if 0 < actual - aplicada <= MAX_MARCAS:
+            marcas = cache.get_many([f'{contador}:{n}' for n in range(aplicada + 1, actual + 1)])
+        if len(marcas) != actual - aplicada: # Counter reset, mark expired or still being written
+            filas = None
+        else:
+            sucios = set(marcas.values())
+            for pk in sucios:
+                filas.pop(pk, None)
+            filas.update(_filas(Articulo.objects.filter(controlar_stock=True, pk__in=sucios)))
+            cache.set(clave, (actual, filas), CACHE_TIMEOUT)
+    if filas is None:
+        filas = _filas(Articulo.objects.filter(controlar_stock=True))
+        cache.set(clave, (actual, filas), CACHE_TIMEOUT)
+
+    alertas = [f for f in filas.values() if _en_alerta(f)]
+    alertas.sort(key=lambda f: (not f['bajo_minimo'], f['dias_cobertura'] if f['dias_cobertura'] is not None else float('inf')))
+    return alertas
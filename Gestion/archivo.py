@@ -0,0 +1,242 @@
+"""
+Hot/cold archival of the high-volume history tables.
+
+archivar() moves detail rows older than the retention window (cut at a month boundary)
+into the *Archivo tables and leaves compact summary rows in their place, so every total
+read from the hot tables (lote summary, costs, curves, rollups, stock chain) is unchanged:
+
+- MovimientoInterno / RegistroBajas of closed lotes: one row per day (and article, type
+  and unit cost / motive), flagged `archivado`. Summary rows cannot be edited or deleted.
+- LogArticulo: the archivable prefix of each article's chain becomes one ARCHIVO entry per
+  month (saldo_anterior of the first entry, saldo_posterior of the last). The prefix stops
+  at the first entry still linked to a live movement or to a PENDIENTE transaction.
+
+The archive tables keep the original ids (same sequence as the hot tables) and lead
+every index with `anio`, so each year is a contiguous range. historial() / pagina()
+merge both sides back for the views that offer the full history (?completo=1).
+"""
+import datetime
+import heapq
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import (
+    EstadoPago, EventoPoblacion, LogArticulo, LogArticuloArchivo, Lote, MovimientoInterno,
+    MovimientoInternoArchivo, RegistroBajas, RegistroBajasArchivo,
+)
+from .utils import keyset_paginate
+
+RETENCION_DIAS = 365
+
+ARCHIVOS = {
+    MovimientoInterno: MovimientoInternoArchivo,
+    RegistroBajas: RegistroBajasArchivo,
+    LogArticulo: LogArticuloArchivo,
+}
+# Hot rows that stand in for archived ones
+RESUMENES = {
+    MovimientoInterno: Q(archivado=True),
+    RegistroBajas: Q(archivado=True),
+    LogArticulo: Q(tipo='ARCHIVO'),
+}
+
+
+def corte(dias=RETENCION_DIAS, hoy=None):
+    """First instant of the month that contains today - dias: rows before it are archivable."""
+    dia = (hoy or timezone.localdate()) - datetime.timedelta(days=dias)
+    return timezone.make_aware(datetime.datetime(dia.year, dia.month, 1))
+
+
+def _archivar_filas(filas, modelo):
+    """Copies hot rows into the archive table of their model (same ids, same values)."""
+    destino = ARCHIVOS[modelo]
+    campos = {f.attname for f in destino._meta.concrete_fields} - {'id', 'anio', 'id_original'}
+    destino.objects.bulk_create([
+        destino(anio=timezone.localtime(f.fecha).year, id_original=f.pk, **{c: getattr(f, c) for c in campos})
+        for f in filas
+    ])
+
+
+def _borrar(modelo, pks):
+    """
+    Deletes hot rows without signals: archiving must not post stock or population
+    reversals (the summary rows carry the same totals).
+    """
+    for i in range(0, len(pks), 500):
+        qs = modelo.objects.filter(pk__in=pks[i:i + 500])
+        qs._raw_delete(qs.db)
+
+
+def _archivar_movimientos(lote_id, hasta):
+    filas = list(MovimientoInterno.objects.filter(lote_id=lote_id, archivado=False, fecha__lt=hasta).order_by('fecha', 'pk'))
+    if not filas:
+        return 0
+    grupos = {}
+    for f in filas:
+        clave = (f.articulo_id, f.tipo_movimiento, timezone.localtime(f.fecha).date(), f.costo_unitario)
+        grupos.setdefault(clave, []).append(f)
+    _archivar_filas(filas, MovimientoInterno)
+
+    pks = [f.pk for f in filas]
+    LogArticulo.objects.filter(movimiento_id__in=pks).update(movimiento=None)
+    _borrar(MovimientoInterno, pks)
+    MovimientoInterno.objects.bulk_create([
+        MovimientoInterno(
+            lote_id=lote_id, articulo_id=articulo, tipo_movimiento=tipo, costo_unitario=costo, archivado=True,
+            cantidad=sum((f.cantidad for f in grupo), Decimal(0)), fecha=grupo[-1].fecha,
+        )
+        for (articulo, tipo, _, costo), grupo in grupos.items()
+    ])
+    return len(filas)
+
+
+def _archivar_bajas(lote_id, hasta):
+    filas = list(RegistroBajas.objects.filter(lote_id=lote_id, archivado=False, fecha__lt=hasta).order_by('fecha', 'pk'))
+    if not filas:
+        return 0
+    grupos = {}
+    for f in filas:
+        grupos.setdefault((timezone.localtime(f.fecha).date(), f.motivo), []).append(f)
+    _archivar_filas(filas, RegistroBajas)
+
+    pks = [f.pk for f in filas]
+    EventoPoblacion.objects.filter(baja_id__in=pks).update(baja=None)
+    _borrar(RegistroBajas, pks)
+    RegistroBajas.objects.bulk_create([
+        RegistroBajas(lote_id=lote_id, motivo=motivo, archivado=True, cantidad=sum(f.cantidad for f in grupo), fecha=grupo[-1].fecha)
+        for (_, motivo), grupo in grupos.items()
+    ])
+    return len(filas)
+
+
+def _resumen_mes(articulo_id, grupo):
+    primera, ultima = grupo[0], grupo[-1]
+    entradas = sum((f.saldo_posterior - f.saldo_anterior for f in grupo if f.saldo_posterior > f.saldo_anterior), Decimal(0))
+    salidas = sum((f.saldo_anterior - f.saldo_posterior for f in grupo if f.saldo_posterior < f.saldo_anterior), Decimal(0))
+    return LogArticulo(
+        articulo_id=articulo_id, fecha=ultima.fecha, tipo='ARCHIVO',
+        cantidad=ultima.saldo_posterior - primera.saldo_anterior,
+        saldo_anterior=primera.saldo_anterior, saldo_posterior=ultima.saldo_posterior,
+        costo_unitario=ultima.costo_unitario,
+        descripcion=(
+            f"Resumen {timezone.localtime(ultima.fecha):%m/%Y}: {len(grupo)} movimientos archivados "
+            f"(entradas {entradas}, salidas {salidas})"
+        ),
+    )
+
+
+def _archivar_kardex(articulo_id, hasta):
+    """
+    Replaces the archivable prefix of the chain with monthly ARCHIVO entries. Every group
+    ends strictly before the next entry kept in the hot table, so the (fecha, id) order
+    of the chain (and every saldo) is preserved.
+    """
+    cadena = (
+        LogArticulo.objects.filter(articulo_id=articulo_id, fecha__lt=hasta)
+        .order_by('fecha', 'pk').values_list('pk', 'fecha', 'tipo', 'movimiento_id', 'detalle__transaccion__estado_pago')
+    )
+    grupos, grupo, mes = [], [], None
+    for pk, fecha, tipo, movimiento, estado in cadena.iterator():
+        if tipo == 'ARCHIVO' or movimiento is not None or estado == EstadoPago.PENDIENTE:
+            # Kept in place: what is grouped before it must end at an earlier instant
+            grupo = [p for p in grupo if p[1] < fecha]
+            grupos.append(grupo)
+            grupo, mes = [], None
+            if tipo == 'ARCHIVO':
+                continue
+            break
+        actual = timezone.localtime(fecha).strftime('%Y%m')
+        if actual != mes:
+            grupos.append(grupo)
+            grupo, mes = [], actual
+        grupo.append((pk, fecha))
+    grupos.append(grupo)
+    grupos = [g for g in grupos if g]
+    if not grupos:
+        return 0
+
+    pks = [pk for g in grupos for pk, _ in g]
+    filas = {f.pk: f for f in LogArticulo.objects.filter(pk__in=pks)}
+    _archivar_filas([filas[pk] for pk in pks], LogArticulo)
+    _borrar(LogArticulo, pks)
+    LogArticulo.objects.bulk_create([_resumen_mes(articulo_id, [filas[pk] for pk, _ in g]) for g in grupos])
+    return len(pks)
+
+
+def archivar(dias=RETENCION_DIAS, hoy=None):
+    """
+    Archives everything older than the retention window. Each lote and each article is its
+    own short transaction, so the run can be interrupted and repeated safely.
+    Returns the number of detail rows moved per table.
+    """
+    hasta = corte(dias, hoy)
+    total = {'movimientos': 0, 'bajas': 0, 'kardex': 0}
+
+    lotes = Lote.objects.filter(estado=False).filter(
+        Exists(MovimientoInterno.objects.filter(lote=OuterRef('pk'), fecha__lt=hasta, archivado=False))
+        | Exists(RegistroBajas.objects.filter(lote=OuterRef('pk'), fecha__lt=hasta, archivado=False))
+    ).values_list('pk', flat=True)
+    for lote_id in list(lotes):
+        with transaction.atomic():
+            total['movimientos'] += _archivar_movimientos(lote_id, hasta)
+            total['bajas'] += _archivar_bajas(lote_id, hasta)
+
+    articulos = LogArticulo.objects.filter(fecha__lt=hasta).exclude(tipo='ARCHIVO').values_list('articulo_id', flat=True).distinct()
+    for articulo_id in list(articulos):
+        with transaction.atomic():
+            total['kardex'] += _archivar_kardex(articulo_id, hasta)
+    return total
+
+
+# --- unified reads ---
+
+def _como_original(fila, modelo, relacionados=()):
+    """Unsaved instance of the hot model for an archived row (same id), so templates work unchanged."""
+    campos = {f.attname for f in type(fila)._meta.concrete_fields} - {'id', 'anio', 'id_original'}
+    objeto = modelo(pk=fila.id_original, **{c: getattr(fila, c) for c in campos})
+    for nombre in relacionados:
+        setattr(objeto, nombre, getattr(fila, nombre))
+    return objeto
+
+
+def _partes(modelo, relacionados, filtros):
+    caliente = modelo.objects.filter(**filtros).exclude(RESUMENES[modelo]).select_related(*relacionados)
+    archivado = ARCHIVOS[modelo].objects.filter(**filtros).select_related(*relacionados)
+    return caliente, archivado
+
+
+def historial(modelo, completo=False, relacionados=(), **filtros):
+    """
+    Rows of `modelo` matching `filtros`, newest first. By default the hot table as is
+    (summary rows included); completo=True swaps the summaries for the archived detail.
+    """
+    if not completo:
+        return modelo.objects.filter(**filtros).select_related(*relacionados).order_by('-fecha', '-pk')
+    caliente, archivado = _partes(modelo, relacionados, filtros)
+    return list(heapq.merge(
+        caliente.order_by('-fecha', '-pk').iterator(),
+        (_como_original(f, modelo, relacionados) for f in archivado.order_by('-fecha', '-id_original').iterator()),
+        key=lambda f: (f.fecha, f.pk), reverse=True,
+    ))
+
+
+def pagina(modelo, cursor=None, page_size=25, relacionados=(), **filtros):
+    """keyset_paginate() over the full history (hot detail + archive) of `modelo`."""
+    caliente, archivado = _partes(modelo, relacionados, filtros)
+    filas, siguiente = keyset_paginate(caliente, cursor, page_size)
+    viejas, siguiente_archivo = keyset_paginate(archivado, cursor, page_size, tiebreak='id_original')
+    filas = sorted(filas + [_como_original(f, modelo, relacionados) for f in viejas], key=lambda f: (f.fecha, f.pk), reverse=True)
+
+    hay_mas = len(filas) > page_size or siguiente or siguiente_archivo
+    filas = filas[:page_size]
+    return filas, (f"{filas[-1].fecha.isoformat()}|{filas[-1].pk}" if hay_mas else None)
+
+
+def tiene_archivo(lote_id):
+    return (
+        MovimientoInterno.objects.filter(lote_id=lote_id, archivado=True).exists()
+        or RegistroBajas.objects.filter(lote_id=lote_id, archivado=True).exists()
+    )
@@ -0,0 +1,228 @@
+"""
+Cache backend on a local SQLite file, shared by every worker process of the machine.
+
+    CACHES = {'default': {
+        'BACKEND': 'Gestion.cache_sqlite.SQLiteCache',
+        'LOCATION': '/var/lib/sga/cache.sqlite3',
+        'OPTIONS': {'MAX_ENTRIES': 20000, 'MAX_BYTES': 64 * 1024 * 1024},
+    }}
+
+- WAL journal: readers never block the writer, so concurrent gets stay cheap.
+- Size bound (entries and bytes) kept by triggers in a one-row stats table; when a
+  write goes over, expired rows are purged first and then the least recently used
+  ones (1 / CULL_FREQUENCY of the entries). `accessed` is refreshed at most every
+  LRU_RESOLUTION seconds per key, so hot keys do not turn reads into writes.
+- Integers are stored as SQLite INTEGERs (everything else pickled), so incr/decr is a
+  single atomic UPDATE ... RETURNING across processes (used by the version counters).
+- The connection stays open for the life of the process (one per thread): Django calls
+  close() at the end of every request, which is a no-op here as in LocMemCache. The
+  schema and WAL mode are set up once per process and file.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+LRU_RESOLUTION = 5
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+CREATE TABLE IF NOT EXISTS cache_stats (id INTEGER PRIMARY KEY CHECK (id = 1), entries INTEGER NOT NULL, bytes INTEGER NOT NULL);
+INSERT OR IGNORE INTO cache_stats VALUES (1, 0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_ins AFTER INSERT ON cache BEGIN
+    UPDATE cache_stats SET entries = entries + 1, bytes = bytes + length(NEW.value);
+END;
+CREATE TRIGGER IF NOT EXISTS cache_del AFTER DELETE ON cache BEGIN
+    UPDATE cache_stats SET entries = entries - 1, bytes = bytes - length(OLD.value);
+END;
+CREATE TRIGGER IF NOT EXISTS cache_upd AFTER UPDATE OF value ON cache BEGIN
+    UPDATE cache_stats SET bytes = bytes - length(OLD.value) + length(NEW.value);
+END;
+"""
+
+VIGENTE = "(expires IS NULL OR expires > ?)"
+
+# (pid, absolute path) of the files whose schema this process already set up
+_preparadas = set()
+_preparadas_lock = threading.Lock()
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        options = params.get('OPTIONS', {})
+        self._max_bytes = int(options.get('MAX_BYTES', 0)) or None
+        self._local = threading.local()
+
+    # --- connection (one per process and thread) ---
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            ruta = os.path.abspath(self._path)
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            conn = sqlite3.connect(ruta, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL") # Per connection
+            with _preparadas_lock:
+                if (os.getpid(), ruta) not in _preparadas:
+                    conn.execute("PRAGMA journal_mode=WAL") # Persistent in the file
+                    conn.executescript(ESQUEMA)
+                    _preparadas.add((os.getpid(), ruta))
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def close(self, **kwargs):
+        # Called by Django after every request: keep the connection (see module docstring)
+        pass
+
+    def cerrar(self):
+        """Really closes this thread's connection (tests, benchmark, before removing the file)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+        with _preparadas_lock:
+            _preparadas.discard((os.getpid(), os.path.abspath(self._path)))
+
+    # --- value encoding ---
+
+    def _encode(self, value):
+        if type(value) is int and -(2 ** 63) <= value < 2 ** 63:
+            return value
+        return pickle.dumps(value, self.pickle_protocol)
+
+    @staticmethod
+    def _decode(value):
+        return value if isinstance(value, int) else pickle.loads(value)
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout) # Absolute timestamp, None = never
+
+    # --- eviction ---
+
+    def _cull(self, conn, now):
+        entries, size = conn.execute("SELECT entries, bytes FROM cache_stats").fetchone()
+        if entries <= self._max_entries and (self._max_bytes is None or size <= self._max_bytes):
+            return
+        conn.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?", (now,))
+        entries, size = conn.execute("SELECT entries, bytes FROM cache_stats").fetchone()
+        if entries > self._max_entries or (self._max_bytes is not None and size > self._max_bytes):
+            n = max(entries // self._cull_frequency, entries - self._max_entries, 1)
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)", (n,)
+            )
+
+    def _escribir(self, filas, modo):
+        """filas: [(key, encoded value, expires)]. modo: 'set' (upsert) or 'add' (only if absent/expired)."""
+        conn = self._conn()
+        now = time.time()
+        sql = (
+            "INSERT INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires, accessed = excluded.accessed"
+        )
+        if modo == 'add': # Only replaces an expired row
+            sql += " WHERE cache.expires IS NOT NULL AND cache.expires <= excluded.accessed"
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cambios = conn.total_changes
+            conn.executemany(sql, [(k, v, e, now) for k, v, e in filas])
+            escritas = conn.total_changes - cambios
+            self._cull(conn, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return escritas
+
+    # --- cache API ---
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._escribir([(key, self._encode(value), self._expires(timeout))], 'add') > 0
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._escribir([(key, self._encode(value), self._expires(timeout))], 'set')
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expires(timeout)
+        self._escribir(
+            [(self.make_and_validate_key(k, version=version), self._encode(v), expires) for k, v in data.items()], 'set'
+        )
+        return []
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._leer([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        claves = {self.make_and_validate_key(k, version=version): k for k in keys}
+        return {claves[k]: v for k, v in self._leer(list(claves)).items()}
+
+    def _leer(self, claves):
+        if not claves:
+            return {}
+        conn = self._conn()
+        now = time.time()
+        resultado, viejas = {}, []
+        for i in range(0, len(claves), 500): # SQLite host-parameter limit
+            lote = claves[i:i + 500]
+            filas = conn.execute(
+                f"SELECT key, value, accessed FROM cache WHERE key IN ({','.join('?' * len(lote))}) AND {VIGENTE}",
+                (*lote, now),
+            ).fetchall()
+            for k, v, accessed in filas:
+                resultado[k] = self._decode(v)
+                if accessed < now - LRU_RESOLUTION:
+                    viejas.append(k)
+        if viejas:
+            conn.executemany("UPDATE cache SET accessed = ? WHERE key = ?", [(now, k) for k in viejas])
+        return resultado
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        cur = self._conn().execute(
+            f"UPDATE cache SET expires = ?, accessed = ? WHERE key = ? AND {VIGENTE}", (self._expires(timeout), now, key, now)
+        )
+        return cur.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        fila = self._conn().execute(
+            f"UPDATE cache SET value = value + ?, accessed = ? WHERE key = ? AND typeof(value) = 'integer' AND {VIGENTE} RETURNING value",
+            (delta, now, key, now),
+        ).fetchone()
+        if fila is None:
+            raise ValueError("Key '%s' not found" % key)
+        return fila[0]
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._conn().execute(f"SELECT 1 FROM cache WHERE key = ? AND {VIGENTE}", (key, time.time())).fetchone() is not None
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._conn().execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount > 0
+
+    def delete_many(self, keys, version=None):
+        claves = [self.make_and_validate_key(k, version=version) for k in keys]
+        if claves:
+            self._conn().executemany("DELETE FROM cache WHERE key = ?", [(k,) for k in claves])
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache")
@@ -0,0 +1,99 @@
+"""
+Fixed-point quantities.
+
+CantidadField stores a quantity as a 64-bit integer count of thousandths and presents
+it as a Decimal (forms, templates and Python code see the same values as before). SUMs
+and the stock / kardex ledger arithmetic run on integers, so they are exact and cheap
+on every backend, and rounding happens in one place (to the thousandth, on write).
+
+What callers must keep in mind when writing expressions:
+- A literal combined with a quantity column goes through valor() so it gets the same
+  scale: F('stock_actual') + valor(delta).
+- A quantity column times a non-quantity column (price, cost) is ESCALA times the real
+  value; two quantity columns multiplied give millionths. Aggregates of such products
+  are rescaled with desescalar().
+"""
+from decimal import ROUND_HALF_EVEN, Decimal
+
+from django.db import migrations, models
+from django.db.models import Value
+
+ESCALA = 1000
+DECIMALES = 3
+
+
+def escalar(valor):
+    """Decimal (or anything Decimal() accepts) -> integer thousandths."""
+    return int((Decimal(str(valor)) * ESCALA).to_integral_value(ROUND_HALF_EVEN))
+
+
+def desescalar(entero, grado=1):
+    """Integer from the database -> Decimal; grado=2 for a product of two quantities."""
+    if entero is None:
+        return None
+    return Decimal(int(entero)).scaleb(-DECIMALES * grado)
+
+
+class CantidadField(models.DecimalField):
+    """
+    Decimal quantity stored as integer thousandths. decimal_places (at most 3) is the
+    precision shown and validated; the column is a BIGINT in every backend.
+    """
+    def __init__(self, *args, max_digits=12, decimal_places=2, **kwargs):
+        super().__init__(*args, max_digits=max_digits, decimal_places=decimal_places, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if kwargs.get('max_digits') == 12:
+            del kwargs['max_digits']
+        if kwargs.get('decimal_places') == 2:
+            del kwargs['decimal_places']
+        return name, path, args, kwargs
+
+    def get_internal_type(self):
+        return 'BigIntegerField'
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if not prepared:
+            value = self.get_prep_value(value)
+        if value is None or hasattr(value, 'as_sql'):
+            return value
+        return escalar(value)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        if isinstance(value, float): # AVG and friends
+            value = round(value)
+        return desescalar(value).quantize(Decimal(1).scaleb(-self.decimal_places))
+
+
+def valor(cantidad):
+    """A quantity literal for expressions, scaled like the columns it is combined with."""
+    return Value(cantidad, output_field=CantidadField(decimal_places=DECIMALES))
+
+
+def migrar(modelo, campo, nuevo):
+    """
+    Migration operations that turn a decimal/float column into `nuevo` (a CantidadField):
+    widen to 3 decimals, scale the stored values in place, then retype to integer.
+    Reversible.
+    """
+    _, _, _, kwargs = nuevo.deconstruct()
+    kwargs.pop('max_digits', None)
+    kwargs.pop('decimal_places', None)
+    ancho = models.DecimalField(max_digits=20, decimal_places=DECIMALES, **kwargs)
+
+    def sql(schema_editor, apps, expresion):
+        Modelo = apps.get_model('Gestion', modelo)
+        columna = schema_editor.quote_name(Modelo._meta.get_field(campo).column)
+        schema_editor.execute(f"UPDATE {schema_editor.quote_name(Modelo._meta.db_table)} SET {columna} = {expresion % columna}")
+
+    return [
+        migrations.AlterField(modelo, campo, ancho),
+        migrations.RunPython(
+            lambda apps, schema_editor: sql(schema_editor, apps, f'ROUND(%s * {ESCALA})'),
+            lambda apps, schema_editor: sql(schema_editor, apps, f'%s / {ESCALA}.0'),
+        ),
+        migrations.AlterField(modelo, campo, nuevo),
+    ]
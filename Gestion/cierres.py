@@ -0,0 +1,80 @@
+"""
+Close-out summaries of closed lotes (CierreLote).
+
+The data of a closed lote does not change any more, so when a lote closes its totals
+are computed once and frozen: eggs, feed, bajas per motive, peak weekly laying rate
+(same definition as the age curves), feed per egg, duration, and cost / margin (same
+as costos.resumen_lotes). The closed-lotes comparison reads only these rows.
+
+A summary is never refreshed behind the user's back: recalcular() (lote page button,
+`cerrar_lotes --recalcular`) rebuilds it on request, and reopening the lote drops it.
+"""
+from django.db import transaction
+from django.db.models import Max, Q, Sum
+from django.utils import timezone
+
+from . import costos, curvas
+from .models import CierreLote, Lote, MovimientoInterno, RegistroBajas, TipoMovimiento
+
+
+def calcular(lote):
+    """Unsaved CierreLote with the current totals of the lote."""
+    movimientos = MovimientoInterno.objects.filter(lote=lote).aggregate(
+        alimento=Sum('cantidad', filter=Q(tipo_movimiento=TipoMovimiento.CONSUMO)),
+        fin=Max('fecha'),
+    )
+    bajas = RegistroBajas.objects.filter(lote=lote)
+    bajas_motivo = dict(bajas.order_by().values_list('motivo').annotate(total=Sum('cantidad')))
+    fin_bajas = bajas.aggregate(fin=Max('fecha'))['fin']
+
+    # Last day with activity; the closing day if nothing was ever recorded
+    fechas = [timezone.localdate(f) for f in (movimientos['fin'], fin_bajas) if f]
+    fecha_cierre = max(fechas) if fechas else timezone.localdate()
+
+    # Fresh from the row: aves_actuales moves by UPDATE, and a new instance may still hold the default datetime
+    aves_finales, inicio = Lote.objects.filter(pk=lote.pk).values_list('aves_actuales', 'fecha_inicio').get()
+    puesta_pico, semana_pico = curvas.pico(curvas.de_lotes([lote.pk], fecha_cierre)['puesta'][0])
+
+    resumen = costos.resumen_lotes([lote])[lote.pk]
+    huevos, alimento = resumen['huevos'], movimientos['alimento'] or 0
+    return CierreLote(
+        lote=lote,
+        fecha_cierre=fecha_cierre,
+        dias=(fecha_cierre - inicio).days + 1,
+        aves_iniciales=lote.aves_iniciales,
+        aves_finales=aves_finales,
+        huevos=huevos,
+        alimento=alimento,
+        bajas=sum(bajas_motivo.values()),
+        bajas_motivo=bajas_motivo,
+        puesta_pico=round(puesta_pico, 2) if puesta_pico is not None else None,
+        semana_pico=semana_pico,
+        gramos_huevo=round(float(alimento) * 1000 / float(huevos), 1) if huevos else None,
+        costo=resumen['costo'],
+        costo_huevo=resumen['costo_huevo'],
+        precio_huevo=resumen['precio_huevo'],
+        margen=resumen['margen'],
+    )
+
+
+def cerrar(lote):
+    """Freezes the summary of a closed lote; an existing one is left as is. Returns it."""
+    cierre = CierreLote.objects.filter(lote=lote).first()
+    if cierre is None:
+        cierre = calcular(lote)
+        cierre.save(force_insert=True)
+    return cierre
+
+
+def recalcular(lote):
+    """Rebuilds the summary from the lote's current data (explicit request only)."""
+    with transaction.atomic():
+        CierreLote.objects.filter(lote=lote).delete()
+        cierre = calcular(lote)
+        cierre.save(force_insert=True)
+    return cierre
+
+
+def reabrir(lote):
+    """Drops the summary of a lote that went back to active."""
+    CierreLote.objects.filter(lote=lote).delete()
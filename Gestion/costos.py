@@ -0,0 +1,166 @@
+"""
+Costing: moving weighted-average unit cost per Articulo.
+
+Each purchase posting folds its price into Articulo.costo_promedio with one UPDATE
+evaluated on the pre-purchase row; reversing a purchase takes it back out. Kardex
+entries and consumptions are stamped with the unit cost at posting time, so lote cost,
+cost per egg and margin are plain aggregates over the stamped rows.
+"""
+import datetime
+from decimal import Decimal
+
+from django.db.models import BigIntegerField, Case, DecimalField, ExpressionWrapper, F, Max, Q, Sum, Value, When
+from django.utils import timezone
+
+from .cantidades import ESCALA, desescalar, valor
+from .models import Articulo, DetalleTransaccion, EstadoPago, MovimientoInterno, TipoMovimiento, TipoOperacion
+
+COSTO = DecimalField(max_digits=12, decimal_places=4)
+
+
+def _actualizar(articulo, expresion):
+    Articulo.objects.filter(pk=articulo.pk).update(costo_promedio=ExpressionWrapper(expresion, output_field=COSTO))
+    articulo.costo_promedio = Articulo.objects.filter(pk=articulo.pk).values_list('costo_promedio', flat=True).get()
+    articulo.marcar_limpios(['costo_promedio'])
+
+
+def registrar_compra(articulo, cantidad, precio):
+    """Folds a purchase into the average. Must run before the stock is increased."""
+    cantidad, precio = Decimal(cantidad), Decimal(precio)
+    if cantidad <= 0:
+        return
+    _actualizar(articulo, Case(
+        When(
+            Q(controlar_stock=True, stock_actual__gt=0),
+            then=(F('stock_actual') * F('costo_promedio') + valor(cantidad) * Value(precio)) / (F('stock_actual') + valor(cantidad)),
+        ),
+        default=Value(precio),
+    ))
+
+
+def revertir_compra(articulo, cantidad, precio):
+    """Takes a purchase back out of the average. Must run before the stock is decreased."""
+    if precio is None:
+        return
+    cantidad, precio = Decimal(cantidad), Decimal(precio)
+    if cantidad <= 0:
+        return
+    _actualizar(articulo, Case(
+        When(
+            Q(controlar_stock=True, stock_actual__gt=cantidad),
+            then=(F('stock_actual') * F('costo_promedio') - valor(cantidad) * Value(precio)) / (F('stock_actual') - valor(cantidad)),
+        ),
+        default=F('costo_promedio'), # Nothing left to average against: keep the last cost
+    ))
+
+
+def estampar_consumo(movimiento):
+    """Stamps a consumption with the current average cost of its article (once)."""
+    if movimiento.tipo_movimiento != TipoMovimiento.CONSUMO or movimiento.costo_unitario is not None:
+        return
+    movimiento.costo_unitario = movimiento.articulo.costo_promedio
+    MovimientoInterno.objects.filter(pk=movimiento.pk).update(costo_unitario=movimiento.costo_unitario)
+
+
+def _ventas(articulo_ids, desde=None, hasta=None, campos=()):
+    """
+    Yields (article, *campos, amount, units) for the VENTA lines of each produced
+    article: direct sales plus packs that contain it (pack price spread over the units
+    per pack, packaging ignored). campos: extra grouping fields (e.g. the date).
+    """
+    ventas = DetalleTransaccion.objects.filter(transaccion__tipo_operacion=TipoOperacion.VENTA).exclude(transaccion__estado_pago=EstadoPago.ANULADO)
+    if desde:
+        ventas = ventas.filter(transaccion__fecha__gte=desde)
+    if hasta:
+        ventas = ventas.filter(transaccion__fecha__lte=hasta)
+
+    for v in ventas.filter(articulo_id__in=articulo_ids).values('articulo_id', *campos).annotate(monto=Sum('subtotal'), unidades=Sum('cantidad')):
+        yield (v['articulo_id'], *(v[c] for c in campos), v['monto'], v['unidades'])
+    ingrediente = 'articulo__ingredientes_receta__ingrediente_id'
+    packs = (
+        ventas.filter(articulo__ingredientes_receta__ingrediente_id__in=articulo_ids)
+        .values(ingrediente, *campos)
+        .annotate(
+            monto=Sum('subtotal'),
+            unidades=Sum(F('cantidad') * F('articulo__ingredientes_receta__cantidad'), output_field=BigIntegerField()), # Millionths
+        )
+    )
+    for v in packs:
+        yield (v[ingrediente], *(v[c] for c in campos), v['monto'], desescalar(v['unidades'], 2))
+
+
+def precio_venta_unitario(articulo_ids, desde=None, hasta=None):
+    """Average VENTA price per unit of each produced article (see _ventas)."""
+    totales = {pk: [Decimal(0), Decimal(0)] for pk in articulo_ids}
+    for articulo, monto, unidades in _ventas(articulo_ids, desde, hasta):
+        totales[articulo][0] += monto
+        totales[articulo][1] += unidades
+    return {pk: (monto / unidades if unidades else None) for pk, (monto, unidades) in totales.items()}
+
+
+def _fecha(valor):
+    # New, unsaved lotes may still hold the default datetime
+    return timezone.localdate(valor) if isinstance(valor, datetime.datetime) else valor
+
+
+def resumen_lotes(lotes):
+    """
+    Cost and margin per lote: {lote_id: {...}}. One grouped aggregate over the stamped
+    movements, plus the sales of the produced articles per day over the span of all the
+    lotes (one query), summed over each lote's life in Python.
+    """
+    lotes = list(lotes)
+    filas = {
+        r['lote_id']: r for r in MovimientoInterno.objects.filter(lote__in=lotes).values('lote_id').annotate(
+            costo=Sum(F('cantidad') * F('costo_unitario'), filter=Q(tipo_movimiento=TipoMovimiento.CONSUMO), output_field=COSTO),
+            huevos=Sum('cantidad', filter=Q(tipo_movimiento=TipoMovimiento.PRODUCCION)),
+            fin=Max('fecha'),
+        )
+    }
+    producidos = {}
+    for r in MovimientoInterno.objects.filter(lote__in=lotes, tipo_movimiento=TipoMovimiento.PRODUCCION).values('lote_id', 'articulo_id').annotate(total=Sum('cantidad')):
+        producidos.setdefault(r['lote_id'], []).append((r['articulo_id'], r['total']))
+
+    # Life of each lote: until today while active, until its last movement once closed
+    vida = {}
+    for lote in lotes:
+        fila = filas.get(lote.pk, {})
+        vida[lote.pk] = (_fecha(lote.fecha_inicio), timezone.localdate() if lote.estado or not fila.get('fin') else timezone.localdate(fila['fin']))
+    articulos = {a for pares in producidos.values() for a, _ in pares}
+    diarias = {}  # article -> {day: [amount, units]}
+    if articulos:
+        rangos = [vida[pk] for pk in producidos]
+        desde, hasta = min(d for d, _ in rangos), max(h for _, h in rangos)
+        for articulo, dia, monto, unidades in _ventas(articulos, desde, hasta, campos=('transaccion__fecha',)):
+            total = diarias.setdefault(articulo, {}).setdefault(dia, [Decimal(0), Decimal(0)])
+            total[0] += monto
+            total[1] += unidades
+
+    resumen = {}
+    for lote in lotes:
+        fila = filas.get(lote.pk, {})
+        costo = (fila.get('costo') or Decimal(0)) / ESCALA # cantidad is in thousandths
+        huevos = fila.get('huevos') or Decimal(0)
+        desde, hasta = vida[lote.pk]
+
+        # Weighted sales price of what this lote produced, over the lote's life
+        vendidos = []
+        for articulo, q in producidos.get(lote.pk, []):
+            dias = [t for dia, t in diarias.get(articulo, {}).items() if desde <= dia <= hasta]
+            unidades = sum(u for _, u in dias)
+            if unidades:
+                vendidos.append((sum(m for m, _ in dias) / unidades, q))
+        unidades_vendidas = sum(q for _, q in vendidos)
+        precio = sum(p * q for p, q in vendidos) / unidades_vendidas if unidades_vendidas else None
+
+        costo_huevo = costo / huevos if huevos else None
+        resumen[lote.pk] = {
+            'costo': costo,
+            'huevos': huevos,
+            'costo_huevo': costo_huevo,
+            'costo_docena': costo_huevo * 12 if costo_huevo is not None else None,
+            'precio_huevo': precio,
+            'margen_huevo': precio - costo_huevo if precio is not None and costo_huevo is not None else None,
+            'margen': (precio - costo_huevo) * huevos if precio is not None and costo_huevo is not None else None,
+        }
+    return resumen
@@ -0,0 +1,200 @@
+"""
+Laying curves aligned by week of life.
+
+Builds lote x age-week matrices (laying rate, feed per bird, weekly mortality) for every
+lote, current or closed, from one grouped extract of MovimientoInterno and the
+PoblacionDiaria snapshots. Daily values are scattered into lote x age-day arrays with
+NumPy and folded into weeks; the result is cached and shared by every curve view.
+"""
+import warnings
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import granjas
+from .models import CurvaEstandar, Lote, MovimientoInterno, PoblacionDiaria, TipoMovimiento
+
+MAX_SEMANAS = 120
+CACHE_KEY = 'curvas:matriz'
+CACHE_TIMEOUT = 60 * 60
+
+METRICAS = {
+    'puesta': 'Tasa de puesta (%)',
+    'consumo': 'Consumo por ave (g/día)',
+    'mortalidad': 'Mortalidad semanal (%)',
+}
+
+
+def invalidar(granja_id):
+    cache.delete_many([f'{CACHE_KEY}:{s}' for s in granjas.sufijos(granja_id)])
+
+
+def _construir(hoy, lote_ids=None):
+    """The matrix for every lote, or only for `lote_ids` (close-out summaries, see cierres.py)."""
+    solo = {} if lote_ids is None else {'lote_id__in': lote_ids}
+    lotes = Lote.objects.select_related('galpon').order_by('fecha_inicio', 'pk')
+    lotes = list(lotes if lote_ids is None else lotes.filter(pk__in=lote_ids))
+    if not lotes:
+        return {'lotes': [], 'semanas': 0, **{m: np.zeros((0, 0)) for m in METRICAS}}
+    fila = {l.pk: i for i, l in enumerate(lotes)}
+    inicio = np.array([l.fecha_inicio.toordinal() for l in lotes])
+
+    movs = list(
+        MovimientoInterno.objects
+        .filter(tipo_movimiento__in=[TipoMovimiento.PRODUCCION, TipoMovimiento.CONSUMO], **solo)
+        .annotate(dia=TruncDate('fecha'))
+        .values('lote_id', 'dia', 'tipo_movimiento')
+        .annotate(total=Sum('cantidad'))
+    )
+    snapshots = list(PoblacionDiaria.objects.filter(**solo).values_list('lote_id', 'fecha', 'aves_vivas', 'bajas'))
+
+    # Last day of each lote: today while active, last recorded activity once closed
+    cerrados = {
+        r['lote_id']: r['fin']
+        for r in MovimientoInterno.objects.filter(lote__estado=False, **solo).values('lote_id').annotate(fin=Max('fecha'))
+    }
+    fin = np.array([
+        (hoy if l.estado else timezone.localtime(cerrados[l.pk]).date() if l.pk in cerrados else l.fecha_inicio).toordinal()
+        for l in lotes
+    ])
+    dias_vida = np.clip(fin - inicio + 1, 0, MAX_SEMANAS * 7)
+    semanas = max(int(np.ceil(dias_vida.max() / 7)), 1)
+    D = semanas * 7
+
+    def dispersar(filas, columnas, valores):
+        """Accumulates values into a lote x age-day array, dropping days outside the lote's life."""
+        matriz = np.zeros((len(lotes), D))
+        filas, columnas, valores = np.asarray(filas, dtype=int), np.asarray(columnas, dtype=int), np.asarray(valores, dtype=float)
+        ok = (columnas >= 0) & (columnas < D)
+        np.add.at(matriz, (filas[ok], columnas[ok]), valores[ok])
+        return matriz
+
+    def edad(lote_id, dia):
+        return dia.toordinal() - inicio[fila[lote_id]]
+
+    prod = [m for m in movs if m['tipo_movimiento'] == TipoMovimiento.PRODUCCION]
+    cons = [m for m in movs if m['tipo_movimiento'] == TipoMovimiento.CONSUMO]
+    huevos = dispersar([fila[m['lote_id']] for m in prod], [edad(m['lote_id'], m['dia']) for m in prod], [m['total'] for m in prod])
+    alimento = dispersar([fila[m['lote_id']] for m in cons], [edad(m['lote_id'], m['dia']) for m in cons], [m['total'] for m in cons])
+    bajas = dispersar([fila[s[0]] for s in snapshots], [edad(s[0], s[1]) for s in snapshots], [s[3] for s in snapshots])
+
+    # Birds alive: forward-fill the snapshots along the age axis
+    filas_s = np.array([fila[s[0]] for s in snapshots], dtype=int)
+    cols_s = np.array([edad(s[0], s[1]) for s in snapshots], dtype=int)
+    ok = (cols_s >= 0) & (cols_s < D)
+    valores = np.zeros((len(lotes), D))
+    tiene = np.zeros((len(lotes), D), dtype=bool)
+    valores[filas_s[ok], cols_s[ok]] = np.array([s[2] for s in snapshots], dtype=float)[ok]
+    tiene[filas_s[ok], cols_s[ok]] = True
+    tiene[:, 0] = True  # Day 0 falls back to aves_iniciales when there is no snapshot
+    valores[:, 0] = np.where(valores[:, 0] > 0, valores[:, 0], [l.aves_iniciales for l in lotes])
+    idx = np.maximum.accumulate(np.where(tiene, np.arange(D), 0), axis=1)
+    aves = np.take_along_axis(valores, idx, axis=1)
+    aves[np.arange(D)[None, :] >= dias_vida[:, None]] = 0
+
+    # Fold days into weeks
+    forma = (len(lotes), D // 7, 7)
+    aves_dia = aves.reshape(forma).sum(axis=2)
+    huevos_sem = huevos.reshape(forma).sum(axis=2)
+    alimento_sem = alimento.reshape(forma).sum(axis=2)
+    bajas_sem = bajas.reshape(forma).sum(axis=2)
+    aves_inicio_sem = aves.reshape(forma)[:, :, 0] + bajas.reshape(forma)[:, :, 0]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        activo = aves_dia > 0
+        puesta = np.where(activo, huevos_sem / aves_dia * 100, np.nan)
+        consumo = np.where(activo, alimento_sem * 1000 / aves_dia, np.nan)
+        mortalidad = np.where(activo & (aves_inicio_sem > 0), bajas_sem / aves_inicio_sem * 100, np.nan)
+
+    return {
+        'lotes': [
+            {'id': l.pk, 'raza': l.raza, 'galpon': l.galpon.nombre, 'estado': l.estado, 'fecha_inicio': l.fecha_inicio}
+            for l in lotes
+        ],
+        'semanas': semanas,
+        'puesta': puesta,
+        'consumo': consumo,
+        'mortalidad': mortalidad,
+    }
+
+
+def matriz(hoy=None):
+    """Cached {'lotes': [...], 'semanas': n, 'puesta'|'consumo'|'mortalidad': lote x week arrays (NaN = no data)}."""
+    clave = f'{CACHE_KEY}:{granjas.sufijo()}'
+    datos = cache.get(clave)
+    if datos is None:
+        datos = _construir(hoy or timezone.localdate())
+        cache.set(clave, datos, CACHE_TIMEOUT)
+    return datos
+
+
+def de_lotes(lote_ids, hoy=None):
+    """Same as matriz() but only for `lote_ids`, built on the spot (not cached)."""
+    return _construir(hoy or timezone.localdate(), lote_ids)
+
+
+def _serie(valores):
+    return [None if np.isnan(v) else round(float(v), 2) for v in valores]
+
+
+def estandar(raza, metrica, semanas):
+    """Breed standard curve for the metric, None where the standard has no value."""
+    campo = {'puesta': 'tasa_puesta', 'consumo': 'consumo_ave_g', 'mortalidad': 'mortalidad_pct'}[metrica]
+    valores = dict(CurvaEstandar.objects.filter(raza__iexact=raza, semana__lte=semanas).values_list('semana', campo))
+    return [valores.get(s) for s in range(1, semanas + 1)]
+
+
+def comparar(lote_id, metrica='puesta'):
+    """
+    Curves to overlay for one lote: the lote itself, the mean of the other lotes of the
+    same raza and the breed standard. Returns None if the lote is not in the matrix.
+    """
+    datos = matriz()
+    ids = [l['id'] for l in datos['lotes']]
+    if lote_id not in ids:
+        return None
+    i = ids.index(lote_id)
+    lote = datos['lotes'][i]
+    valores = datos[metrica]
+
+    pares = np.array([l['raza'].lower() == lote['raza'].lower() and l['id'] != lote_id for l in datos['lotes']])
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning) # Weeks no other lote reached
+        raza = np.nanmean(valores[pares], axis=0) if pares.any() else np.full(datos['semanas'], np.nan)
+
+    return {
+        'lote': lote,
+        'semanas': datos['semanas'],
+        'lote_curva': _serie(valores[i]),
+        'raza_curva': _serie(raza),
+        'raza_lotes': int(pares.sum()),
+        'estandar': estandar(lote['raza'], metrica, datos['semanas']),
+    }
+
+
+def pico(puesta):
+    """(peak rate, its week) of one lote's weekly laying rates; (None, None) if it never laid."""
+    con_datos = ~np.isnan(puesta) & (puesta > 0)
+    if not con_datos.any():
+        return None, None
+    i = int(np.nanargmax(np.where(con_datos, puesta, -1)))
+    return float(puesta[i]), i + 1
+
+
+def resumen_lotes():
+    """Peak laying rate and its week per lote (for the selector table)."""
+    datos = matriz()
+    filas = []
+    for i, lote in enumerate(datos['lotes']):
+        puesta = datos['puesta'][i]
+        tasa, semana = pico(puesta)
+        filas.append({
+            **lote,
+            'pico_puesta': round(tasa, 1) if tasa is not None else None,
+            'semana_pico': semana,
+            'semanas_vida': int((~np.isnan(puesta)).sum()),
+        })
+    return filas
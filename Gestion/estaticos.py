@@ -0,0 +1,99 @@
+"""
+Static asset pipeline.
+
+- Third-party CSS/JS/fonts are vendored under Gestion/static/vendor/ (vendor_static
+  downloads the pinned versions listed in VENDOR) and referenced with {% vendor %}, which
+  falls back to the CDN while the local copy has not been collected yet.
+- collectstatic (ComprimidoManifestStorage) fingerprints every file and writes .gz /
+  .br siblings of the compressible ones, so nothing is compressed per request.
+- middleware.StaticPrecomprimidoMiddleware serves them with far-future cache headers.
+
+Brotli output needs the optional `Brotli` package; without it only .gz files are written.
+"""
+import gzip
+import os
+import urllib.request
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CDN = 'https://cdn.jsdelivr.net/npm/'
+
+# name -> (path under static/, package path on the CDN)
+VENDOR = {
+    'bootstrap-css': ('vendor/bootstrap/css/bootstrap.min.css', 'bootstrap@5.3.0/dist/css/bootstrap.min.css'),
+    'bootstrap-js': ('vendor/bootstrap/js/bootstrap.bundle.min.js', 'bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js'),
+    'bootstrap-icons-css': ('vendor/bootstrap-icons/bootstrap-icons.css', 'bootstrap-icons@1.7.2/font/bootstrap-icons.css'),
+    'chart-js': ('vendor/chart.js/chart.umd.js', 'chart.js@4.4.1/dist/chart.umd.js'),
+}
+# Referenced from the vendored CSS (relative url()), not from templates
+VENDOR_EXTRA = [
+    ('vendor/bootstrap-icons/fonts/bootstrap-icons.woff2', 'bootstrap-icons@1.7.2/font/fonts/bootstrap-icons.woff2'),
+    ('vendor/bootstrap-icons/fonts/bootstrap-icons.woff', 'bootstrap-icons@1.7.2/font/fonts/bootstrap-icons.woff'),
+]
+
+COMPRIMIBLES = ('.css', '.js', '.svg', '.json', '.txt', '.map', '.html', '.xml', '.ttf', '.eot', '.ico')
+MIN_BYTES = 256
+
+
+def descargar(destino, forzar=False):
+    """Downloads every vendored asset into `destino` (the app's static dir). Returns the paths written."""
+    escritos = []
+    for ruta, paquete in [*VENDOR.values(), *VENDOR_EXTRA]:
+        archivo = os.path.join(destino, ruta)
+        if os.path.exists(archivo) and not forzar:
+            continue
+        os.makedirs(os.path.dirname(archivo), exist_ok=True)
+        with urllib.request.urlopen(CDN + paquete, timeout=30) as respuesta, open(archivo, 'wb') as f:
+            f.write(respuesta.read())
+        escritos.append(archivo)
+    return escritos
+
+
+@lru_cache(maxsize=None)
+def url(nombre):
+    """Local (fingerprinted) URL of a vendored asset, or its CDN URL if it is not available locally."""
+    ruta, paquete = VENDOR[nombre]
+    if staticfiles_storage.exists(ruta) or (settings.DEBUG and finders.find(ruta)):
+        return staticfiles_storage.url(ruta)
+    return CDN + paquete
+
+
+def comprimir(ruta):
+    """Writes ruta.gz (and ruta.br) next to a compressible file when it pays off. Returns the suffixes written."""
+    if not ruta.endswith(COMPRIMIBLES):
+        return []
+    with open(ruta, 'rb') as f:
+        datos = f.read()
+    if len(datos) < MIN_BYTES:
+        return []
+
+    escritos = []
+    variantes = [('.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variantes.append(('.br', lambda d: brotli.compress(d, quality=11)))
+    for sufijo, compresor in variantes:
+        comprimido = compresor(datos)
+        if len(comprimido) < len(datos) * 0.95:
+            with open(ruta + sufijo, 'wb') as f:
+                f.write(comprimido)
+            escritos.append(sufijo)
+    return escritos
+
+
+class ComprimidoManifestStorage(ManifestStaticFilesStorage):
+    """Manifest storage (hashed names) that also precompresses every collected file."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        for original, procesado, cambiado in super().post_process(paths, dry_run, **options):
+            if not dry_run and procesado and not isinstance(cambiado, Exception):
+                comprimir(self.path(original))
+                comprimir(self.path(procesado))
+            yield original, procesado, cambiado
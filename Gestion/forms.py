@@ -1,4 +1,5 @@
 from django import forms
+from django.utils import timezone
 from .models import (
     Articulo, Galpon, Lote, RegistroBajas,
     MovimientoInterno, Entidad, CabeceraTransaccion, DetalleTransaccion,
@@ -74,6 +75,14 @@ class MovimientoInternoForm(forms.ModelForm):
             'fecha': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
         }
 
+    def clean_fecha(self):
+        # The widget only carries a date: keep the current time for today's movements so
+        # they are appended to the kardex; past dates are backdated inserts at that day.
+        fecha = self.cleaned_data['fecha']
+        if fecha and timezone.localdate(fecha) == timezone.localdate():
+            return timezone.now()
+        return fecha
+
 class RegistroVacunacionForm(forms.ModelForm):
     class Meta:
         model = RegistroVacunacion
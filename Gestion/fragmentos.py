@@ -0,0 +1,151 @@
+"""
+Template fragment cache with data versions.
+
+A fragment ({% fragmento 'nombre' dep1 dep2 ... %} in gestion_extras) is cached under a
+key built from the current version of each model instance / scope it depends on, plus
+any other value it varies on (page, query string, date...). Signal handlers only bump
+versions (after commit); stale fragments are never deleted, they stop being addressed
+and expire on their own. Collection-wide scopes are versioned per farm, so a write only
+stales the pages of its own farm (and the unscoped ones).
+
+Hits and misses are counted per fragment name (see the fragment_cache_stats command), in
+process memory first: rendering a fragment never writes to the shared cache on a hit,
+each process adds its counts in one flush every ESTADISTICAS_CADA seconds.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+
+from . import granjas
+
+FRAGMENTO_TIMEOUT = 60 * 10
+AMBITOS = {'articulos', 'lotes', 'galpones'} # Collection-wide scopes usable as string deps
+
+PREFIJO = 'fragmentos'
+CACHE_NOMBRES = f'{PREFIJO}:nombres'
+ESTADISTICAS_CADA = 60 # Seconds between flushes of a process' hit/miss counts to the cache
+
+_contadores = {} # (nombre, 'hit' | 'miss') -> count not flushed yet
+_contadores_lock = threading.Lock()
+_volcado = 0.0
+
+
+def ambito(objeto):
+    """Scope of a model instance ('lote:5'), or None for a plain vary-on value."""
+    if isinstance(objeto, models.Model):
+        return f"{objeto._meta.model_name}:{objeto.pk}"
+    if isinstance(objeto, str) and objeto in AMBITOS:
+        return objeto
+    return None
+
+
+def _clave_version(nombre):
+    return f'{PREFIJO}:v:{nombre}'
+
+
+def versiones(ambitos):
+    """{scope: version}. Missing versions start at a unique value so old keys can never match again."""
+    claves = [_clave_version(a) for a in ambitos]
+    encontradas = cache.get_many(claves)
+    for clave in claves:
+        if clave not in encontradas:
+            cache.add(clave, time.time_ns(), None)
+            encontradas[clave] = cache.get(clave)
+    return {a: encontradas[_clave_version(a)] for a in ambitos}
+
+
+def _por_granja(a, sufijo):
+    """Collection-wide scopes are per farm; instance scopes are unique already."""
+    return f"{a}:{sufijo}" if a in AMBITOS else a
+
+
+def invalidar(*ambitos, granja=None):
+    """
+    Bumps the version of each scope (model instance or scope name) once the transaction
+    commits. granja: farm of the row that changed, for the collection-wide scopes.
+    """
+    ambitos = [a if isinstance(a, str) else ambito(a) for a in ambitos]
+    ambitos = [_por_granja(a, s) for a in ambitos for s in (granjas.sufijos(granja) if a in AMBITOS else [None])]
+
+    def _invalidar():
+        for a in ambitos:
+            try:
+                cache.incr(_clave_version(a))
+            except ValueError: # Never read (or evicted): nothing cached under it
+                pass
+    transaction.on_commit(_invalidar)
+
+
+def clave(nombre, dependencias):
+    ambitos = [_por_granja(a, granjas.sufijo()) for a in map(ambito, dependencias) if a]
+    partes = [f"{a}={v}" for a, v in versiones(ambitos).items()]
+    partes += [str(d) for d in dependencias if ambito(d) is None]
+    return f"{PREFIJO}:f:{nombre}:{granjas.sufijo()}:{hashlib.md5('|'.join(partes).encode()).hexdigest()}"
+
+
+def _contar(nombre, resultado):
+    """Counts in process memory; the cache only sees a flush every ESTADISTICAS_CADA seconds."""
+    with _contadores_lock:
+        _contadores[nombre, resultado] = _contadores.get((nombre, resultado), 0) + 1
+        if time.monotonic() - _volcado < getattr(settings, 'GESTION_FRAGMENTOS_STATS_SEGUNDOS', ESTADISTICAS_CADA):
+            return
+    volcar_estadisticas()
+
+
+def volcar_estadisticas():
+    """Adds this process' pending hit/miss counts to the shared ones (one incr per counter)."""
+    global _volcado
+    with _contadores_lock:
+        pendientes = dict(_contadores)
+        _contadores.clear()
+        _volcado = time.monotonic()
+    if not pendientes:
+        return
+
+    nombres = cache.get(CACHE_NOMBRES) or set()
+    if not {n for n, _ in pendientes} <= nombres:
+        cache.set(CACHE_NOMBRES, nombres | {n for n, _ in pendientes}, None)
+    for (nombre, resultado), n in pendientes.items():
+        contador = f'{PREFIJO}:{resultado}:{nombre}'
+        try:
+            cache.incr(contador, n)
+        except ValueError: # First count (or evicted)
+            if not cache.add(contador, n, None):
+                cache.incr(contador, n)
+
+
+def render(nombre, dependencias, renderizar):
+    """Cached output of renderizar() for this fragment and the current data versions."""
+    k = clave(nombre, dependencias)
+    html = cache.get(k)
+    if html is not None:
+        _contar(nombre, 'hit')
+        return html
+
+    _contar(nombre, 'miss')
+    html = renderizar()
+    cache.set(k, html, FRAGMENTO_TIMEOUT)
+    return html
+
+
+def estadisticas():
+    """
+    [(nombre, hits, misses, hit ratio %)] of every fragment rendered so far. Counts of
+    other processes show up once they flush (at most ESTADISTICAS_CADA seconds late).
+    """
+    volcar_estadisticas()
+    filas = []
+    for nombre in sorted(cache.get(CACHE_NOMBRES) or ()):
+        hits = cache.get(f'{PREFIJO}:hit:{nombre}', 0)
+        misses = cache.get(f'{PREFIJO}:miss:{nombre}', 0)
+        filas.append((nombre, hits, misses, round(hits * 100 / (hits + misses), 1) if hits + misses else 0))
+    return filas
+
+
+def reiniciar_estadisticas():
+    nombres = cache.get(CACHE_NOMBRES) or ()
+    cache.delete_many([f'{PREFIJO}:{r}:{n}' for n in nombres for r in ('hit', 'miss')])
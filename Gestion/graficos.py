@@ -0,0 +1,140 @@
+"""
+Chart data for the health dashboard (salud_dashboard).
+
+The daily metrics of every lote are computed with one grouped query plus the population
+snapshots, then each series is downsampled on the server to about as many points as the
+chart is wide (pixels), whatever the period:
+
+- Rates (laying, feed per bird, feed per egg): largest-triangle-three-buckets (LTTB),
+  which keeps the visual shape of the line.
+- Mortality: min/max per bucket, so a one-day spike is never averaged away.
+
+The payload is columnar: the day axis is sent as offsets from `inicio`, and every
+series as two parallel arrays (x, y) instead of a list of point objects.
+"""
+import datetime
+
+import numpy as np
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+
+from . import poblacion
+from .models import MovimientoInterno, TipoMovimiento
+
+PUNTOS_MIN = 20
+PUNTOS_MAX = 2000
+PUNTOS_DEFECTO = 600
+
+COLORES = [
+    'rgba(255, 99, 132, 1)',
+    'rgba(54, 162, 235, 1)',
+    'rgba(255, 206, 86, 1)',
+    'rgba(75, 192, 192, 1)',
+    'rgba(153, 102, 255, 1)',
+    'rgba(255, 159, 64, 1)',
+]
+
+
+def lttb(y, puntos):
+    """Indices of the `puntos` points of y (x = index) kept by largest-triangle-three-buckets."""
+    n = len(y)
+    if puntos >= n or puntos < 3:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    # Inner points [1, n-1) split into puntos-2 buckets; first and last are always kept
+    bordes = np.floor(np.arange(puntos - 1) * (n - 2) / (puntos - 2)).astype(int) + 1
+    elegidos = [0]
+    for i in range(puntos - 2):
+        ini, fin = bordes[i], bordes[i + 1]
+        if i + 2 < len(bordes):
+            cx, cy = (bordes[i + 1] + bordes[i + 2] - 1) / 2, y[bordes[i + 1]:bordes[i + 2]].mean()
+        else:
+            cx, cy = n - 1, y[-1]
+        a = elegidos[-1]
+        x = np.arange(ini, fin)
+        areas = np.abs((a - cx) * (y[ini:fin] - y[a]) - (a - x) * (cy - y[a]))
+        elegidos.append(ini + int(areas.argmax()))
+    elegidos.append(n - 1)
+    return np.array(elegidos)
+
+
+def minmax(y, puntos):
+    """Indices of the minimum and maximum of each of puntos/2 buckets (plus both ends), in order."""
+    n = len(y)
+    if puntos >= n or puntos < 4:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    bordes = np.linspace(0, n, puntos // 2 + 1).astype(int)
+    elegidos = {0, n - 1}
+    for ini, fin in zip(bordes[:-1], bordes[1:]):
+        if fin > ini:
+            elegidos.update((ini + int(y[ini:fin].argmin()), ini + int(y[ini:fin].argmax())))
+    return np.array(sorted(elegidos))
+
+
+def _columnas(y, indices, decimales):
+    valores = np.round(y[indices], decimales)
+    return [indices.tolist(), (valores.astype(int) if decimales == 0 else valores).tolist()]
+
+
+def diarias(lotes, desde, hasta):
+    """
+    Daily metrics per lote over [desde, hasta]: {metric: lotes x days array}. Days
+    without birds count as one bird (as before), days without eggs as 0 g/egg.
+    """
+    dias = (hasta - desde).days + 1
+    fila = {l.pk: i for i, l in enumerate(lotes)}
+    huevos, alimento = np.zeros((len(lotes), dias)), np.zeros((len(lotes), dias))
+    movimientos = (
+        MovimientoInterno.objects.filter(lote_id__in=fila, fecha__date__range=[desde, hasta])
+        .annotate(dia=TruncDate('fecha')).values('lote_id', 'dia', 'tipo_movimiento').annotate(total=Sum('cantidad'))
+    )
+    for m in movimientos:
+        destino = huevos if m['tipo_movimiento'] == TipoMovimiento.PRODUCCION else alimento
+        destino[fila[m['lote_id']], (m['dia'] - desde).days] += float(m['total'])
+
+    aves, bajas = np.ones((len(lotes), dias)), np.zeros((len(lotes), dias))
+    for lote in lotes:
+        serie = poblacion.serie_poblacion(lote.pk, desde, hasta)
+        vivas = np.array([serie[desde + datetime.timedelta(days=d)] for d in range(dias)], dtype=float)
+        aves[fila[lote.pk]] = np.where(vivas[:, 0] > 0, vivas[:, 0], 1)
+        bajas[fila[lote.pk]] = vivas[:, 1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'puesta': huevos / aves * 100,
+            'consumo': alimento / aves * 1000,
+            'mortalidad': bajas,
+            'eficiencia': np.where(huevos > 0, alimento * 1000 / huevos, 0),
+        }
+
+
+# metric -> (downsampler, decimals)
+REDUCCION = {
+    'puesta': (lttb, 1),
+    'consumo': (lttb, 1),
+    'mortalidad': (minmax, 0),
+    'eficiencia': (lttb, 1),
+}
+
+
+def salud(lotes, desde, hasta, puntos=PUNTOS_DEFECTO):
+    """
+    Compact payload for the dashboard charts:
+    {'inicio', 'dias', 'lotes': [{'label', 'color'}], 'series': {metric: [[x...], [y...]] per lote}}.
+    """
+    puntos = min(max(int(puntos), PUNTOS_MIN), PUNTOS_MAX)
+    lotes = list(lotes)
+    metricas = diarias(lotes, desde, hasta)
+    series = {}
+    for metrica, (reducir, decimales) in REDUCCION.items():
+        series[metrica] = [_columnas(y, reducir(y, puntos), decimales) for y in metricas[metrica]]
+    return {
+        'inicio': desde.isoformat(),
+        'dias': (hasta - desde).days + 1,
+        'lotes': [
+            {'label': f"{l.galpon.nombre} ({l.raza})", 'color': COLORES[i % len(COLORES)]}
+            for i, l in enumerate(lotes)
+        ],
+        'series': series,
+    }
@@ -0,0 +1,175 @@
+"""
+Multi-farm tenancy.
+
+Galpon, Articulo, Entidad and CabeceraTransaccion belong to a Granja; every other farm
+table hangs from one of them (lotes from galpones, movements from lotes, kardex from
+articles...). middleware.GranjaMiddleware activates the farm of the request, and while
+one is active the default manager of every EnGranja model filters by it through
+RUTA_GRANJA ('granja' on the four owners, the join path on their dependents). The
+owner tables index (granja, ...) first, so a farm's queries only walk its own rows.
+
+Outside a request (commands, outbox worker) no farm is active and the managers see
+every farm; new owner rows go to the active farm, else to the default one. `todos` is
+the unscoped manager for code that must see every farm.
+
+Users work on the farms they are members of (superusers: all of them); a user with no
+membership works on the default farm, so a single-farm install needs no setup. Each
+user's list is cached under a version that farm and membership changes bump, so a
+request (kiosk taps included) does not query Granja.
+
+Cached data computed under a farm is keyed by sufijo(); a write invalidates only the
+suffixes of its own row's farm (sufijos(de_fila(row))), never every farm.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.cache import cache
+from django.db import models, transaction
+
+SESION = 'granja'
+CACHE_VERSION = 'granjas:version'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+_actual = ContextVar('granja', default=None)
+
+
+def actual():
+    """Id of the active farm, or None (no filtering)."""
+    return _actual.get()
+
+
+@contextmanager
+def activar(granja_id):
+    token = _actual.set(granja_id)
+    try:
+        yield
+    finally:
+        _actual.reset(token)
+
+
+_predeterminada = None
+
+
+def predeterminada():
+    """
+    Id of the default farm (the oldest one), read once per process: it is the default of
+    every owner row created outside a request. Created if missing (not remembered then,
+    the creating transaction may still roll back).
+    """
+    global _predeterminada
+    if _predeterminada is None:
+        from .models import Granja
+        pk = Granja.objects.order_by('pk').values_list('pk', flat=True).first()
+        if pk is None:
+            return Granja.objects.create(nombre='Principal').pk
+        _predeterminada = pk
+    return _predeterminada
+
+
+def olvidar_predeterminada():
+    """A farm was added or removed: read the default one again on next use."""
+    global _predeterminada
+    _predeterminada = None
+
+
+def por_defecto():
+    """Default of the owner foreign keys: the active farm, else the default one (no query once known)."""
+    return actual() or predeterminada()
+
+
+def disponibles(usuario):
+    """Farms the user may switch to, in display order (cached until farms or memberships change)."""
+    from .models import Granja
+    version = cache.get(CACHE_VERSION)
+    if version is None:
+        cache.add(CACHE_VERSION, time.time_ns(), None)
+        version = cache.get(CACHE_VERSION)
+    clave = f"granjas:usuario:{usuario.pk}:{int(usuario.is_superuser)}:{version}"
+    lista = cache.get(clave)
+    if lista is None:
+        granjas = Granja.objects.order_by('nombre')
+        if usuario.is_superuser:
+            lista = list(granjas)
+        else:
+            lista = list(granjas.filter(usuarios=usuario)) or list(granjas.filter(pk=predeterminada()))
+        cache.set(clave, lista, CACHE_TIMEOUT)
+    return lista
+
+
+def invalidar_usuarios():
+    """A farm or a membership changed: every user's cached list goes stale (after commit)."""
+    def _invalidar():
+        try:
+            cache.incr(CACHE_VERSION)
+        except ValueError: # Never read: nothing cached under it
+            pass
+    transaction.on_commit(_invalidar)
+
+
+def de_peticion(request):
+    """(active farm, farms available) for the request; (None, []) when anonymous."""
+    if not request.user.is_authenticated:
+        return None, []
+    granjas = disponibles(request.user)
+    elegida = request.session.get(SESION)
+    return next((g for g in granjas if g.pk == elegida), granjas[0] if granjas else None), granjas
+
+
+def sufijo():
+    """Cache key suffix for data computed under the active farm."""
+    return f"g{actual() or 0}"
+
+
+def sufijos(granja_id):
+    """Suffixes whose cached data includes the farm's rows: its own and the unscoped one (g0)."""
+    return [f"g{granja_id}", 'g0']
+
+
+def de_fila(fila):
+    """Farm id of a row of an EnGranja model, following RUTA_GRANJA (loaded relations cost no query)."""
+    *saltos, ultimo = fila.RUTA_GRANJA.split('__')
+    for salto in saltos:
+        fila = getattr(fila, salto)
+    return getattr(fila, f'{ultimo}_id')
+
+
+class GranjaQuerySet(models.QuerySet):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._granja = None
+
+    def _clone(self):
+        clon = super()._clone()
+        clon._granja = self._granja
+        return clon
+
+    def de_granja(self, granja_id=None):
+        """Rows of the farm (default: the active one); unchanged when there is none."""
+        granja_id = granja_id or actual()
+        if granja_id is None or self._granja == granja_id or self.query.is_sliced or self.query.combinator:
+            return self
+        qs = self.filter(**{self.model.RUTA_GRANJA: granja_id})
+        qs._granja = granja_id
+        return qs
+
+    def all(self):
+        # Querysets built with no farm active (form fields declared at import time) pick
+        # up the request's farm when forms copy them
+        return super().all().de_granja()
+
+
+class GranjaManager(models.Manager.from_queryset(GranjaQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().de_granja()
+
+
+class EnGranja(models.Model):
+    """Model whose default manager filters by the active farm. RUTA_GRANJA: lookup to the farm."""
+    RUTA_GRANJA = 'granja'
+
+    objects = GranjaManager()
+    todos = models.Manager()
+
+    class Meta:
+        abstract = True
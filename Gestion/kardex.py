@@ -0,0 +1,115 @@
+"""
+Kardex (LogArticulo) chain maintenance.
+
+Entries of an article form a chain ordered by (fecha, id) where each saldo_anterior
+equals the previous saldo_posterior. Inserting, editing or removing an entry at any
+point posts the stock delta and shifts only the suffix of the chain after that point
+with one set-based UPDATE, instead of replaying the whole history.
+"""
+import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import BooleanField, ExpressionWrapper, F, Q
+from django.utils import timezone
+
+from . import alertas
+from .cantidades import valor
+from .models import Articulo, LogArticulo
+
+
+def fecha_transaccion(fecha):
+    """
+    Chain position for a transaction dated `fecha` (DateField): now for today,
+    end of that day for past (or future) dates.
+    """
+    if fecha == timezone.localdate():
+        return timezone.now()
+    return timezone.make_aware(datetime.datetime.combine(fecha, datetime.time.max))
+
+
+def _sufijo(articulo_id, fecha, pk):
+    """Entries after (fecha, pk) in the article's chain."""
+    return LogArticulo.objects.filter(articulo_id=articulo_id).filter(
+        Q(fecha__gt=fecha) | Q(fecha=fecha, pk__gt=pk)
+    )
+
+
+def _mover_stock(articulo, delta):
+    """
+    Applies delta atomically in the DB and returns (before, after); keeps the instance in sync.
+    The below-minimum flag is updated in the same statement (SET sees the pre-update row).
+    """
+    if delta:
+        Articulo.objects.filter(pk=articulo.pk).update(
+            stock_actual=F('stock_actual') + valor(delta),
+            bajo_minimo=ExpressionWrapper(
+                Q(controlar_stock=True, stock_actual__lte=F('stock_minimo') - valor(delta)), output_field=BooleanField()
+            ),
+        )
+        alertas.marcar(articulo.pk, articulo.granja_id)
+    despues, articulo.bajo_minimo = Articulo.objects.filter(pk=articulo.pk).values_list('stock_actual', 'bajo_minimo').get()
+    articulo.stock_actual = despues
+    articulo.marcar_limpios(['stock_actual', 'bajo_minimo'])
+    return despues - delta, despues
+
+
+def registrar(articulo, tipo, cantidad, delta, descripcion, fecha=None, movimiento=None, detalle=None, costo_unitario=None):
+    """
+    Posts `delta` to the article stock and inserts the entry at `fecha` in its chain.
+    Appending (the usual case) costs the same as before; a backdated insert also shifts
+    the saldos of the later entries. The entry is stamped with `costo_unitario`
+    (default: the article's current average cost).
+    """
+    fecha = fecha or timezone.now()
+    delta = Decimal(delta)
+    with transaction.atomic():
+        antes, despues = _mover_stock(articulo, delta) if articulo.controlar_stock else (articulo.stock_actual, articulo.stock_actual)
+        if not articulo.controlar_stock:
+            delta = Decimal(0)
+
+        posteriores = LogArticulo.objects.filter(articulo=articulo, fecha__gt=fecha)
+        if posteriores.exists():
+            previo = LogArticulo.objects.filter(articulo=articulo, fecha__lte=fecha).order_by('-fecha', '-pk').first()
+            if previo:
+                antes = previo.saldo_posterior
+            else:
+                antes = posteriores.order_by('fecha', 'pk').first().saldo_anterior
+            posteriores.update(saldo_anterior=F('saldo_anterior') + valor(delta), saldo_posterior=F('saldo_posterior') + valor(delta))
+
+        return LogArticulo.objects.create(
+            articulo=articulo, fecha=fecha, tipo=tipo, cantidad=cantidad,
+            saldo_anterior=antes, saldo_posterior=antes + delta,
+            descripcion=descripcion, movimiento=movimiento, detalle=detalle,
+            costo_unitario=articulo.costo_promedio if costo_unitario is None else costo_unitario
+        )
+
+
+def ajustar(entrada, cantidad, delta, tipo=None):
+    """
+    Changes an entry in place (same article and position) to a new signed `delta`,
+    posting the difference to the stock and shifting the suffix.
+    """
+    diferencia = Decimal(delta) - (entrada.saldo_posterior - entrada.saldo_anterior)
+    with transaction.atomic():
+        if diferencia and entrada.articulo.controlar_stock:
+            _mover_stock(entrada.articulo, diferencia)
+            _sufijo(entrada.articulo_id, entrada.fecha, entrada.pk).update(
+                saldo_anterior=F('saldo_anterior') + valor(diferencia), saldo_posterior=F('saldo_posterior') + valor(diferencia)
+            )
+            entrada.saldo_posterior += diferencia
+        entrada.cantidad = cantidad
+        entrada.tipo = tipo or entrada.tipo
+        entrada.save(update_fields=['cantidad', 'tipo', 'saldo_posterior'])
+
+
+def revertir(entrada):
+    """Removes an entry from the chain, undoing its stock delta and closing the gap in the suffix."""
+    delta = entrada.saldo_posterior - entrada.saldo_anterior
+    with transaction.atomic():
+        if delta and entrada.articulo.controlar_stock:
+            _mover_stock(entrada.articulo, -delta)
+            _sufijo(entrada.articulo_id, entrada.fecha, entrada.pk).update(
+                saldo_anterior=F('saldo_anterior') - valor(delta), saldo_posterior=F('saldo_posterior') - valor(delta)
+            )
+        entrada.delete()
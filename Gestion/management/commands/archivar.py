@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from Gestion import archivo
+
+
+class Command(BaseCommand):
+    help = 'Mueve al archivo el detalle viejo (lotes cerrados y kardex) dejando filas resumen en las tablas activas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=archivo.RETENCION_DIAS, help='Ventana de retención en días (se corta a inicio de mes)')
+
+    def handle(self, *args, **options):
+        total = archivo.archivar(options['dias'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archivado hasta {archivo.corte(options['dias']):%d/%m/%Y}: "
+            f"{total['movimientos']} movimientos, {total['bajas']} bajas, {total['kardex']} asientos de kardex."
+        ))
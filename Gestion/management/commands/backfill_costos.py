@@ -0,0 +1,51 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Gestion.models import Articulo, LogArticulo, MovimientoInterno
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el costo promedio ponderado de cada artículo recorriendo su kardex y estampa el costo en entradas y consumos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articulo', type=int, action='append', help='Artículo(s) a recalcular (por defecto todos)')
+
+    def handle(self, *args, **options):
+        articulos = Articulo.objects.all()
+        if options['articulo']:
+            articulos = articulos.filter(pk__in=options['articulo'])
+
+        for articulo in articulos:
+            entradas = list(
+                LogArticulo.objects.filter(articulo=articulo)
+                .select_related('detalle', 'movimiento')
+                .order_by('fecha', 'pk')
+            )
+            promedio = Decimal(0)
+            movimientos = []
+            for e in entradas:
+                existencias = e.saldo_anterior
+                if e.tipo == 'COMPRA' and e.detalle_id:
+                    precio = e.detalle.precio_unitario
+                    entra = e.saldo_posterior - e.saldo_anterior
+                    if existencias > 0 and entra > 0:
+                        promedio = (existencias * promedio + entra * precio) / (existencias + entra)
+                    elif entra > 0:
+                        promedio = precio
+                    e.costo_unitario = precio
+                else:
+                    e.costo_unitario = promedio
+                if e.movimiento_id and e.movimiento.tipo_movimiento == 'CONSUMO':
+                    e.movimiento.costo_unitario = promedio
+                    movimientos.append(e.movimiento)
+
+            promedio = promedio.quantize(Decimal('0.0001'))
+            with transaction.atomic():
+                LogArticulo.objects.bulk_update(entradas, ['costo_unitario'], batch_size=1000)
+                MovimientoInterno.objects.bulk_update(movimientos, ['costo_unitario'], batch_size=1000)
+                Articulo.objects.filter(pk=articulo.pk).update(costo_promedio=promedio)
+            self.stdout.write(f"{articulo.nombre}: costo promedio {promedio} ({len(entradas)} entradas)")
+
+        self.stdout.write(self.style.SUCCESS("Costos recalculados."))
@@ -2,6 +2,8 @@ from django.core.management.base import BaseCommand
 from django.db.models import Sum
 from Gestion.models import Articulo, LogArticulo, DetalleTransaccion, MovimientoInterno, TipoOperacion, TipoMovimiento
 from decimal import Decimal
+from django.utils import timezone
+from Gestion import kardex
 
 class Command(BaseCommand):
     help = 'Backfills the LogArticulo table from existing Transactions and Movements'
@@ -35,8 +37,9 @@ class Command(BaseCommand):
                     desc += f" ({d.transaccion.entidad})"
 
                 events.append({
-                    'fecha': d.transaccion.fecha, # This is usually DateField, might need conversion if models changed
+                    'fecha': kardex.fecha_transaccion(d.transaccion.fecha), # DateField -> chain position
                     'pk': d.pk, # Tiebreaker
+                    'source': {'detalle': d},
                     'tipo': tipo_log,
                     'cantidad': d.cantidad,
                     'change': change,
@@ -56,8 +59,9 @@ class Command(BaseCommand):
                 desc = f"{tipo_log.capitalize()}: {m.lote.galpon.nombre} - {m.lote.raza}"
 
                 events.append({
-                    'fecha': m.fecha, # DateField probably
+                    'fecha': m.fecha,
                     'pk': m.pk,
+                    'source': {'movimiento': m},
                     'tipo': tipo_log,
                     'cantidad': m.cantidad,
                     'change': change,
@@ -80,17 +84,13 @@ class Command(BaseCommand):
                 
                 logs_to_create.append(LogArticulo(
                     articulo=articulo,
-                    fecha=ev['fecha'], # Django handles auto_now_add override if we set it explicitly? 
-                    # Actually auto_now_add ignores provided value on create(). 
-                    # We might need to update it after create or use bulk_create which might bypass?
-                    # Standard Django create() ignores it. We must set it manually or override save.
-                    # Or simpler: LogArticulo.fecha is DateTime. transaccion.fecha is Date.
-                    # We will cast Date to DateTime at midnight.
+                    fecha=ev['fecha'],
                     tipo=ev['tipo'],
                     cantidad=ev['cantidad'],
                     saldo_anterior=saldo_anterior,
                     saldo_posterior=saldo_posterior,
-                    descripcion=ev['descripcion']
+                    descripcion=ev['descripcion'],
+                    **ev['source'] # Link to the source so later edits can re-thread the entry
                 ))
 
             # 6. Check for Discrepancy with Current Request Stock
@@ -108,6 +108,8 @@ class Command(BaseCommand):
                 
                 adjustment_log = LogArticulo(
                     articulo=articulo,
+                    # Same instant as the first event (or now); the lower pk keeps it first in the chain
+                    fecha=events[0]['fecha'] if events else timezone.now(),
                     tipo='AJUSTE',
                     cantidad=abs(discrepancy),
                     saldo_anterior=0,
@@ -123,43 +125,7 @@ class Command(BaseCommand):
                 logs_to_create.insert(0, adjustment_log)
 
 
-            # 7. Save Logs
-            # We can't use bulk_create easily if we want to preserve 'fecha' because auto_now_add interferes.
-            # Workaround: created = Log.objects.create(...); created.fecha = val; created.save()
-            # Or temporarily disable auto_now_add in model? No.
-            # Use update() after create?
-            
-            for log in logs_to_create:
-                # We save first to generate ID
-                log.save() 
-                # Now we forcibly update the date because auto_now_add likely overwrote it with NOW()
-                # We need to ensure 'fecha' is a datetime
-                # If ev['fecha'] is date, make it datetime
-                
-                # Since log is already an instance, log.fecha might be set from the list logic
-                # But save() overwrites it if the model field is auto_now_add=True.
-                # Let's check model definition. Yes, auto_now_add=True.
-                
-                original_date = log.fecha # This has the value we passed in logic?
-                # Wait, if I pass 'fecha' to constructor, it stays on the object, but save() ignores it and sets db column to NOW.
-                # So we must update using queryset update to bypass model save() logic
-                
-                # But wait, 'log' in the loop comes from the list defined above. 
-                # If I defined 'fecha' in the constructor, it is in memory.
-                # 'adjustment_log' has no date set in my code above (defaults to None->Now).
-                
-                # Correction:
-                # If ev['fecha'] is set in constructor, we retrieve it.
-                target_date = getattr(log, 'fecha', None)
-                
-                if not target_date:
-                     # For adjustment, pick a very old date or same as first event
-                     if events:
-                         target_date = events[0]['fecha']
-                     else:
-                         from django.utils import timezone
-                         target_date = timezone.now()
-                
-                LogArticulo.objects.filter(pk=log.pk).update(fecha=target_date)
+            # 7. Save Logs (fecha is a plain default now, so bulk_create keeps the historical dates)
+            LogArticulo.objects.bulk_create(logs_to_create, batch_size=1000)
 
         self.stdout.write(self.style.SUCCESS("Backfill Complete."))
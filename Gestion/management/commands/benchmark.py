@@ -0,0 +1,189 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_databases, teardown_databases, setup_test_environment, teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils import timezone
+from Gestion import graficos
+from Gestion.models import Articulo, Lote, Entidad, TipoArticulo, MovimientoInterno, LogArticulo, CabeceraTransaccion
+from io import StringIO
+import json
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+METRICS = ('wall_ms', 'queries', 'peak_kb')
+
+class Command(BaseCommand):
+    help = 'Mide tiempo, queries y memoria de las rutas pesadas (dashboards y escrituras) y compara contra un baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', type=str, default='', help='Lista de galpones por escenario (ej: 2,8,20). Cada escenario se genera en una BD de test con populate_db --scale. Vacío = BD actual')
+        parser.add_argument('--anios', type=int, default=1, help='Años de historia por escenario (con --scales)')
+        parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por ruta (se reporta la mediana)')
+        parser.add_argument('--lineas', type=int, default=10, help='Líneas de detalle en el POST de procesar_transaccion')
+        parser.add_argument('--output', type=str, default='', help='Archivo donde guardar el JSON de resultados')
+        parser.add_argument('--baseline', type=str, default='', help='JSON de una corrida anterior contra el cual comparar')
+        parser.add_argument('--threshold', type=float, default=0.2, help='Regresión tolerada sobre el baseline (0.2 = +20%%)')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            report = {'fecha': timezone.now().isoformat(), 'scales': {}}
+            scales = [s.strip() for s in options['scales'].split(',') if s.strip()]
+
+            if not scales:
+                report['scales']['current'] = self.run_scale(options)
+            for scale in scales:
+                self.stderr.write(f"Generando escenario galpones={scale}...")
+                # Each scenario gets its own empty cache: the configured one belongs to the live database
+                with tempfile.TemporaryDirectory() as tmp, override_settings(CACHES={
+                    'default': {**settings.CACHES['default'], 'LOCATION': os.path.join(tmp, 'cache.sqlite3')},
+                }):
+                    old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+                    try:
+                        call_command('populate_db', scale=True, galpones=int(scale), anios=options['anios'], stdout=StringIO())
+                        report['scales'][scale] = self.run_scale(options)
+                    finally:
+                        teardown_databases(old_config, verbosity=0)
+        finally:
+            teardown_test_environment()
+
+        regressions = []
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                regressions = self.compare(json.load(f), report, options['threshold'])
+            report['regressions'] = regressions
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        self.stdout.write(output)
+
+        if regressions:
+            raise CommandError(f"{len(regressions)} regresiones sobre el baseline (umbral {options['threshold']:.0%})")
+
+    # --- SCENARIO ---
+
+    def run_scale(self, options):
+        # Everything runs inside a transaction that is rolled back, so write paths leave no trace
+        with transaction.atomic():
+            user, _ = User.objects.get_or_create(username='benchmark', defaults={'is_staff': True, 'is_superuser': True})
+            client = Client()
+            client.force_login(user)
+
+            result = {
+                'rows': {
+                    'movimientos': MovimientoInterno.objects.count(),
+                    'kardex': LogArticulo.objects.count(),
+                    'transacciones': CabeceraTransaccion.objects.count(),
+                },
+                'paths': {},
+            }
+            for name, request in self.paths(options):
+                result['paths'][name] = self.measure(client, request, options['repeat'])
+                self.stderr.write(f"  {name}: {result['paths'][name]}")
+
+            transaction.set_rollback(True)
+        return result
+
+    def paths(self, options):
+        """Yields (name, callable(client)) for every benchmarked code path."""
+        yield 'index', lambda c: c.get(reverse('index'))
+        yield 'lote_overview', lambda c: c.get(reverse('lote-overview'))
+        for dias in (30, 90, 365):
+            yield f'salud_dashboard_{dias}', lambda c, dias=dias: c.get(reverse('salud-dashboard'), {'dias': dias})
+            # The page is only the shell: the series are computed and downsampled here
+            yield f'salud_datos_{dias}', lambda c, dias=dias: c.get(reverse('salud-datos'), {'dias': dias, 'puntos': graficos.PUNTOS_DEFECTO})
+        yield 'auditoria_dashboard', lambda c: c.get(reverse('auditoria-dashboard'))
+
+        articulo = Articulo.objects.annotate(n=Count('logs')).order_by('-n').first()
+        if articulo:
+            yield 'articulo_kardex', lambda c: c.get(reverse('articulo-kardex', args=[articulo.pk]))
+
+        lote = Lote.objects.filter(estado=True).first()
+        alimento = Articulo.objects.filter(tipo=TipoArticulo.INSUMO, es_insumo_receta=False).first()
+        if lote and alimento:
+            yield 'kiosco_consumo', lambda c: c.post(
+                reverse('kiosco-consumo', args=[lote.pk]),
+                {'articulo': alimento.pk, 'cantidad': '12.5'}
+            )
+
+        proveedor = Entidad.objects.filter(es_proveedor=True).first()
+        insumos = list(Articulo.objects.filter(controlar_stock=True).order_by('pk')[:options['lineas']])
+        if proveedor and insumos:
+            data = {
+                'entidad': proveedor.pk,
+                'fecha': timezone.localdate().isoformat(),
+                'numero_documento': 'BENCH-1',
+                'estado_pago': 'PENDIENTE',
+                'metodo_pago': 'EFECTIVO',
+                'detalles-TOTAL_FORMS': options['lineas'],
+                'detalles-INITIAL_FORMS': 0,
+                'detalles-MIN_NUM_FORMS': 0,
+                'detalles-MAX_NUM_FORMS': 1000,
+            }
+            for i in range(options['lineas']):
+                data[f'detalles-{i}-articulo'] = insumos[i % len(insumos)].pk
+                data[f'detalles-{i}-cantidad'] = '10'
+                data[f'detalles-{i}-precio_unitario'] = '100'
+            yield 'procesar_transaccion', lambda c: c.post(reverse('compra-create'), data)
+
+    def measure(self, client, request, repeat):
+        runs = []
+        # Timed runs go without tracemalloc (it slows Python down several times); one extra run traces memory
+        for traced in [False] * repeat + [True]:
+            # Each run is rolled back so repeated writes see the same data
+            with transaction.atomic():
+                if traced:
+                    tracemalloc.start()
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = request(client)
+                    wall = time.perf_counter() - start
+                if traced:
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                transaction.set_rollback(True)
+
+            if response.status_code >= 400:
+                raise CommandError(f"{response.request['PATH_INFO']} respondió {response.status_code}")
+            if not traced:
+                runs.append({'wall_ms': wall * 1000, 'queries': len(queries)})
+
+        return {
+            'status': response.status_code,
+            'wall_ms': round(statistics.median(r['wall_ms'] for r in runs), 2),
+            'queries': max(r['queries'] for r in runs),
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    # --- BASELINE ---
+
+    def compare(self, baseline, report, threshold):
+        regressions = []
+        for scale, result in report['scales'].items():
+            base_paths = baseline.get('scales', {}).get(scale, {}).get('paths', {})
+            for name, metrics in result['paths'].items():
+                base = base_paths.get(name)
+                if not base:
+                    continue
+                for metric in METRICS:
+                    if base[metric] and metrics[metric] > base[metric] * (1 + threshold):
+                        regressions.append({
+                            'scale': scale, 'path': name, 'metric': metric,
+                            'baseline': base[metric], 'actual': metrics[metric],
+                            'ratio': round(metrics[metric] / base[metric], 2),
+                        })
+        for r in regressions:
+            self.stderr.write(self.style.ERROR(f"REGRESIÓN {r['scale']}/{r['path']} {r['metric']}: {r['baseline']} -> {r['actual']} (x{r['ratio']})"))
+        return regressions
@@ -0,0 +1,66 @@
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from Gestion.cache_sqlite import SQLiteCache
+from multiprocessing import Pool
+import os
+import tempfile
+import time
+
+def _incrementar(args):
+    """Worker of the cross-process test: bumps the shared counter n times."""
+    ruta, n = args
+    cache = SQLiteCache(ruta, {})
+    for _ in range(n):
+        cache.incr('contador')
+    cache.cerrar()
+
+class Command(BaseCommand):
+    help = 'Compara el backend de caché SQLite compartido contra locmem y file-based (ops/seg) y verifica incr entre procesos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ops', type=int, default=2000, help='Operaciones por prueba')
+        parser.add_argument('--procesos', type=int, default=4, help='Procesos para la prueba de incr concurrente')
+
+    def handle(self, *args, **options):
+        n = options['ops']
+        valor = {'filas': [{'id': i, 'nombre': f'Articulo {i}', 'stock': i * 1.5} for i in range(20)]}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            backends = {
+                'locmem': LocMemCache('bench', {'OPTIONS': {'MAX_ENTRIES': n * 2}}),
+                'file': FileBasedCache(os.path.join(tmp, 'file'), {'OPTIONS': {'MAX_ENTRIES': n * 2}}),
+                'sqlite': SQLiteCache(os.path.join(tmp, 'cache.sqlite3'), {'OPTIONS': {'MAX_ENTRIES': n * 2}}),
+            }
+            pruebas = {
+                'set': lambda c: [c.set(f'k{i}', valor) for i in range(n)],
+                'get': lambda c: [c.get(f'k{i}') for i in range(n)],
+                'get_many(50)': lambda c: [c.get_many([f'k{j}' for j in range(i, i + 50)]) for i in range(0, n, 50)],
+                'set_many(50)': lambda c: [c.set_many({f'm{j}': valor for j in range(i, i + 50)}) for i in range(0, n, 50)],
+                'incr': lambda c: [c.incr('v') for _ in range(n)],
+            }
+
+            self.stdout.write(f"{'prueba':<14}" + ''.join(f"{nombre:>12}" for nombre in backends) + "   (ops/seg)")
+            for prueba, fn in pruebas.items():
+                fila = f"{prueba:<14}"
+                for cache in backends.values():
+                    cache.set('v', 0)
+                    inicio = time.perf_counter()
+                    fn(cache)
+                    fila += f"{n / (time.perf_counter() - inicio):>12.0f}"
+                self.stdout.write(fila)
+
+            # Shared across processes: every worker sees and bumps the same counter
+            ruta = os.path.join(tmp, 'shared.sqlite3')
+            compartido = SQLiteCache(ruta, {})
+            compartido.set('contador', 0)
+            procesos, por_proceso = options['procesos'], n // options['procesos']
+            with Pool(procesos) as pool:
+                pool.map(_incrementar, [(ruta, por_proceso)] * procesos)
+            total = compartido.get('contador')
+            esperado = procesos * por_proceso
+            estilo = self.style.SUCCESS if total == esperado else self.style.ERROR
+            self.stdout.write(estilo(f"incr entre {procesos} procesos: {total} / {esperado}"))
+            for cache in backends.values():
+                cache.cerrar()
+            compartido.cerrar()
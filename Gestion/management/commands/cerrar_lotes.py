@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from Gestion import cierres
+from Gestion.models import Lote
+
+
+class Command(BaseCommand):
+    help = 'Genera el resumen de cierre de los lotes cerrados que no lo tienen (o lo recalcula con --recalcular)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, action='append', help='Lote(s) a procesar (por defecto todos los cerrados)')
+        parser.add_argument('--recalcular', action='store_true', help='Recalcula también los resúmenes existentes')
+
+    def handle(self, *args, **options):
+        lotes = Lote.objects.filter(estado=False).order_by('pk')
+        if options['lote']:
+            lotes = lotes.filter(pk__in=options['lote'])
+        if not options['recalcular']:
+            lotes = lotes.filter(cierre__isnull=True)
+
+        n = 0
+        for lote in lotes:
+            (cierres.recalcular if options['recalcular'] else cierres.cerrar)(lote)
+            n += 1
+        self.stdout.write(self.style.SUCCESS(f"{n} resúmenes de cierre generados."))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from Gestion import pronostico
+
+class Command(BaseCommand):
+    help = 'Recalcula el pronóstico de consumo de alimento por lote (programar diariamente, ej. cron a las 02:00)'
+
+    def handle(self, *args, **options):
+        n = pronostico.calcular()
+        self.stdout.write(self.style.SUCCESS(f"Pronóstico actualizado: {n} combinaciones lote/artículo."))
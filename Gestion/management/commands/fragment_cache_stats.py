@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from Gestion import fragmentos
+
+class Command(BaseCommand):
+    help = 'Muestra los aciertos/fallos del caché de fragmentos de plantilla'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reiniciar', action='store_true', help='Pone los contadores en cero después de mostrarlos')
+
+    def handle(self, *args, **options):
+        filas = fragmentos.estadisticas()
+        if not filas:
+            self.stdout.write("Sin fragmentos renderizados todavía.")
+        for nombre, hits, misses, ratio in filas:
+            self.stdout.write(f"{nombre:<20} aciertos={hits:<8} fallos={misses:<8} {ratio}%")
+
+        if options['reiniciar']:
+            fragmentos.reiniciar_estadisticas()
+            self.stdout.write(self.style.SUCCESS("Contadores reiniciados."))
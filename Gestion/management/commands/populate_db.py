@@ -1,14 +1,31 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
+from django.db import transaction
 from Gestion.models import *
+from Gestion import poblacion, ocupacion
 from django.utils import timezone
+from decimal import Decimal, ROUND_FLOOR
+import datetime
 import random
 from datetime import timedelta
 
 class Command(BaseCommand):
     help = 'Popula la base de datos con datos de prueba'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', action='store_true', help='Genera un volumen realista de datos para benchmarks (bulk_create)')
+        parser.add_argument('--galpones', type=int, default=8, help='Cantidad de galpones (modo --scale)')
+        parser.add_argument('--entidades', type=int, default=100, help='Cantidad de clientes/proveedores (modo --scale)')
+        parser.add_argument('--anios', type=int, default=3, help='Años de historia diaria (modo --scale)')
+        parser.add_argument('--aves', type=int, default=5000, help='Aves iniciales por lote (modo --scale)')
+        parser.add_argument('--consumos-dia', type=int, default=2, help='Registros de consumo por lote y día (modo --scale)')
+        parser.add_argument('--seed', type=int, default=42, help='Semilla aleatoria (modo --scale)')
+        parser.add_argument('--chunk', type=int, default=5000, help='Tamaño de lote para bulk_create (modo --scale)')
+
     def handle(self, *args, **kwargs):
+        if kwargs.get('scale'):
+            return self.handle_scale(**kwargs)
+
         self.stdout.write('Iniciando populacion...')
 
         # 1. Superuser
@@ -230,3 +247,211 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS('Movimientos Internos (Produccion/Consumo) creados'))
         self.stdout.write(self.style.SUCCESS('Transacciones de prueba creadas'))
+
+    # --- SCALE MODE ---
+
+    # Length of a laying cycle and empty-barn gap between lotes (days)
+    DURACION_CICLO = 560
+    VACIO_SANITARIO = 21
+
+    def handle_scale(self, **options):
+        """
+        Generates years of daily farm history with bulk_create.
+        Signals do not fire on bulk_create, so stock, population and the
+        kardex running balance are threaded in memory while generating
+        (events are produced in chronological order) and written in chunks.
+        """
+        rng = random.Random(options['seed'])
+        self.chunk = options['chunk']
+        self.pending = {}
+        self.rows = 0
+        dias = options['anios'] * 365
+        today = timezone.localdate()
+        start = today - timedelta(days=dias)
+        tz = timezone.get_current_timezone()
+
+        self.stdout.write(f"Generando {dias} días para {options['galpones']} galpones (seed={options['seed']})...")
+
+        if not User.objects.filter(username='admin').exists():
+            User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+
+        with transaction.atomic():
+            self._generate_scale(rng, options, start, today, tz)
+
+        self.stdout.write(self.style.SUCCESS(f'{self.rows} filas generadas.'))
+
+    def _queue(self, obj):
+        """Buffers an object and flushes its model when the chunk is full."""
+        model = type(obj)
+        self.pending.setdefault(model, []).append(obj)
+        if len(self.pending[model]) >= self.chunk:
+            self._flush()
+
+    def _flush(self):
+        # Parents first: details need header pks, kardex rows only need articles
+        for model in (CabeceraTransaccion, DetalleTransaccion, MovimientoInterno, RegistroBajas, RegistroVacunacion, LogArticulo):
+            objs = self.pending.pop(model, [])
+            if objs:
+                model.objects.bulk_create(objs, batch_size=self.chunk)
+                self.rows += len(objs)
+
+    def _generate_scale(self, rng, options, start, today, tz):
+        # 1. Masters
+        alimento = Articulo.objects.create(nombre="Alimento Postura (Scale)", tipo=TipoArticulo.INSUMO, unidad_medida=Articulo.UnidadMedida.KG, stock_minimo=2000, precio_referencia=450)
+        huevo_blanco = Articulo.objects.create(nombre="Huevo Blanco (Scale)", tipo=TipoArticulo.PRODUCTO, stock_minimo=1000, precio_referencia=150)
+        huevo_color = Articulo.objects.create(nombre="Huevo Color (Scale)", tipo=TipoArticulo.PRODUCTO, stock_minimo=1000, precio_referencia=180)
+        bandeja = Articulo.objects.create(nombre="Bandeja 30 Huevos (Scale)", tipo=TipoArticulo.PRODUCTO, controlar_stock=False, stock_minimo=0, precio_referencia=4000)
+        Receta.objects.create(producto=bandeja, ingrediente=huevo_blanco, cantidad=30)
+        articulos = [alimento, huevo_blanco, huevo_color, bandeja]
+        saldo = {a.pk: Decimal(0) for a in articulos}
+
+        proveedores = Entidad.objects.bulk_create([
+            Entidad(nombre_razon_social=f"Proveedor Scale {i}", rut=f"76.{i:03d}.000-{i % 10}", es_proveedor=True)
+            for i in range(max(1, options['entidades'] // 10))
+        ])
+        clientes = Entidad.objects.bulk_create([
+            Entidad(nombre_razon_social=f"Cliente Scale {i}", rut=f"12.{i:03d}.000-{i % 10}", es_cliente=True)
+            for i in range(max(1, options['entidades'] - len(proveedores)))
+        ])
+
+        # 2. Galpones and lotes: each barn houses consecutive cycles, the last one stays active
+        galpones = Galpon.objects.bulk_create([
+            Galpon(nombre=f"Galpón S{i + 1}", capacidad_max=options['aves'] + 1000)
+            for i in range(options['galpones'])
+        ])
+        ciclos = []  # (lote, first day, last day, egg article)
+        for i, galpon in enumerate(galpones):
+            inicio = start + timedelta(days=rng.randint(0, 60))
+            huevo = huevo_blanco if i % 2 == 0 else huevo_color
+            raza = 'Lohmann White' if huevo is huevo_blanco else 'Hy-Line Brown'
+            while inicio <= today:
+                fin = inicio + timedelta(days=self.DURACION_CICLO)
+                lote = Lote(
+                    galpon=galpon, raza=raza, fecha_inicio=inicio,
+                    aves_iniciales=options['aves'], aves_actuales=options['aves'],
+                    estado=fin > today,
+                )
+                ciclos.append((lote, inicio, min(fin, today), huevo))
+                inicio = fin + timedelta(days=self.VACIO_SANITARIO)
+        Lote.objects.bulk_create([c[0] for c in ciclos])
+        self.stdout.write(f"{len(galpones)} galpones, {len(ciclos)} lotes, {len(proveedores) + len(clientes)} entidades.")
+
+        def at(day, hour, minute=0):
+            return timezone.make_aware(datetime.datetime.combine(day, datetime.time(hour, minute)), tz)
+
+        def kardex(articulo, tipo, cantidad, delta, fecha, descripcion, **origen):
+            anterior = saldo[articulo.pk]
+            saldo[articulo.pk] = anterior + delta
+            self._queue(LogArticulo(
+                articulo=articulo, fecha=fecha, tipo=tipo, cantidad=cantidad,
+                saldo_anterior=anterior, saldo_posterior=saldo[articulo.pk], descripcion=descripcion,
+                **origen
+            ))
+
+        def transaccion(tipo, entidad, day, lineas, estado):
+            doc = f"{'FACT' if tipo == TipoOperacion.COMPRA else 'BOL'}-S{self.doc_seq}"
+            self.doc_seq += 1
+            # The total goes on the header before queueing it: _queue() may flush it right away
+            cab = CabeceraTransaccion(
+                tipo_operacion=tipo, entidad=entidad, fecha=day, numero_documento=doc,
+                estado_pago=estado, metodo_pago=rng.choice(MetodoPago.values),
+                monto_total=sum((cantidad * precio for _, cantidad, precio in lineas), Decimal(0)),
+            )
+            self._queue(cab)
+            detalles = []
+            for articulo, cantidad, precio in lineas:
+                detalles.append(DetalleTransaccion(transaccion=cab, articulo=articulo, cantidad=cantidad, precio_unitario=precio, subtotal=cantidad * precio))
+                self._queue(detalles[-1])
+            return doc, detalles[0]
+
+        self.doc_seq = 1
+        vivas = {c[0].pk: c[0].aves_iniciales for c in ciclos}
+        dia_prev_huevos = {huevo_blanco.pk: Decimal(0), huevo_color.pk: Decimal(0)}
+        n_dias = (today - start).days + 1
+
+        # 3. Daily history, in chronological order so the kardex threads naturally
+        for offset in range(n_dias):
+            day = start + timedelta(days=offset)
+            activos = [c for c in ciclos if c[1] <= day <= c[2]]
+
+            # Weekly feed purchase topping stock up to two weeks of cover for the barns housed this week
+            semana = [c for c in ciclos if c[1] <= day + timedelta(days=7) and c[2] >= day]
+            cobertura = Decimal(sum(vivas[c[0].pk] for c in semana)) * Decimal('0.110') * 14
+            kilos = (cobertura - saldo[alimento.pk]).quantize(Decimal('1'))
+            if offset % 7 == 0 and kilos > 0:
+                proveedor = rng.choice(proveedores)
+                precio = Decimal(rng.randint(420, 480))
+                estado = EstadoPago.PENDIENTE if day > start + timedelta(days=n_dias - 60) and rng.random() < 0.5 else EstadoPago.PAGADO
+                doc, detalle = transaccion(TipoOperacion.COMPRA, proveedor, day, [(alimento, kilos, precio)], estado)
+                kardex(alimento, 'COMPRA', kilos, kilos, at(day, 7), f"Compra a {proveedor} (Doc: {doc})", detalle=detalle)
+
+            # Sales at noon: ~95% of the previous day's eggs, some as 30-egg trays
+            for huevo in (huevo_blanco, huevo_color):
+                disponible = dia_prev_huevos[huevo.pk]
+                dia_prev_huevos[huevo.pk] = Decimal(0)
+                if disponible <= 0:
+                    continue
+                vender = (disponible * Decimal('0.95')).quantize(Decimal('1'))
+                n_ventas = rng.randint(1, 4)
+                for _ in range(n_ventas):
+                    cliente = rng.choice(clientes)
+                    cantidad = (vender / n_ventas).quantize(Decimal('1'))
+                    estado = EstadoPago.PENDIENTE if rng.random() < 0.1 else EstadoPago.PAGADO
+                    if huevo is huevo_blanco and cantidad >= 300 and rng.random() < 0.5:
+                        bandejas = (cantidad / 30).quantize(Decimal('1'), rounding=ROUND_FLOOR)
+                        doc, detalle = transaccion(TipoOperacion.VENTA, cliente, day, [(bandeja, bandejas, bandeja.precio_referencia)], estado)
+                        fecha = at(day, 12)
+                        kardex(bandeja, 'VENTA', bandejas, 0, fecha, f"Venta Pack a {cliente} (Doc: {doc})", detalle=detalle)
+                        kardex(huevo_blanco, 'VENTA', bandejas * 30, -bandejas * 30, fecha, f"Venta en Pack: {bandeja.nombre} (Doc: {doc})", detalle=detalle)
+                    else:
+                        doc, detalle = transaccion(TipoOperacion.VENTA, cliente, day, [(huevo, cantidad, huevo.precio_referencia)], estado)
+                        kardex(huevo, 'VENTA', cantidad, -cantidad, at(day, 12), f"Venta a {cliente} (Doc: {doc})", detalle=detalle)
+
+            for lote, inicio, fin, huevo in activos:
+                edad = (day - inicio).days
+                desc_lote = f"{lote.galpon.nombre} - {lote.raza}"
+
+                # Mortality: low background rate with occasional spikes
+                muertes = sum(1 for _ in range(3) if rng.random() < vivas[lote.pk] * 0.00005)
+                if rng.random() < 0.002:
+                    muertes += rng.randint(5, 40)
+                if muertes:
+                    muertes = min(muertes, vivas[lote.pk] - 1)
+                    vivas[lote.pk] -= muertes
+                    self._queue(RegistroBajas(lote=lote, fecha=at(day, 8, rng.randint(0, 59)), cantidad=muertes, motivo=rng.choice(MotivoBaja.values)))
+
+                # Feed: ~110 g/bird/day split across the day's feedings
+                por_toma = (Decimal(vivas[lote.pk]) * Decimal('0.110') / options['consumos_dia']).quantize(Decimal('0.01'))
+                for toma in range(options['consumos_dia']):
+                    fecha = at(day, 9 + toma * 6)
+                    mov = MovimientoInterno(lote=lote, articulo=alimento, tipo_movimiento=TipoMovimiento.CONSUMO, cantidad=por_toma, fecha=fecha)
+                    self._queue(mov)
+                    kardex(alimento, 'CONSUMO', por_toma, -por_toma, fecha, f"Consumo: {desc_lote}", movimiento=mov)
+
+                # Laying curve: ramps up from week 18, peaks ~93% and declines slowly
+                semana = edad // 7
+                if semana >= 18:
+                    tasa = min(0.93, (semana - 17) * 0.15) - max(0, semana - 30) * 0.004
+                    huevos = Decimal(int(vivas[lote.pk] * max(tasa, 0.5) * rng.uniform(0.96, 1.02)))
+                    fecha = at(day, 17)
+                    mov = MovimientoInterno(lote=lote, articulo=huevo, tipo_movimiento=TipoMovimiento.PRODUCCION, cantidad=huevos, fecha=fecha)
+                    self._queue(mov)
+                    kardex(huevo, 'PRODUCCION', huevos, huevos, fecha, f"Produccion: {desc_lote}", movimiento=mov)
+                    dia_prev_huevos[huevo.pk] += huevos
+
+                # Vaccination schedule every 8 weeks
+                if edad % 56 == 0:
+                    self._queue(RegistroVacunacion(lote=lote, nombre_vacuna='Newcastle', fecha=day, proxima_fecha_sugerida=day + timedelta(days=56)))
+
+            if offset % 90 == 0:
+                self.stdout.write(f"  {day} ({self.rows} filas)")
+
+        self._flush()
+
+        # 4. Consistency: stock equals the kardex closing balance; population ledger and aves_actuales from the bajas
+        for articulo in articulos:
+            if articulo.controlar_stock:
+                Articulo.objects.filter(pk=articulo.pk).update(stock_actual=saldo[articulo.pk])
+        poblacion.reconstruir([c[0] for c in ciclos])
+        for galpon in galpones:
+            ocupacion.reconstruir(galpon)
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from Gestion.models import OutboxEvento, EstadoOutbox
+from Gestion import outbox
+import datetime
+import time
+
+class Command(BaseCommand):
+    help = 'Aplica los eventos pendientes del outbox (kardex y población diferidos desde el kiosco)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=200, help='Eventos por transacción')
+        parser.add_argument('--loop', action='store_true', help='Queda corriendo y revisa la cola cada --sleep segundos')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Pausa entre revisiones cuando la cola está vacía')
+        parser.add_argument('--purgar-dias', type=int, default=0, help='Borra eventos procesados con más de N días (0 = no borrar)')
+
+    def handle(self, *args, **options):
+        while True:
+            aplicados, fallidos = outbox.procesar(options['batch'])
+            if aplicados or fallidos:
+                self.stdout.write(f"{aplicados} aplicados, {fallidos} con error")
+
+            if options['purgar_dias']:
+                limite = timezone.now() - datetime.timedelta(days=options['purgar_dias'])
+                OutboxEvento.objects.filter(estado=EstadoOutbox.PROCESADO, procesado__lt=limite).delete()
+
+            if not options['loop']:
+                break
+            # A full batch means there is probably more waiting
+            if aplicados + fallidos < options['batch']:
+                time.sleep(options['sleep'])
+
+        pendientes = OutboxEvento.objects.filter(estado=EstadoOutbox.PENDIENTE).count()
+        self.stdout.write(self.style.SUCCESS(f"Outbox procesado. Pendientes: {pendientes}"))
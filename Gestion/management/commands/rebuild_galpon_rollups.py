@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from Gestion.models import Galpon
+from Gestion import ocupacion
+
+class Command(BaseCommand):
+    help = 'Reconstruye el resumen mensual de ocupación y rendimiento (ResumenGalponMes) de todos los galpones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--galpon', type=int, action='append', help='Galpón(es) a reconstruir (por defecto todos)')
+
+    def handle(self, *args, **options):
+        galpones = Galpon.objects.all()
+        if options['galpon']:
+            galpones = galpones.filter(pk__in=options['galpon'])
+
+        for galpon in galpones:
+            n = ocupacion.reconstruir(galpon)
+            self.stdout.write(f"{galpon.nombre}: {n} meses")
+
+        self.stdout.write(self.style.SUCCESS("Resumen de galpones reconstruido."))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from Gestion.models import Lote
+from Gestion import poblacion
+
+class Command(BaseCommand):
+    help = 'Rebuilds the population ledger (EventoPoblacion / PoblacionDiaria) and aves_actuales from RegistroBajas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, action='append', help='Lote(s) a reconstruir (por defecto todos)')
+
+    def handle(self, *args, **options):
+        lotes = Lote.objects.all()
+        if options['lote']:
+            lotes = lotes.filter(pk__in=options['lote'])
+
+        for lote in lotes:
+            antes = lote.aves_actuales
+            poblacion.reconstruir([lote])
+            lote.refresh_from_db(fields=['aves_actuales'])
+            if antes != lote.aves_actuales:
+                self.stdout.write(self.style.WARNING(f"Lote {lote.pk}: aves_actuales {antes} -> {lote.aves_actuales}"))
+
+        self.stdout.write(self.style.SUCCESS("Ledger de población reconstruido."))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from Gestion import saldos
+
+class Command(BaseCommand):
+    help = 'Reconstruye los saldos por cobrar/pagar (SaldoEntidad) desde las transacciones pendientes'
+
+    def handle(self, *args, **options):
+        n = saldos.recalcular()
+        self.stdout.write(self.style.SUCCESS(f"Saldos reconstruidos: {n} filas."))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from Gestion import replica
+
+
+class Command(BaseCommand):
+    help = 'Refresca la copia de solo lectura usada por los reportes (SQLite, API de backup en línea)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Queda corriendo y refresca cada --intervalo segundos')
+        parser.add_argument('--intervalo', type=float, default=300, help='Segundos entre copias')
+
+    def handle(self, *args, **options):
+        if not replica.configurada():
+            raise CommandError(f"No hay base '{replica.ALIAS}' en DATABASES.")
+        if connections[replica.ALIAS].vendor != 'sqlite':
+            self.stdout.write("La réplica no es SQLite (standby de PostgreSQL): no hay nada que copiar.")
+            return
+
+        while True:
+            inicio = time.monotonic()
+            al = replica.refrescar()
+            self.stdout.write(f"Réplica al {timezone.localtime(al):%d/%m/%Y %H:%M:%S} ({time.monotonic() - inicio:.1f} s)")
+            if not options['loop']:
+                break
+            time.sleep(max(options['intervalo'] - (time.monotonic() - inicio), 0))
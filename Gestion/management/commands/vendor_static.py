@@ -0,0 +1,23 @@
+import os
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from Gestion import estaticos
+
+class Command(BaseCommand):
+    help = 'Descarga las librerías CSS/JS/fuentes de terceros (versiones fijas) a Gestion/static/vendor para servirlas localmente'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forzar', action='store_true', help='Vuelve a descargar aunque el archivo ya exista')
+
+    def handle(self, *args, **options):
+        destino = os.path.join(apps.get_app_config('Gestion').path, 'static')
+        try:
+            escritos = estaticos.descargar(destino, forzar=options['forzar'])
+        except OSError as e:
+            raise CommandError(f"No se pudo descargar: {e}")
+        for archivo in escritos:
+            self.stdout.write(f"  {os.path.relpath(archivo, destino)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(escritos)} archivos descargados. Ejecute 'collectstatic' para generar los nombres con hash y las versiones .gz/.br."
+        ))
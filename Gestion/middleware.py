@@ -0,0 +1,97 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+
+from . import granjas, perfilado
+
+HASHED = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')  # name.<md5[:12]>.ext from ManifestStaticFilesStorage
+MAX_AGE_HASHED = 60 * 60 * 24 * 365
+MAX_AGE = 60 * 60
+
+mimetypes.add_type('font/woff2', '.woff2')
+mimetypes.add_type('font/woff', '.woff')
+
+
+class StaticPrecomprimidoMiddleware:
+    """
+    Serves STATIC_ROOT directly (no web server needed on the farm box): picks the .br /
+    .gz sibling written at collectstatic according to Accept-Encoding, and marks
+    fingerprinted files as immutable for a year so tablets never ask for them again.
+    Anything that is not an existing file under STATIC_ROOT goes through untouched.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefijo = '/' + settings.STATIC_URL.lstrip('/')
+        self.raiz = os.path.realpath(settings.STATIC_ROOT) if settings.STATIC_ROOT else None
+
+    def __call__(self, request):
+        if self.raiz and request.method in ('GET', 'HEAD') and request.path.startswith(self.prefijo):
+            respuesta = self.servir(request, request.path[len(self.prefijo):])
+            if respuesta is not None:
+                return respuesta
+        return self.get_response(request)
+
+    def servir(self, request, nombre):
+        ruta = os.path.realpath(os.path.join(self.raiz, nombre))
+        if not ruta.startswith(self.raiz + os.sep) or not os.path.isfile(ruta):
+            return None
+
+        aceptadas = request.headers.get('Accept-Encoding', '')
+        archivo, codificacion = ruta, None
+        for sufijo, nombre_codificacion in (('.br', 'br'), ('.gz', 'gzip')):
+            if re.search(rf'\b{nombre_codificacion}\b', aceptadas) and os.path.isfile(ruta + sufijo):
+                archivo, codificacion = ruta + sufijo, nombre_codificacion
+                break
+
+        stat = os.stat(archivo)
+        etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+        if request.headers.get('If-None-Match') == etag:
+            respuesta = HttpResponseNotModified()
+        else:
+            tipo, _ = mimetypes.guess_type(ruta)
+            respuesta = FileResponse(open(archivo, 'rb'), content_type=tipo or 'application/octet-stream')
+            respuesta['Content-Length'] = stat.st_size
+            if codificacion:
+                respuesta['Content-Encoding'] = codificacion
+
+        respuesta['ETag'] = etag
+        respuesta['Last-Modified'] = http_date(stat.st_mtime)
+        if HASHED.search(nombre):
+            respuesta['Cache-Control'] = f'public, max-age={MAX_AGE_HASHED}, immutable'
+        else:
+            respuesta['Cache-Control'] = f'public, max-age={MAX_AGE}'
+        patch_vary_headers(respuesta, ('Accept-Encoding',))
+        return respuesta
+
+
+class PerfilMiddleware:
+    """
+    Staff-only on-demand profiling (see perfilado.py). Goes after AuthenticationMiddleware;
+    requests without the trigger pass straight through.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if perfilado.solicitado(request) and request.user.is_staff:
+            return perfilado.perfilar(request, self.get_response)
+        return self.get_response(request)
+
+
+class GranjaMiddleware:
+    """
+    Activates the farm of the request (granjas.py) so the tenant-scoped managers filter by
+    it. Goes after AuthenticationMiddleware and the kiosk one (tablets act as their user).
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.granja, request.granjas = granjas.de_peticion(request)
+        with granjas.activar(request.granja.pk if request.granja else None):
+            return self.get_response(request)
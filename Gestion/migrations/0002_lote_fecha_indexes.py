@@ -0,0 +1,25 @@
+# Generated by Django 6.0.2 on 2026-10-19 14:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Gestion', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimientointerno',
+            index=models.Index(fields=['lote', 'fecha'], name='Gestion_mov_lote_id_750817_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registrobajas',
+            index=models.Index(fields=['lote', 'fecha'], name='Gestion_reg_lote_id_af0121_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registrovacunacion',
+            index=models.Index(fields=['lote', 'fecha'], name='Gestion_reg_lote_id_e42e3f_idx'),
+        ),
+    ]
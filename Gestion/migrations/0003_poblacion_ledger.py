@@ -0,0 +1,74 @@
+# Generated by Django 6.0.2 on 2026-10-19 14:13
+
+import datetime
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def build_ledger(apps, schema_editor):
+    """Seeds the population ledger from aves_iniciales and the existing RegistroBajas."""
+    Lote = apps.get_model('Gestion', 'Lote')
+    RegistroBajas = apps.get_model('Gestion', 'RegistroBajas')
+    EventoPoblacion = apps.get_model('Gestion', 'EventoPoblacion')
+    PoblacionDiaria = apps.get_model('Gestion', 'PoblacionDiaria')
+
+    for lote in Lote.objects.all():
+        inicio = timezone.make_aware(datetime.datetime.combine(lote.fecha_inicio, datetime.time.min))
+        eventos = [EventoPoblacion(lote=lote, tipo='INICIAL', delta=lote.aves_iniciales, fecha=inicio)]
+        dias = {lote.fecha_inicio: [lote.aves_iniciales, 0]}
+        for baja in RegistroBajas.objects.filter(lote=lote).order_by('fecha'):
+            eventos.append(EventoPoblacion(lote=lote, tipo='BAJA', delta=-baja.cantidad, fecha=baja.fecha, baja=baja))
+            dia = dias.setdefault(timezone.localdate(baja.fecha), [0, 0])
+            dia[0] -= baja.cantidad
+            dia[1] += baja.cantidad
+
+        acumulado = 0
+        filas = []
+        for fecha in sorted(dias):
+            acumulado += dias[fecha][0]
+            filas.append(PoblacionDiaria(lote=lote, fecha=fecha, bajas=dias[fecha][1], aves_vivas=acumulado))
+        EventoPoblacion.objects.bulk_create(eventos)
+        PoblacionDiaria.objects.bulk_create(filas)
+        Lote.objects.filter(pk=lote.pk).update(aves_actuales=acumulado)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Gestion', '0002_lote_fecha_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoPoblacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('tipo', models.CharField(choices=[('INICIAL', 'Ingreso Inicial'), ('AJUSTE', 'Ajuste Aves Iniciales'), ('BAJA', 'Baja'), ('EDICION', 'Edición de Baja'), ('ELIMINACION', 'Eliminación de Baja')], max_length=20)),
+                ('delta', models.IntegerField(help_text='Cambio de población (negativo = aves perdidas)')),
+                ('registrado', models.DateTimeField(auto_now_add=True)),
+                ('baja', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='eventos_poblacion', to='Gestion.registrobajas')),
+                ('lote', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos_poblacion', to='Gestion.lote')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['lote', 'fecha'], name='Gestion_eve_lote_id_32abc3_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PoblacionDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('bajas', models.IntegerField(default=0, help_text='Bajas netas del día')),
+                ('aves_vivas', models.IntegerField()),
+                ('lote', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='poblacion_diaria', to='Gestion.lote')),
+            ],
+            options={
+                'unique_together': {('lote', 'fecha')},
+            },
+        ),
+        migrations.RunPython(build_ledger, migrations.RunPython.noop),
+    ]
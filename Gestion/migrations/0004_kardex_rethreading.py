@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-19 14:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Gestion', '0003_poblacion_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logarticulo',
+            name='detalle',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='kardex', to='Gestion.detalletransaccion'),
+        ),
+        migrations.AddField(
+            model_name='logarticulo',
+            name='movimiento',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='kardex', to='Gestion.movimientointerno'),
+        ),
+        migrations.AlterField(
+            model_name='logarticulo',
+            name='fecha',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='Position in the chain (backdated movements keep their own date)'),
+        ),
+        migrations.AddIndex(
+            model_name='logarticulo',
+            index=models.Index(fields=['articulo', 'fecha'], name='Gestion_log_articul_916a06_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.2 on 2026-10-19 15:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Gestion', '0004_kardex_rethreading'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=30)),
+                ('clave', models.CharField(help_text='Ordering key, e.g. articulo:12 or lote:3', max_length=50)),
+                ('payload', models.JSONField(default=dict)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PROCESADO', 'Procesado'), ('FALLIDO', 'Fallido')], default='PENDIENTE', max_length=20)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('disponible_desde', models.DateTimeField(default=django.utils.timezone.now)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('procesado', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estado', 'id'], name='Gestion_out_estado_7d101d_idx'), models.Index(fields=['clave', 'estado'], name='Gestion_out_clave_a17b9e_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.2 on 2026-10-19 15:40
+
+from django.db import migrations, models
+
+
+def marcar_bajo_minimo(apps, schema_editor):
+    Articulo = apps.get_model('Gestion', 'Articulo')
+    Articulo.objects.filter(controlar_stock=True, stock_actual__lte=models.F('stock_minimo')).update(bajo_minimo=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Gestion', '0005_outbox_evento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='articulo',
+            name='bajo_minimo',
+            field=models.BooleanField(db_index=True, default=False, editable=False, help_text='Stock actual en o bajo el mínimo (se mantiene automáticamente)'),
+        ),
+        migrations.RunPython(marcar_bajo_minimo, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-19 16:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Gestion', '0006_articulo_bajo_minimo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PronosticoConsumo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('calculado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('consumo_ave_dia', models.FloatField(help_text='Consumo ajustado por ave y día a la fecha del cálculo')),
+                ('tendencia', models.FloatField(help_text='Variación diaria del consumo por ave')),
+                ('dias_historia', models.IntegerField(help_text='Días con consumo usados en el ajuste')),
+                ('semanas', models.JSONField(default=list, help_text='Demanda acumulada proyectada al cierre de cada semana (1 a 6)')),
+                ('articulo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pronosticos', to='Gestion.articulo')),
+                ('lote', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pronosticos', to='Gestion.lote')),
+            ],
+            options={
+                'unique_together': {('lote', 'articulo')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-19 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Gestion', '0007_pronostico_consumo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CurvaEstandar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('raza', models.CharField(help_text='Debe coincidir con Lote.raza (sin distinguir mayúsculas)', max_length=100)),
+                ('semana', models.PositiveIntegerField(help_text='Semana de vida del lote (1 = semana de ingreso)')),
+                ('tasa_puesta', models.FloatField(blank=True, help_text='% de puesta esperado', null=True)),
+                ('consumo_ave_g', models.FloatField(blank=True, help_text='Gramos de alimento por ave y día', null=True)),
+                ('mortalidad_pct', models.FloatField(blank=True, help_text='% de mortalidad semanal', null=True)),
+            ],
+            options={
+                'ordering': ['raza', 'semana'],
+                'unique_together': {('raza', 'semana')},
+            },
+        ),
+    ]
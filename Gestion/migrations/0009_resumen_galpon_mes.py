@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-19 17:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Gestion', '0008_curva_estandar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenGalponMes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primer día del mes')),
+                ('lotes', models.IntegerField(default=0, help_text='Lotes con aves en el mes')),
+                ('aves_dia', models.BigIntegerField(default=0, help_text='Suma de aves vivas de cada día (aves-día)')),
+                ('capacidad_dia', models.BigIntegerField(default=0, help_text='Capacidad máxima x días del mes')),
+                ('dias_ocupado', models.IntegerField(default=0)),
+                ('bajas', models.IntegerField(default=0)),
+                ('huevos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('alimento', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('pendiente', models.BooleanField(default=True)),
+                ('actualizado', models.DateTimeField(blank=True, null=True)),
+                ('galpon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes', to='Gestion.galpon')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['pendiente', 'mes'], name='Gestion_res_pendien_a1840b_idx')],
+                'unique_together': {('galpon', 'mes')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-19 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Gestion', '0009_resumen_galpon_mes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='articulo',
+            name='costo_promedio',
+            field=models.DecimalField(decimal_places=4, default=0, editable=False, help_text='Costo unitario promedio ponderado (se actualiza con cada compra)', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='logarticulo',
+            name='costo_unitario',
+            field=models.DecimalField(blank=True, decimal_places=4, help_text='Precio de compra o costo promedio al momento del registro', max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='movimientointerno',
+            name='costo_unitario',
+            field=models.DecimalField(blank=True, decimal_places=4, editable=False, help_text='Costo promedio del artículo al registrar el consumo', max_digits=12, null=True),
+        ),
+    ]
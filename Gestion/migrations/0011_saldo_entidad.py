@@ -0,0 +1,53 @@
+# Generated by Django 6.0.2 on 2026-10-19 14:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def calcular_saldos(apps, schema_editor):
+    CabeceraTransaccion = apps.get_model('Gestion', 'CabeceraTransaccion')
+    SaldoEntidad = apps.get_model('Gestion', 'SaldoEntidad')
+    hoy = timezone.localdate()
+    filas = {}
+    pendientes = CabeceraTransaccion.objects.filter(estado_pago='PENDIENTE').exclude(monto_total=0)
+    for entidad_id, tipo, fecha, monto in pendientes.values_list('entidad_id', 'tipo_operacion', 'fecha', 'monto_total'):
+        fila = filas.setdefault((entidad_id, tipo), SaldoEntidad(entidad_id=entidad_id, tipo_operacion=tipo, al=hoy))
+        dias = (hoy - fecha).days
+        campo = 'tramo_30' if dias <= 30 else 'tramo_60' if dias <= 60 else 'tramo_90' if dias <= 90 else 'tramo_mas_90'
+        setattr(fila, campo, getattr(fila, campo) + monto)
+        fila.saldo += monto
+        fila.pendientes += 1
+        fila.mas_antigua = min(fila.mas_antigua or fecha, fecha)
+    SaldoEntidad.objects.bulk_create(filas.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Gestion', '0010_costo_promedio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoEntidad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_operacion', models.CharField(choices=[('COMPRA', 'Compra'), ('VENTA', 'Venta')], max_length=20)),
+                ('saldo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('pendientes', models.IntegerField(default=0, help_text='Transacciones pendientes')),
+                ('tramo_30', models.DecimalField(decimal_places=2, default=0, help_text='0 a 30 días', max_digits=14)),
+                ('tramo_60', models.DecimalField(decimal_places=2, default=0, help_text='31 a 60 días', max_digits=14)),
+                ('tramo_90', models.DecimalField(decimal_places=2, default=0, help_text='61 a 90 días', max_digits=14)),
+                ('tramo_mas_90', models.DecimalField(decimal_places=2, default=0, help_text='Más de 90 días', max_digits=14)),
+                ('mas_antigua', models.DateField(blank=True, help_text='Fecha de la transacción pendiente más antigua', null=True)),
+                ('al', models.DateField(help_text='Fecha a la que están calculados los tramos')),
+                ('entidad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos', to='Gestion.entidad')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tipo_operacion', '-saldo'], name='Gestion_sal_tipo_op_e6ab60_idx')],
+                'unique_together': {('entidad', 'tipo_operacion')},
+            },
+        ),
+        migrations.RunPython(calcular_saldos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0.2 on 2026-10-19 15:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Gestion', '0011_saldo_entidad'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerfilPeticion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('metodo', models.CharField(max_length=10)),
+                ('ruta', models.CharField(max_length=500)),
+                ('status', models.PositiveSmallIntegerField()),
+                ('duracion_ms', models.DecimalField(decimal_places=1, max_digits=10)),
+                ('sql_ms', models.DecimalField(decimal_places=1, max_digits=10)),
+                ('plantillas_ms', models.DecimalField(decimal_places=1, help_text='Render de plantillas (incluye el SQL que dispara)', max_digits=10)),
+                ('num_consultas', models.PositiveIntegerField()),
+                ('consultas', models.JSONField(default=list, help_text='[{sql, ms}] en orden de ejecución')),
+                ('funciones', models.JSONField(default=list, help_text='[{funcion, llamadas, propio_ms, acumulado_ms}] por tiempo propio')),
+                ('arbol', models.TextField(blank=True, default='', help_text='Llamadas de las funciones con más tiempo acumulado')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-creado'],
+            },
+        ),
+    ]
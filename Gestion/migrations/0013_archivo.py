@@ -0,0 +1,81 @@
+# Generated by Django 6.0.2 on 2026-10-19 14:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Gestion', '0012_perfil_peticion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimientointerno',
+            name='archivado',
+            field=models.BooleanField(default=False, editable=False, help_text='Resumen diario de movimientos archivados (detalle en MovimientoInternoArchivo)'),
+        ),
+        migrations.AddField(
+            model_name='registrobajas',
+            name='archivado',
+            field=models.BooleanField(default=False, editable=False, help_text='Resumen diario de bajas archivadas (detalle en RegistroBajasArchivo)'),
+        ),
+        migrations.AlterField(
+            model_name='logarticulo',
+            name='tipo',
+            field=models.CharField(choices=[('VENTA', 'Venta'), ('COMPRA', 'Compra'), ('PRODUCCION', 'Producción'), ('CONSUMO', 'Consumo'), ('AJUSTE', 'Ajuste Manual'), ('EDICION', 'Edición Metadata'), ('ARCHIVO', 'Resumen archivado')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='LogArticuloArchivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.PositiveSmallIntegerField()),
+                ('id_original', models.IntegerField(unique=True)),
+                ('fecha', models.DateTimeField()),
+                ('tipo', models.CharField(choices=[('VENTA', 'Venta'), ('COMPRA', 'Compra'), ('PRODUCCION', 'Producción'), ('CONSUMO', 'Consumo'), ('AJUSTE', 'Ajuste Manual'), ('EDICION', 'Edición Metadata'), ('ARCHIVO', 'Resumen archivado')], max_length=20)),
+                ('cantidad', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('saldo_anterior', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('saldo_posterior', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('descripcion', models.TextField(blank=True, null=True)),
+                ('costo_unitario', models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True)),
+                ('detalle_id', models.IntegerField(blank=True, null=True)),
+                ('articulo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Gestion.articulo')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['anio', 'articulo', 'fecha'], name='Gestion_log_anio_0afcca_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MovimientoInternoArchivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.PositiveSmallIntegerField()),
+                ('id_original', models.IntegerField(unique=True)),
+                ('tipo_movimiento', models.CharField(choices=[('CONSUMO', 'Consumo'), ('PRODUCCION', 'Produccion')], max_length=20)),
+                ('cantidad', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('fecha', models.DateTimeField()),
+                ('costo_unitario', models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True)),
+                ('articulo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Gestion.articulo')),
+                ('lote', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Gestion.lote')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['anio', 'lote', 'fecha'], name='Gestion_mov_anio_8ded54_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RegistroBajasArchivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.PositiveSmallIntegerField()),
+                ('id_original', models.IntegerField(unique=True)),
+                ('fecha', models.DateTimeField()),
+                ('cantidad', models.IntegerField()),
+                ('motivo', models.CharField(choices=[('MUERTE_NATURAL', 'Muerte Natural'), ('ACCIDENTE', 'Accidente'), ('DESCARTE', 'Descarte'), ('DEPREDADOR', 'Depredador')], max_length=20)),
+                ('lote', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Gestion.lote')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['anio', 'lote', 'fecha'], name='Gestion_reg_anio_cf3da4_idx')],
+            },
+        ),
+    ]
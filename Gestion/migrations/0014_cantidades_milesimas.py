@@ -0,0 +1,30 @@
+# Generated by Django 6.0.2 on 2026-10-19 15:40
+# Quantities to integer thousandths: every column is widened, scaled in place and retyped.
+
+from django.db import migrations
+
+from Gestion.cantidades import CantidadField, migrar
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Gestion', '0013_archivo'),
+    ]
+
+    operations = [
+        *migrar('articulo', 'stock_actual', CantidadField(default=0, max_digits=10)),
+        *migrar('articulo', 'stock_minimo', CantidadField(default=0, max_digits=10)),
+        *migrar('detalletransaccion', 'cantidad', CantidadField(max_digits=10)),
+        *migrar('logarticulo', 'cantidad', CantidadField(default=0, help_text='Magnitude of change', max_digits=10)),
+        *migrar('logarticulo', 'saldo_anterior', CantidadField(default=0, max_digits=10)),
+        *migrar('logarticulo', 'saldo_posterior', CantidadField(default=0, max_digits=10)),
+        *migrar('logarticuloarchivo', 'cantidad', CantidadField(default=0, max_digits=10)),
+        *migrar('logarticuloarchivo', 'saldo_anterior', CantidadField(default=0, max_digits=10)),
+        *migrar('logarticuloarchivo', 'saldo_posterior', CantidadField(default=0, max_digits=10)),
+        *migrar('movimientointerno', 'cantidad', CantidadField(max_digits=10)),
+        *migrar('movimientointernoarchivo', 'cantidad', CantidadField(max_digits=10)),
+        *migrar('receta', 'cantidad', CantidadField(decimal_places=3, help_text='Cantidad de ingrediente por unidad de producto', max_digits=10)),
+        *migrar('resumengalponmes', 'alimento', CantidadField(default=0, max_digits=14)),
+        *migrar('resumengalponmes', 'huevos', CantidadField(default=0, max_digits=14)),
+    ]
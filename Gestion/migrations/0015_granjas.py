@@ -0,0 +1,76 @@
+# Generated by Django 6.0.2 on 2026-10-19 16:20
+
+import Gestion.granjas
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def crear_principal(apps, schema_editor):
+    """Every existing row goes to one default farm (the callable default of the new FKs picks it up)."""
+    apps.get_model('Gestion', 'Granja').objects.get_or_create(nombre='Principal')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Gestion', '0014_cantidades_milesimas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Granja',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+                ('creada', models.DateTimeField(auto_now_add=True)),
+                ('usuarios', models.ManyToManyField(blank=True, help_text='Usuarios que trabajan en esta granja (sin ninguna asignada usan la principal)', related_name='granjas', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(crear_principal, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='articulo',
+            name='granja',
+            field=models.ForeignKey(db_index=False, default=Gestion.granjas.por_defecto, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='articulos', to='Gestion.granja'),
+        ),
+        migrations.AddField(
+            model_name='cabeceratransaccion',
+            name='granja',
+            field=models.ForeignKey(db_index=False, default=Gestion.granjas.por_defecto, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='transacciones', to='Gestion.granja'),
+        ),
+        migrations.AddField(
+            model_name='entidad',
+            name='granja',
+            field=models.ForeignKey(db_index=False, default=Gestion.granjas.por_defecto, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='entidades', to='Gestion.granja'),
+        ),
+        migrations.AddField(
+            model_name='galpon',
+            name='granja',
+            field=models.ForeignKey(db_index=False, default=Gestion.granjas.por_defecto, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='galpones', to='Gestion.granja'),
+        ),
+        migrations.AddIndex(
+            model_name='articulo',
+            index=models.Index(fields=['granja', 'nombre'], name='Gestion_art_granja__de1552_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='articulo',
+            index=models.Index(fields=['granja', 'bajo_minimo'], name='Gestion_art_granja__7c8c68_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cabeceratransaccion',
+            index=models.Index(fields=['granja', '-fecha'], name='Gestion_cab_granja__093f1a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cabeceratransaccion',
+            index=models.Index(fields=['granja', 'estado_pago', 'tipo_operacion'], name='Gestion_cab_granja__637e48_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entidad',
+            index=models.Index(fields=['granja', 'nombre_razon_social'], name='Gestion_ent_granja__34e09f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='galpon',
+            index=models.Index(fields=['granja', 'nombre'], name='Gestion_gal_granja__dbf8ed_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.2 on 2026-10-19 17:05
+
+import Gestion.cantidades
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Gestion', '0015_granjas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CierreLote',
+            fields=[
+                ('lote', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='cierre', serialize=False, to='Gestion.lote')),
+                ('fecha_cierre', models.DateField(help_text='Último día con actividad registrada')),
+                ('dias', models.IntegerField(help_text='Duración del lote en días')),
+                ('aves_iniciales', models.IntegerField()),
+                ('aves_finales', models.IntegerField()),
+                ('huevos', Gestion.cantidades.CantidadField(default=0, max_digits=14)),
+                ('alimento', Gestion.cantidades.CantidadField(default=0, max_digits=14)),
+                ('bajas', models.IntegerField(default=0)),
+                ('bajas_motivo', models.JSONField(default=dict, help_text='Bajas por motivo {MotivoBaja: cantidad}')),
+                ('puesta_pico', models.FloatField(blank=True, help_text='Tasa de puesta semanal máxima (%)', null=True)),
+                ('semana_pico', models.IntegerField(blank=True, null=True)),
+                ('gramos_huevo', models.FloatField(blank=True, help_text='Alimento consumido por huevo producido (g)', null=True)),
+                ('costo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('costo_huevo', models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True)),
+                ('precio_huevo', models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True)),
+                ('margen', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True)),
+                ('calculado', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['fecha_cierre'], name='Gestion_cie_fecha_c_ae9689_idx')],
+            },
+        ),
+    ]
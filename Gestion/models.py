@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
+from .cantidades import CantidadField
+from .granjas import EnGranja, por_defecto
+
 # --- ENUMS ---
 
 class TipoArticulo(models.TextChoices):
@@ -18,6 +22,18 @@ class TipoMovimiento(models.TextChoices):
     CONSUMO = 'CONSUMO', 'Consumo'
     PRODUCCION = 'PRODUCCION', 'Produccion'
 
+class TipoEventoPoblacion(models.TextChoices):
+    INICIAL = 'INICIAL', 'Ingreso Inicial'
+    AJUSTE = 'AJUSTE', 'Ajuste Aves Iniciales'
+    BAJA = 'BAJA', 'Baja'
+    EDICION = 'EDICION', 'Edición de Baja'
+    ELIMINACION = 'ELIMINACION', 'Eliminación de Baja'
+
+class EstadoOutbox(models.TextChoices):
+    PENDIENTE = 'PENDIENTE', 'Pendiente'
+    PROCESADO = 'PROCESADO', 'Procesado'
+    FALLIDO = 'FALLIDO', 'Fallido'
+
 class TipoOperacion(models.TextChoices):
     COMPRA = 'COMPRA', 'Compra'
     VENTA = 'VENTA', 'Venta'
@@ -35,10 +51,81 @@ class MetodoPago(models.TextChoices):
     CHEQUE = 'CHEQUE', 'Cheque'
     OTRO = 'OTRO', 'Otro'
 
+# --- CHANGE TRACKING ---
+
+class ChangeTrackingMixin(models.Model):
+    """
+    Remembers the field values loaded from the DB so saves only write what changed.
+
+    save() without update_fields becomes save(update_fields=<dirty fields>) for
+    instances that came from the DB (nothing dirty = no query and no signals), and
+    pre_save receivers can diff against `valores_cargados` without re-reading the row.
+    """
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.marcar_limpios()
+        return instance
+
+    def marcar_limpios(self, fields=None):
+        """Marks the current values of `fields` (default: every loaded field) as clean."""
+        if fields is None or not hasattr(self, '_valores_cargados'):
+            self._valores_cargados = {}
+        for field in self._meta.concrete_fields:
+            if field.attname in self.__dict__ and (fields is None or field.name in fields or field.attname in fields):
+                self._valores_cargados[field.attname] = self.__dict__[field.attname]
+
+    @property
+    def valores_cargados(self):
+        """{attname: value} as last loaded/saved, or None if the instance was never loaded from the DB."""
+        return getattr(self, '_valores_cargados', None)
+
+    def campos_modificados(self):
+        """Names of the concrete fields whose value differs from the loaded one (deferred fields excluded)."""
+        cargados = self.valores_cargados or {}
+        return [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key and field.attname in self.__dict__
+            and (field.attname not in cargados or cargados[field.attname] != self.__dict__[field.attname])
+        ]
+
+    def tiene_cambios(self, *fields):
+        modificados = self.campos_modificados()
+        return any(f in modificados for f in fields) if fields else bool(modificados)
+
+    def save(self, *args, **kwargs):
+        if (not args and kwargs.get('update_fields') is None and not kwargs.get('force_insert')
+                and not self._state.adding and self.valores_cargados is not None):
+            kwargs['update_fields'] = self.campos_modificados()
+        super().save(*args, **kwargs)
+        self.marcar_limpios(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self.marcar_limpios(fields)
+
+# --- TENANCY ---
+
+class Granja(models.Model):
+    """Farm (tenant): owns galpones, articulos, entidades and transacciones (see granjas.py)"""
+    nombre = models.CharField(max_length=100, unique=True)
+    usuarios = models.ManyToManyField(
+        settings.AUTH_USER_MODEL, blank=True, related_name='granjas',
+        help_text="Usuarios que trabajan en esta granja (sin ninguna asignada usan la principal)"
+    )
+    creada = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.nombre
+
 # --- INVENTORY & MASTERS ---
 
-class Articulo(models.Model):
+class Articulo(ChangeTrackingMixin, EnGranja):
     id_articulo = models.AutoField(primary_key=True)
+    granja = models.ForeignKey(Granja, on_delete=models.PROTECT, default=por_defecto, editable=False, db_index=False, related_name='articulos')
     class UnidadMedida(models.TextChoices):
         UNIDAD = 'Unidad', 'Unidad'
         KG = 'Kg', 'Kg'
@@ -48,19 +135,32 @@ class Articulo(models.Model):
     tipo = models.CharField(max_length=20, choices=TipoArticulo.choices)
     unidad_medida = models.CharField(max_length=50, choices=UnidadMedida.choices, default=UnidadMedida.UNIDAD)
     controlar_stock = models.BooleanField(default=True)
-    stock_actual = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    stock_minimo = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    stock_actual = CantidadField(max_digits=10, default=0)
+    stock_minimo = CantidadField(max_digits=10, default=0)
     precio_referencia = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Precio base para compras o ventas")
     es_insumo_receta = models.BooleanField(default=False, help_text="Marcar si es un envase o insumo auxiliar para recetas (no se muestra en Kiosco)")
+    bajo_minimo = models.BooleanField(default=False, editable=False, db_index=True, help_text="Stock actual en o bajo el mínimo (se mantiene automáticamente)")
+    costo_promedio = models.DecimalField(max_digits=12, decimal_places=4, default=0, editable=False, help_text="Costo unitario promedio ponderado (se actualiza con cada compra)")
+
+    def save(self, *args, **kwargs):
+        self.bajo_minimo = self.controlar_stock and self.stock_actual <= self.stock_minimo
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'stock_actual', 'stock_minimo', 'controlar_stock'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'bajo_minimo'}
+        super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [models.Index(fields=['granja', 'nombre']), models.Index(fields=['granja', 'bajo_minimo'])]
 
     def __str__(self):
         return f"{self.nombre} ({self.get_tipo_display()})"
 
-class Receta(models.Model):
+class Receta(EnGranja):
     """Defines the composition of a 'Pack' product (e.g. Dozen Eggs)"""
+    RUTA_GRANJA = 'producto__granja'
     producto = models.ForeignKey(Articulo, on_delete=models.CASCADE, related_name='ingredientes_receta', limit_choices_to={'tipo': 'PRODUCTO'})
     ingrediente = models.ForeignKey(Articulo, on_delete=models.CASCADE, related_name='usado_en_recetas')
-    cantidad = models.FloatField(help_text="Cantidad de ingrediente por unidad de producto")
+    cantidad = CantidadField(max_digits=10, decimal_places=3, help_text="Cantidad de ingrediente por unidad de producto")
 
     class Meta:
         unique_together = ('producto', 'ingrediente')
@@ -68,8 +168,9 @@ class Receta(models.Model):
     def __str__(self):
         return f"{self.producto}: {self.cantidad} {self.ingrediente.unidad_medida} de {self.ingrediente}"
 
-class LogArticulo(models.Model):
+class LogArticulo(EnGranja):
     """Unified Audit Log for Article History (Kardex)"""
+    RUTA_GRANJA = 'articulo__granja'
     TIPO_EVENTO = [
         ('VENTA', 'Venta'),
         ('COMPRA', 'Compra'),
@@ -77,30 +178,43 @@ class LogArticulo(models.Model):
         ('CONSUMO', 'Consumo'),
         ('AJUSTE', 'Ajuste Manual'),
         ('EDICION', 'Edición Metadata'),
+        ('ARCHIVO', 'Resumen archivado'),
     ]
     
     articulo = models.ForeignKey(Articulo, on_delete=models.CASCADE, related_name='logs')
-    fecha = models.DateTimeField(auto_now_add=True)
+    fecha = models.DateTimeField(default=timezone.now, help_text="Position in the chain (backdated movements keep their own date)")
     tipo = models.CharField(max_length=20, choices=TIPO_EVENTO)
-    cantidad = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Magnitude of change")
-    saldo_anterior = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    saldo_posterior = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    cantidad = CantidadField(max_digits=10, default=0, help_text="Magnitude of change")
+    saldo_anterior = CantidadField(max_digits=10, default=0)
+    saldo_posterior = CantidadField(max_digits=10, default=0)
     descripcion = models.TextField(blank=True, null=True)
+    costo_unitario = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True, help_text="Precio de compra o costo promedio al momento del registro")
+    # Source of the entry, so edits and deletions can re-thread it
+    movimiento = models.ForeignKey('MovimientoInterno', on_delete=models.SET_NULL, null=True, blank=True, related_name='kardex')
+    detalle = models.ForeignKey('DetalleTransaccion', on_delete=models.SET_NULL, null=True, blank=True, related_name='kardex')
+
+    class Meta:
+        indexes = [models.Index(fields=['articulo', 'fecha'])]
 
     def __str__(self):
         return f"{self.fecha} - {self.articulo} - {self.tipo}"
 
-class Galpon(models.Model):
+class Galpon(EnGranja):
     id_galpon = models.AutoField(primary_key=True)
+    granja = models.ForeignKey(Granja, on_delete=models.PROTECT, default=por_defecto, editable=False, db_index=False, related_name='galpones')
     nombre = models.CharField(max_length=100)
     capacidad_max = models.IntegerField()
 
+    class Meta:
+        indexes = [models.Index(fields=['granja', 'nombre'])]
+
     def __str__(self):
         return self.nombre
 
 # --- BIOLOGICAL CYCLE ---
 
-class Lote(models.Model):
+class Lote(ChangeTrackingMixin, EnGranja):
+    RUTA_GRANJA = 'galpon__granja'
     id_lote = models.AutoField(primary_key=True)
     galpon = models.ForeignKey(Galpon, on_delete=models.CASCADE)
     raza = models.CharField(max_length=100)
@@ -119,7 +233,8 @@ class Lote(models.Model):
         status = "ACTIVO" if self.estado else "CERRADO"
         return f"Lote {self.id_lote} - {self.galpon.nombre} ({status})"
 
-class RegistroVacunacion(models.Model):
+class RegistroVacunacion(EnGranja):
+    RUTA_GRANJA = 'lote__galpon__granja'
     id_vacunacion = models.AutoField(primary_key=True)
     lote = models.ForeignKey(Lote, on_delete=models.CASCADE)
     nombre_vacuna = models.CharField(max_length=200)
@@ -127,10 +242,14 @@ class RegistroVacunacion(models.Model):
     proxima_fecha_sugerida = models.DateField(null=True, blank=True)
     notas = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['lote', 'fecha'])]
+
     def __str__(self):
         return f"{self.nombre_vacuna} - {self.lote}"
 
-class RegistroBajas(models.Model):
+class RegistroBajas(EnGranja):
+    RUTA_GRANJA = 'lote__galpon__granja'
     id_baja = models.AutoField(primary_key=True)
     lote = models.ForeignKey(Lote, on_delete=models.CASCADE)
     fecha = models.DateTimeField(default=timezone.now)
@@ -140,11 +259,61 @@ class RegistroBajas(models.Model):
         choices=MotivoBaja.choices,
         default=MotivoBaja.MUERTE_NATURAL
     )
+    archivado = models.BooleanField(default=False, editable=False, help_text="Resumen diario de bajas archivadas (detalle en RegistroBajasArchivo)")
+
+    class Meta:
+        indexes = [models.Index(fields=['lote', 'fecha'])]
 
     def __str__(self):
         return f"Baja {self.cantidad} en Lote {self.lote.id_lote}"
 
-class MovimientoInterno(models.Model):
+class EventoPoblacion(EnGranja):
+    """Signed population ledger per Lote (sum of delta up to a date = birds alive)"""
+    RUTA_GRANJA = 'lote__galpon__granja'
+    lote = models.ForeignKey(Lote, on_delete=models.CASCADE, related_name='eventos_poblacion')
+    fecha = models.DateTimeField(default=timezone.now)
+    tipo = models.CharField(max_length=20, choices=TipoEventoPoblacion.choices)
+    delta = models.IntegerField(help_text="Cambio de población (negativo = aves perdidas)")
+    baja = models.ForeignKey(RegistroBajas, on_delete=models.SET_NULL, null=True, blank=True, related_name='eventos_poblacion')
+    registrado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['lote', 'fecha'])]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.delta:+d} en Lote {self.lote_id}"
+
+class PoblacionDiaria(EnGranja):
+    """Daily cumulative snapshot: birds alive at the end of `fecha` (only days with events are stored)"""
+    RUTA_GRANJA = 'lote__galpon__granja'
+    lote = models.ForeignKey(Lote, on_delete=models.CASCADE, related_name='poblacion_diaria')
+    fecha = models.DateField()
+    bajas = models.IntegerField(default=0, help_text="Bajas netas del día")
+    aves_vivas = models.IntegerField()
+
+    class Meta:
+        unique_together = ('lote', 'fecha')
+
+    def __str__(self):
+        return f"Lote {self.lote_id} {self.fecha}: {self.aves_vivas} aves"
+
+class CurvaEstandar(models.Model):
+    """Breed standard per week of life, used as benchmark in the laying curves"""
+    raza = models.CharField(max_length=100, help_text="Debe coincidir con Lote.raza (sin distinguir mayúsculas)")
+    semana = models.PositiveIntegerField(help_text="Semana de vida del lote (1 = semana de ingreso)")
+    tasa_puesta = models.FloatField(null=True, blank=True, help_text="% de puesta esperado")
+    consumo_ave_g = models.FloatField(null=True, blank=True, help_text="Gramos de alimento por ave y día")
+    mortalidad_pct = models.FloatField(null=True, blank=True, help_text="% de mortalidad semanal")
+
+    class Meta:
+        unique_together = ('raza', 'semana')
+        ordering = ['raza', 'semana']
+
+    def __str__(self):
+        return f"{self.raza} semana {self.semana}"
+
+class MovimientoInterno(EnGranja):
+    RUTA_GRANJA = 'lote__galpon__granja'
     id_movimiento = models.AutoField(primary_key=True)
     lote = models.ForeignKey(Lote, on_delete=models.CASCADE)
     articulo = models.ForeignKey(Articulo, on_delete=models.CASCADE)
@@ -152,16 +321,22 @@ class MovimientoInterno(models.Model):
         max_length=20,
         choices=TipoMovimiento.choices
     )
-    cantidad = models.DecimalField(max_digits=10, decimal_places=2)
+    cantidad = CantidadField(max_digits=10)
     fecha = models.DateTimeField(default=timezone.now)
+    costo_unitario = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True, editable=False, help_text="Costo promedio del artículo al registrar el consumo")
+    archivado = models.BooleanField(default=False, editable=False, help_text="Resumen diario de movimientos archivados (detalle en MovimientoInternoArchivo)")
+
+    class Meta:
+        indexes = [models.Index(fields=['lote', 'fecha'])]
 
     def __str__(self):
         return f"{self.get_tipo_movimiento_display()} - {self.articulo.nombre}"
 
 # --- COMMERCIAL CYCLE ---
 
-class Entidad(models.Model):
+class Entidad(EnGranja):
     id_entidad = models.AutoField(primary_key=True)
+    granja = models.ForeignKey(Granja, on_delete=models.PROTECT, default=por_defecto, editable=False, db_index=False, related_name='entidades')
     nombre_razon_social = models.CharField(max_length=200)
     rut = models.CharField(max_length=20, blank=True, null=True)
     es_cliente = models.BooleanField(default=False)
@@ -169,14 +344,18 @@ class Entidad(models.Model):
     telefono = models.CharField(max_length=50, blank=True, null=True)
     direccion = models.CharField(max_length=250, blank=True, null=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['granja', 'nombre_razon_social'])]
+
     def __str__(self):
         roles = []
         if self.es_cliente: roles.append("Cliente")
         if self.es_proveedor: roles.append("Proveedor")
         return f"{self.nombre_razon_social} ({', '.join(roles)})"
 
-class CabeceraTransaccion(models.Model):
+class CabeceraTransaccion(ChangeTrackingMixin, EnGranja):
     id_transaccion = models.AutoField(primary_key=True)
+    granja = models.ForeignKey(Granja, on_delete=models.PROTECT, default=por_defecto, editable=False, db_index=False, related_name='transacciones')
     tipo_operacion = models.CharField(
         max_length=20,
         choices=TipoOperacion.choices
@@ -197,14 +376,18 @@ class CabeceraTransaccion(models.Model):
     )
     observaciones = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['granja', '-fecha']), models.Index(fields=['granja', 'estado_pago', 'tipo_operacion'])]
+
     def __str__(self):
         return f"{self.get_tipo_operacion_display()} #{self.id_transaccion} - {self.entidad.nombre_razon_social}"
 
-class DetalleTransaccion(models.Model):
+class DetalleTransaccion(EnGranja):
+    RUTA_GRANJA = 'transaccion__granja'
     id_detalle = models.AutoField(primary_key=True)
     transaccion = models.ForeignKey(CabeceraTransaccion, on_delete=models.CASCADE, related_name='detalles')
     articulo = models.ForeignKey(Articulo, on_delete=models.PROTECT)
-    cantidad = models.DecimalField(max_digits=10, decimal_places=2)
+    cantidad = CantidadField(max_digits=10)
     precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
     subtotal = models.DecimalField(max_digits=12, decimal_places=2, editable=False)
 
@@ -215,3 +398,217 @@ class DetalleTransaccion(models.Model):
     
     def __str__(self):
         return f"{self.articulo.nombre} x {self.cantidad}"
+
+class SaldoEntidad(EnGranja):
+    """
+    Open balance of an Entidad (PENDIENTE transactions): receivable for VENTA, payable
+    for COMPRA, split in aging buckets as of `al`. Kept up to date incrementally by the
+    CabeceraTransaccion signals; the buckets are re-aged with one grouped query per day.
+    """
+    RUTA_GRANJA = 'entidad__granja'
+    entidad = models.ForeignKey(Entidad, on_delete=models.CASCADE, related_name='saldos')
+    tipo_operacion = models.CharField(max_length=20, choices=TipoOperacion.choices)
+    saldo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    pendientes = models.IntegerField(default=0, help_text="Transacciones pendientes")
+    tramo_30 = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text="0 a 30 días")
+    tramo_60 = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text="31 a 60 días")
+    tramo_90 = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text="61 a 90 días")
+    tramo_mas_90 = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text="Más de 90 días")
+    mas_antigua = models.DateField(null=True, blank=True, help_text="Fecha de la transacción pendiente más antigua")
+    al = models.DateField(help_text="Fecha a la que están calculados los tramos")
+
+    class Meta:
+        unique_together = ('entidad', 'tipo_operacion')
+        indexes = [models.Index(fields=['tipo_operacion', '-saldo'])]
+
+    def __str__(self):
+        return f"Saldo {self.get_tipo_operacion_display()} {self.entidad.nombre_razon_social}"
+
+# --- PLANNING ---
+
+class PronosticoConsumo(EnGranja):
+    """Feed demand forecast per Lote and article, recomputed nightly by forecast_consumption"""
+    RUTA_GRANJA = 'lote__galpon__granja'
+    lote = models.ForeignKey(Lote, on_delete=models.CASCADE, related_name='pronosticos')
+    articulo = models.ForeignKey(Articulo, on_delete=models.CASCADE, related_name='pronosticos')
+    calculado = models.DateTimeField(default=timezone.now)
+    consumo_ave_dia = models.FloatField(help_text="Consumo ajustado por ave y día a la fecha del cálculo")
+    tendencia = models.FloatField(help_text="Variación diaria del consumo por ave")
+    dias_historia = models.IntegerField(help_text="Días con consumo usados en el ajuste")
+    semanas = models.JSONField(default=list, help_text="Demanda acumulada proyectada al cierre de cada semana (1 a 6)")
+
+    class Meta:
+        unique_together = ('lote', 'articulo')
+
+    def __str__(self):
+        return f"Pronóstico {self.articulo} - Lote {self.lote_id}"
+
+class ResumenGalponMes(EnGranja):
+    """Monthly occupancy and performance rollup per Galpon, rebuilt from the per-lote daily data when marked pendiente"""
+    RUTA_GRANJA = 'galpon__granja'
+    galpon = models.ForeignKey(Galpon, on_delete=models.CASCADE, related_name='resumenes')
+    mes = models.DateField(help_text="Primer día del mes")
+    lotes = models.IntegerField(default=0, help_text="Lotes con aves en el mes")
+    aves_dia = models.BigIntegerField(default=0, help_text="Suma de aves vivas de cada día (aves-día)")
+    capacidad_dia = models.BigIntegerField(default=0, help_text="Capacidad máxima x días del mes")
+    dias_ocupado = models.IntegerField(default=0)
+    bajas = models.IntegerField(default=0)
+    huevos = CantidadField(max_digits=14, default=0)
+    alimento = CantidadField(max_digits=14, default=0)
+    pendiente = models.BooleanField(default=True)
+    actualizado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('galpon', 'mes')
+        indexes = [models.Index(fields=['pendiente', 'mes'])]
+
+    @property
+    def ocupacion(self):
+        return round(self.aves_dia * 100 / self.capacidad_dia, 1) if self.capacidad_dia else 0
+
+    @property
+    def tasa_puesta(self):
+        return round(float(self.huevos) * 100 / self.aves_dia, 1) if self.aves_dia else 0
+
+    @property
+    def gramos_por_huevo(self):
+        return round(float(self.alimento) * 1000 / float(self.huevos), 1) if self.huevos else 0
+
+    def __str__(self):
+        return f"{self.galpon} {self.mes:%m/%Y}"
+
+class CierreLote(EnGranja):
+    """Frozen close-out summary of a closed Lote (cierres.py): written when it closes, rebuilt only on request"""
+    RUTA_GRANJA = 'lote__galpon__granja'
+    lote = models.OneToOneField(Lote, on_delete=models.CASCADE, primary_key=True, related_name='cierre')
+    fecha_cierre = models.DateField(help_text="Último día con actividad registrada")
+    dias = models.IntegerField(help_text="Duración del lote en días")
+    aves_iniciales = models.IntegerField()
+    aves_finales = models.IntegerField()
+    huevos = CantidadField(max_digits=14, default=0)
+    alimento = CantidadField(max_digits=14, default=0)
+    bajas = models.IntegerField(default=0)
+    bajas_motivo = models.JSONField(default=dict, help_text="Bajas por motivo {MotivoBaja: cantidad}")
+    puesta_pico = models.FloatField(null=True, blank=True, help_text="Tasa de puesta semanal máxima (%)")
+    semana_pico = models.IntegerField(null=True, blank=True)
+    gramos_huevo = models.FloatField(null=True, blank=True, help_text="Alimento consumido por huevo producido (g)")
+    costo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    costo_huevo = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True)
+    precio_huevo = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True)
+    margen = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
+    calculado = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['fecha_cierre'])]
+
+    @property
+    def mortalidad(self):
+        return round(self.bajas * 100 / self.aves_iniciales, 1) if self.aves_iniciales else 0
+
+    @property
+    def costo_docena(self):
+        return self.costo_huevo * 12 if self.costo_huevo is not None else None
+
+    def __str__(self):
+        return f"Cierre Lote {self.lote_id}"
+
+# --- BACKGROUND PROCESSING ---
+
+class OutboxEvento(models.Model):
+    """
+    Side effect (kardex, population ledger) written in the same transaction as the
+    record that caused it and applied later by the process_outbox worker.
+    Events with the same `clave` are applied strictly in id order.
+    """
+    tipo = models.CharField(max_length=30)
+    clave = models.CharField(max_length=50, help_text="Ordering key, e.g. articulo:12 or lote:3")
+    payload = models.JSONField(default=dict)
+    estado = models.CharField(max_length=20, choices=EstadoOutbox.choices, default=EstadoOutbox.PENDIENTE)
+    intentos = models.PositiveIntegerField(default=0)
+    disponible_desde = models.DateTimeField(default=timezone.now)
+    creado = models.DateTimeField(auto_now_add=True)
+    procesado = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'id']),
+            models.Index(fields=['clave', 'estado']),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} {self.clave} ({self.get_estado_display()})"
+
+# --- ARCHIVE ---
+# Detail rows moved out of the hot tables by archivo.archivar(); `anio` leads every index
+# so each year is a contiguous range (one yearly partition per table).
+
+class MovimientoInternoArchivo(EnGranja):
+    RUTA_GRANJA = 'lote__galpon__granja'
+    anio = models.PositiveSmallIntegerField()
+    id_original = models.IntegerField(unique=True)
+    lote = models.ForeignKey(Lote, on_delete=models.CASCADE, related_name='+')
+    articulo = models.ForeignKey(Articulo, on_delete=models.CASCADE, related_name='+')
+    tipo_movimiento = models.CharField(max_length=20, choices=TipoMovimiento.choices)
+    cantidad = CantidadField(max_digits=10)
+    fecha = models.DateTimeField()
+    costo_unitario = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['anio', 'lote', 'fecha'])]
+
+class RegistroBajasArchivo(EnGranja):
+    RUTA_GRANJA = 'lote__galpon__granja'
+    anio = models.PositiveSmallIntegerField()
+    id_original = models.IntegerField(unique=True)
+    lote = models.ForeignKey(Lote, on_delete=models.CASCADE, related_name='+')
+    fecha = models.DateTimeField()
+    cantidad = models.IntegerField()
+    motivo = models.CharField(max_length=20, choices=MotivoBaja.choices)
+
+    class Meta:
+        indexes = [models.Index(fields=['anio', 'lote', 'fecha'])]
+
+class LogArticuloArchivo(EnGranja):
+    RUTA_GRANJA = 'articulo__granja'
+    anio = models.PositiveSmallIntegerField()
+    id_original = models.IntegerField(unique=True)
+    articulo = models.ForeignKey(Articulo, on_delete=models.CASCADE, related_name='+')
+    fecha = models.DateTimeField()
+    tipo = models.CharField(max_length=20, choices=LogArticulo.TIPO_EVENTO)
+    cantidad = CantidadField(max_digits=10, default=0)
+    saldo_anterior = CantidadField(max_digits=10, default=0)
+    saldo_posterior = CantidadField(max_digits=10, default=0)
+    descripcion = models.TextField(blank=True, null=True)
+    costo_unitario = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True)
+    detalle_id = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['anio', 'articulo', 'fecha'])]
+
+# --- DIAGNOSTICS ---
+
+class PerfilPeticion(models.Model):
+    """
+    cProfile run of one request, taken on demand by a staff user (?_perfil=1 or the
+    X-Perfil header, see perfilado.py). Only the summary is kept: timings, the SQL
+    executed, the functions with most own time and the call tree of the heaviest ones.
+    """
+    creado = models.DateTimeField(auto_now_add=True)
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    metodo = models.CharField(max_length=10)
+    ruta = models.CharField(max_length=500)
+    status = models.PositiveSmallIntegerField()
+    duracion_ms = models.DecimalField(max_digits=10, decimal_places=1)
+    sql_ms = models.DecimalField(max_digits=10, decimal_places=1)
+    plantillas_ms = models.DecimalField(max_digits=10, decimal_places=1, help_text="Render de plantillas (incluye el SQL que dispara)")
+    num_consultas = models.PositiveIntegerField()
+    consultas = models.JSONField(default=list, help_text="[{sql, ms}] en orden de ejecución")
+    funciones = models.JSONField(default=list, help_text="[{funcion, llamadas, propio_ms, acumulado_ms}] por tiempo propio")
+    arbol = models.TextField(blank=True, default='', help_text="Llamadas de las funciones con más tiempo acumulado")
+
+    class Meta:
+        ordering = ['-creado']
+
+    def __str__(self):
+        return f"{self.metodo} {self.ruta} ({self.duracion_ms} ms)"
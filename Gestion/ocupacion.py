@@ -0,0 +1,118 @@
+"""
+Monthly rollups per Galpon (ResumenGalponMes).
+
+Writes never touch the rollup numbers: they only flag the (galpon, month) rows they
+affect as pendiente (a backdated baja also flags every later month, since it changes
+the birds alive from that day on). Reads rebuild the flagged rows, plus the current
+month once a day, from the per-lote daily data: PoblacionDiaria for birds and bajas,
+one grouped MovimientoInterno aggregate for eggs and feed. The dashboards then only
+read the rollup table, whatever the movement volume.
+"""
+import calendar
+import datetime
+
+from django.db.models import Max, Q, Sum
+from django.utils import timezone
+
+from . import poblacion
+from .models import Galpon, Lote, MovimientoInterno, ResumenGalponMes, TipoMovimiento
+
+
+def _mes(fecha):
+    if isinstance(fecha, datetime.datetime):
+        fecha = timezone.localdate(fecha) if timezone.is_aware(fecha) else fecha.date()
+    return fecha.replace(day=1)
+
+
+def _fin_mes(mes):
+    return mes.replace(day=calendar.monthrange(mes.year, mes.month)[1])
+
+
+def marcar(galpon_id, fecha, en_adelante=False):
+    """Flags the month of `fecha` (and every later month with `en_adelante`) for rebuild."""
+    mes = _mes(fecha)
+    if not ResumenGalponMes.objects.filter(galpon_id=galpon_id, mes=mes).update(pendiente=True):
+        ResumenGalponMes.objects.bulk_create([ResumenGalponMes(galpon_id=galpon_id, mes=mes)], ignore_conflicts=True)
+    if en_adelante:
+        ResumenGalponMes.objects.filter(galpon_id=galpon_id, mes__gt=mes).update(pendiente=True)
+
+
+def _fin_lote(lote, hoy):
+    """Last day with birds: today while active, last recorded movement once closed."""
+    if lote.estado:
+        return hoy
+    ultimo = MovimientoInterno.objects.filter(lote=lote).aggregate(m=Max('fecha'))['m']
+    return timezone.localdate(ultimo) if ultimo else lote.fecha_inicio
+
+
+def recalcular(galpon, mes, hoy=None):
+    """Rebuilds one month of one galpon."""
+    hoy = hoy or timezone.localdate()
+    desde, hasta = mes, min(_fin_mes(mes), hoy)
+    fila, _ = ResumenGalponMes.objects.get_or_create(galpon=galpon, mes=mes)
+    fila.lotes = fila.aves_dia = fila.dias_ocupado = fila.bajas = 0
+    fila.capacidad_dia = galpon.capacidad_max * ((hasta - desde).days + 1 if hasta >= desde else 0)
+
+    ocupados = set()
+    for lote in Lote.objects.filter(galpon=galpon, fecha_inicio__lte=hasta):
+        inicio, fin = max(desde, lote.fecha_inicio), min(hasta, _fin_lote(lote, hoy))
+        if fin < inicio:
+            continue
+        serie = poblacion.serie_poblacion(lote.pk, inicio, fin)
+        aves = [vivas for vivas, _ in serie.values()]
+        if not any(aves):
+            continue
+        fila.lotes += 1
+        fila.aves_dia += sum(aves)
+        fila.bajas += sum(b for _, b in serie.values())
+        ocupados.update(d for d, (vivas, _) in serie.items() if vivas > 0)
+    fila.dias_ocupado = len(ocupados)
+
+    totales = MovimientoInterno.objects.filter(lote__galpon=galpon, fecha__date__range=[desde, hasta]).aggregate(
+        huevos=Sum('cantidad', filter=Q(tipo_movimiento=TipoMovimiento.PRODUCCION)),
+        alimento=Sum('cantidad', filter=Q(tipo_movimiento=TipoMovimiento.CONSUMO)),
+    )
+    fila.huevos = totales['huevos'] or 0
+    fila.alimento = totales['alimento'] or 0
+    fila.pendiente = False
+    fila.actualizado = timezone.now()
+    fila.save()
+    return fila
+
+
+def actualizar(galpones=None):
+    """
+    Rebuilds flagged rows and the current month (once per day, so bird-days keep
+    accruing without writes). Returns the number of rows rebuilt.
+    """
+    hoy = timezone.localdate()
+    mes_actual = hoy.replace(day=1)
+    galpones = {g.pk: g for g in (galpones if galpones is not None else Galpon.objects.all())}
+
+    # Galpones housing an active lote always have a current month row
+    activos = set(Lote.objects.filter(estado=True, galpon_id__in=galpones).values_list('galpon_id', flat=True))
+    existentes = set(ResumenGalponMes.objects.filter(galpon_id__in=activos, mes=mes_actual).values_list('galpon_id', flat=True))
+    for galpon_id in activos - existentes:
+        marcar(galpon_id, mes_actual)
+
+    inicio_hoy = timezone.make_aware(datetime.datetime.combine(hoy, datetime.time.min))
+    filas = ResumenGalponMes.objects.filter(galpon_id__in=galpones).filter(
+        Q(pendiente=True) | Q(mes=mes_actual, actualizado__lt=inicio_hoy)
+    ).values_list('galpon_id', 'mes')
+    filas = list(filas)
+    for galpon_id, mes in filas:
+        recalcular(galpones[galpon_id], mes, hoy)
+    return len(filas)
+
+
+def reconstruir(galpon):
+    """Builds every month since the galpon's first lote (initial load / reconciliation)."""
+    primero = Lote.objects.filter(galpon=galpon).order_by('fecha_inicio').values_list('fecha_inicio', flat=True).first()
+    if primero is None:
+        return 0
+    hoy = timezone.localdate()
+    mes, n = _mes(primero), 0
+    while mes <= hoy:
+        recalcular(galpon, mes, hoy)
+        mes, n = _fin_mes(mes) + datetime.timedelta(days=1), n + 1
+    return n
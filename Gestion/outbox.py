@@ -0,0 +1,120 @@
+"""
+Transactional outbox.
+
+Inside `with outbox.diferir():` the stock/population signal handlers enqueue an
+OutboxEvento (one extra INSERT in the same transaction) instead of applying the
+kardex and ledger writes inline. The process_outbox worker applies them in batches,
+in id order per `clave`, retrying failures with exponential backoff. A key whose
+event ended FALLIDO stays blocked (later events would post on top of a chain it never
+posted) until the event is retried from the admin.
+"""
+import datetime
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import OutboxEvento, EstadoOutbox
+
+MAX_INTENTOS = 8
+
+_diferir = ContextVar('outbox_diferir', default=False)
+_handlers = {}
+
+
+@contextmanager
+def diferir():
+    """Defers side effects of the writes done inside the block to the outbox worker."""
+    token = _diferir.set(getattr(settings, 'GESTION_OUTBOX_KIOSCO', False))
+    try:
+        yield
+    finally:
+        _diferir.reset(token)
+
+
+def diferido():
+    return _diferir.get()
+
+
+def handler(tipo):
+    """Registers the function that applies events of `tipo` (receives the payload)."""
+    def decorator(func):
+        _handlers[tipo] = func
+        return func
+    return decorator
+
+
+def encolar(tipo, clave, payload):
+    return OutboxEvento.objects.create(tipo=tipo, clave=clave, payload=payload)
+
+
+def _aplicar(evento):
+    """Applies one event in a savepoint; on error schedules a retry. Returns True on success."""
+    try:
+        with transaction.atomic():
+            _handlers[evento.tipo](evento.payload)
+    except Exception as e:
+        evento.intentos += 1
+        evento.error = f"{type(e).__name__}: {e}"
+        evento.disponible_desde = timezone.now() + datetime.timedelta(seconds=5 * 2 ** evento.intentos)
+        if evento.intentos >= MAX_INTENTOS:
+            evento.estado = EstadoOutbox.FALLIDO
+        evento.save(update_fields=['intentos', 'error', 'disponible_desde', 'estado'])
+        return False
+
+    evento.estado = EstadoOutbox.PROCESADO
+    evento.procesado = timezone.now()
+    evento.save(update_fields=['estado', 'procesado'])
+    return True
+
+
+def _bloqueantes(ahora):
+    """Earlier events of the same key that hold it: failed for good, or pending and backed off."""
+    return OutboxEvento.objects.filter(clave=OuterRef('clave'), pk__lt=OuterRef('pk')).filter(
+        Q(estado=EstadoOutbox.FALLIDO) | Q(estado=EstadoOutbox.PENDIENTE, disponible_desde__gt=ahora)
+    )
+
+
+def procesar(limite=200):
+    """
+    Applies up to `limite` pending events in one transaction (one commit per batch).
+    The batch only takes events that are due and whose key is not held by an earlier
+    failed or backed-off event, so a stuck key never fills the batch and starves the
+    others. A key whose event fails in this batch is skipped for the rest of it.
+    Returns (aplicados, fallidos).
+    """
+    ahora = timezone.now()
+    aplicados = fallidos = 0
+    bloqueadas = set()
+
+    with transaction.atomic():
+        listos = (
+            OutboxEvento.objects.filter(estado=EstadoOutbox.PENDIENTE, disponible_desde__lte=ahora)
+            .exclude(Exists(_bloqueantes(ahora))).order_by('pk')[:limite]
+        )
+        for evento in listos:
+            if evento.clave in bloqueadas:
+                continue
+            if _aplicar(evento):
+                aplicados += 1
+            else:
+                fallidos += 1
+                bloqueadas.add(evento.clave)
+    return aplicados, fallidos
+
+
+def drenar(clave):
+    """
+    Applies pending events of `clave` inline (ignoring backoff). Called before edits and
+    deletions so they always find the entries created by earlier deferred writes.
+    Nothing is applied while the key has a FALLIDO event.
+    """
+    eventos = list(OutboxEvento.objects.filter(clave=clave, estado__in=[EstadoOutbox.PENDIENTE, EstadoOutbox.FALLIDO]).order_by('pk'))
+    if any(e.estado == EstadoOutbox.FALLIDO for e in eventos):
+        return
+    for evento in eventos:
+        if not _aplicar(evento):
+            break
@@ -0,0 +1,121 @@
+"""
+On-demand request profiling for staff users.
+
+Add ?_perfil=1 to a URL (or send the header X-Perfil: 1) while logged in as staff: the
+request runs under cProfile with every SQL statement timed through an execution
+wrapper, and a PerfilPeticion row is stored with the timings, the query list, the
+functions with the most own time and the call tree of the heaviest ones. The response
+carries an X-Perfil header with the admin URL of the profile.
+
+When not requested the cost is one dict lookup per request: the middleware does not
+touch the session, the profiler or the DB wrappers.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import sysconfig
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+from django.urls import reverse
+
+from .models import PerfilPeticion
+
+PARAMETRO = '_perfil'
+CABECERA = 'X-Perfil'
+MAX_FUNCIONES = 40
+MAX_ARBOL = 15 # Functions whose callees are listed
+MAX_CONSULTAS = 500 # Stored; all are counted and timed
+MAX_PERFILES = 200 # Older profiles are deleted
+
+PREFIJOS = sorted({str(settings.BASE_DIR), sysconfig.get_paths()['purelib'], sysconfig.get_paths()['stdlib'], sys.prefix}, key=len, reverse=True)
+RENDER_PLANTILLA = (Template.render.__code__.co_filename, Template.render.__code__.co_firstlineno, 'render')
+
+
+def solicitado(request):
+    return PARAMETRO in request.GET or CABECERA in request.headers
+
+
+def _nombre(funcion):
+    archivo, linea, nombre = funcion
+    if archivo == '~': # Builtins
+        return nombre
+    for prefijo in PREFIJOS:
+        if archivo.startswith(prefijo):
+            archivo = os.path.relpath(archivo, prefijo)
+            break
+    return f"{archivo}:{linea}({nombre})"
+
+
+def _funciones(stats):
+    filas = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:MAX_FUNCIONES]
+    return [
+        {'funcion': _nombre(f), 'llamadas': nc, 'propio_ms': round(tt * 1000, 2), 'acumulado_ms': round(ct * 1000, 2)}
+        for f, (cc, nc, tt, ct, callers) in filas
+    ]
+
+
+def _arbol(stats):
+    salida = io.StringIO()
+    stats.stream = salida
+    stats.sort_stats('cumulative').print_callees(MAX_ARBOL)
+    texto = salida.getvalue()
+    for prefijo in PREFIJOS:
+        texto = texto.replace(prefijo + os.sep, '')
+    return texto
+
+
+def perfilar(request, get_response):
+    """Runs get_response(request) under the profiler and stores the PerfilPeticion."""
+    consultas = []
+    sql = {'n': 0, 'segundos': 0.0}
+
+    def medir(execute, sentencia, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sentencia, params, many, context)
+        finally:
+            transcurrido = time.perf_counter() - inicio
+            sql['n'] += 1
+            sql['segundos'] += transcurrido
+            if len(consultas) < MAX_CONSULTAS:
+                consultas.append({'sql': sentencia, 'ms': round(transcurrido * 1000, 2)})
+
+    perfil = cProfile.Profile()
+    with ExitStack() as pila:
+        for conexion in connections.all():
+            pila.enter_context(conexion.execute_wrapper(medir))
+        inicio = time.perf_counter()
+        perfil.enable()
+        try:
+            response = get_response(request)
+            if getattr(response, 'render', None) and callable(response.render) and not response.is_rendered:
+                response.render() # TemplateResponse: render inside the profile
+        finally:
+            perfil.disable()
+        duracion = time.perf_counter() - inicio
+
+    stats = pstats.Stats(perfil, stream=io.StringIO())
+    registro = PerfilPeticion.objects.create(
+        usuario=request.user,
+        metodo=request.method,
+        ruta=request.get_full_path()[:500],
+        status=response.status_code,
+        duracion_ms=round(duracion * 1000, 1),
+        sql_ms=round(sql['segundos'] * 1000, 1),
+        plantillas_ms=round(stats.stats.get(RENDER_PLANTILLA, (0, 0, 0, 0))[3] * 1000, 1),
+        num_consultas=sql['n'],
+        consultas=consultas,
+        funciones=_funciones(stats),
+        arbol=_arbol(stats),
+    )
+    viejos = PerfilPeticion.objects.order_by('-creado', '-pk').values_list('pk', flat=True)[MAX_PERFILES:]
+    PerfilPeticion.objects.filter(pk__in=list(viejos)).delete()
+
+    response[CABECERA] = reverse('admin:Gestion_perfilpeticion_change', args=[registro.pk])
+    return response
@@ -0,0 +1,154 @@
+"""
+Feed consumption forecast per Lote.
+
+For every (lote, article) pair with CONSUMO in the last HISTORIA_DIAS days, the daily
+consumption per bird is fitted against the lote age with a weighted linear regression
+(days without a record weigh zero). All pairs share the same day axis, so the fits are
+solved together in closed form with NumPy. The fitted per-bird rate is projected over
+SEMANAS weeks, multiplied by the birds expected alive (current count decayed by the
+recent daily mortality rate).
+
+forecast_consumption stores the results in PronosticoConsumo (nightly); the planning view
+only sums those rows.
+"""
+import datetime
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import granjas, poblacion
+from .models import Lote, MovimientoInterno, PronosticoConsumo, TipoMovimiento
+
+HISTORIA_DIAS = 56
+SEMANAS = 6
+
+
+def _ajuste(y, w):
+    """
+    Weighted least squares of each column of y (days x series) against t = 0..days-1.
+    Returns (intercept, slope) arrays; series with fewer than two points get a flat fit.
+    """
+    t = np.arange(y.shape[0], dtype=float)[:, None]
+    s0 = w.sum(axis=0)
+    s1 = (w * t).sum(axis=0)
+    s2 = (w * t * t).sum(axis=0)
+    sy = (w * y).sum(axis=0)
+    sty = (w * t * y).sum(axis=0)
+
+    det = s0 * s2 - s1 * s1
+    plano = det <= 0
+    det[plano] = 1
+    pendiente = np.where(plano, 0.0, (s0 * sty - s1 * sy) / det)
+    media = np.divide(sy, s0, out=np.zeros_like(sy), where=s0 > 0)
+    intercepto = np.where(plano, media, (sy - pendiente * s1) / np.where(s0 > 0, s0, 1))
+    return intercepto, pendiente
+
+
+def calcular(hoy=None):
+    """Recomputes the forecast of every active Lote. Returns the number of (lote, article) pairs."""
+    hoy = hoy or timezone.localdate()
+    desde = hoy - datetime.timedelta(days=HISTORIA_DIAS)
+    hasta = hoy - datetime.timedelta(days=1) # Today is still incomplete
+    lotes = {l.pk: l for l in Lote.objects.filter(estado=True)}
+
+    consumos = (
+        MovimientoInterno.objects
+        .filter(lote_id__in=lotes, tipo_movimiento=TipoMovimiento.CONSUMO, fecha__date__range=[desde, hasta])
+        .annotate(dia=TruncDate('fecha'))
+        .values('lote_id', 'articulo_id', 'dia')
+        .annotate(total=Sum('cantidad'))
+    )
+    series = {}
+    for c in consumos:
+        series.setdefault((c['lote_id'], c['articulo_id']), []).append((c['dia'], float(c['total'])))
+    claves = sorted(series)
+
+    # Birds alive per day and mean daily mortality rate, per lote
+    aves = {}
+    mortalidad = {}
+    for lote_id in {lote_id for lote_id, _ in claves}:
+        serie = poblacion.serie_poblacion(lote_id, desde, hasta)
+        aves[lote_id] = np.array([vivas for vivas, _ in serie.values()], dtype=float)
+        bajas = np.array([b for _, b in serie.values()], dtype=float)
+        mortalidad[lote_id] = float(np.mean(np.divide(bajas, aves[lote_id] + bajas, out=np.zeros_like(bajas), where=aves[lote_id] + bajas > 0)))
+
+    dias = HISTORIA_DIAS
+    y = np.zeros((dias, len(claves)))
+    w = np.zeros((dias, len(claves)))
+    for j, (lote_id, articulo_id) in enumerate(claves):
+        for dia, total in series[(lote_id, articulo_id)]:
+            i = (dia - desde).days
+            vivas = aves[lote_id][i]
+            if vivas > 0 and total > 0:
+                y[i, j] = total / vivas
+                w[i, j] = 1
+
+    intercepto, pendiente = _ajuste(y, w)
+
+    # Projection: per-bird rate continues its trend, birds decay at the recent mortality rate
+    h = np.arange(1, SEMANAS * 7 + 1, dtype=float)[:, None]
+    por_ave = np.maximum(intercepto + pendiente * (dias - 1 + h), 0)
+    actuales = np.array([lotes[lote_id].aves_actuales for lote_id, _ in claves], dtype=float)
+    tasa = np.array([mortalidad[lote_id] for lote_id, _ in claves])
+    demanda = por_ave * actuales * (1 - tasa) ** h
+    semanas = np.cumsum(demanda, axis=0)[6::7]
+
+    ahora = timezone.now()
+    filas = [
+        PronosticoConsumo(
+            lote_id=lote_id, articulo_id=articulo_id, calculado=ahora,
+            consumo_ave_dia=float(max(intercepto[j] + pendiente[j] * dias, 0)),
+            tendencia=float(pendiente[j]),
+            dias_historia=int(w[:, j].sum()),
+            semanas=[round(float(v), 2) for v in semanas[:, j]],
+        )
+        for j, (lote_id, articulo_id) in enumerate(claves)
+    ]
+    with transaction.atomic():
+        PronosticoConsumo.objects.all().delete()
+        PronosticoConsumo.objects.bulk_create(filas)
+    return len(filas)
+
+
+def planificacion():
+    """
+    Demand per article across active lotes: {'calculado', 'articulos': [...], 'lotes': [...]}.
+    Cached until the next forecast run.
+    """
+    calculado = PronosticoConsumo.objects.aggregate(m=Max('calculado'))['m']
+    if calculado is None:
+        return None
+    key = f"pronostico:plan:{granjas.sufijo()}:{calculado.timestamp()}"
+    plan = cache.get(key)
+    if plan is not None:
+        return plan
+
+    filas = list(
+        PronosticoConsumo.objects.filter(lote__estado=True)
+        .select_related('articulo', 'lote__galpon')
+        .order_by('lote__galpon__nombre', 'articulo__nombre')
+    )
+    articulos = {}
+    for f in filas:
+        articulos.setdefault(f.articulo_id, (f.articulo, []))[1].append(f.semanas)
+
+    resumen = []
+    for articulo, semanas in articulos.values():
+        total = np.sum(np.array(semanas, dtype=float), axis=0)
+        resumen.append({
+            'articulo': articulo,
+            'stock_actual': articulo.stock_actual,
+            'semanas': [round(float(v), 1) for v in total],
+            # Week in which the current stock runs out (None = lasts the whole horizon)
+            'quiebre_semana': next((i + 1 for i, v in enumerate(total) if v > float(articulo.stock_actual)), None),
+            'faltante': round(max(float(total[-1]) - float(articulo.stock_actual), 0), 1),
+        })
+    resumen.sort(key=lambda r: r['articulo'].nombre)
+
+    plan = {'calculado': calculado, 'articulos': resumen, 'lotes': filas}
+    cache.set(key, plan, 60 * 60 * 24)
+    return plan
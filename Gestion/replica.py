@@ -0,0 +1,103 @@
+"""
+Read replica for the reporting views.
+
+Views decorated with @usar_replica (dashboards, curves, costs) read from the
+'reportes' database alias while it is fresh enough; everything else, and every write,
+stays on the primary (routers.ReplicaRouter).
+
+- SQLite: 'reportes' is a copy of the primary file made with the online backup API by
+  the refresh_replica command (run it in a loop or from cron). The copy is written
+  next to the target and swapped in with a rename, so readers never see a half copy;
+  connections to it are query_only.
+- PostgreSQL: point GESTION_REPLICA_HOST at a hot standby; its replay lag is the
+  staleness and refresh_replica has nothing to do.
+
+If the copy is missing or older than MAX_RETRASO (refresher not running) the views
+read from the primary. The age of the data served is shown in the page header.
+"""
+import datetime
+import os
+import sqlite3
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+ALIAS = 'reportes'
+MAX_RETRASO = datetime.timedelta(minutes=30)
+PAGINAS_POR_PASO = 1024 # Backup step: the primary is only locked while each step is copied
+CACHE_ESTADO = 'replica:estado'
+
+_en_replica = ContextVar('en_replica', default=False)
+
+
+def configurada():
+    return ALIAS in connections.settings
+
+
+def activa():
+    """True while a @usar_replica view is running with a usable replica."""
+    return _en_replica.get()
+
+
+def _ruta(alias):
+    return str(connections[alias].settings_dict['NAME'])
+
+
+def estado():
+    """Moment the replica data corresponds to, or None if it is missing or too old to use."""
+    if not configurada():
+        return None
+    conexion = connections[ALIAS]
+    if conexion.vendor == 'sqlite':
+        try:
+            al = datetime.datetime.fromtimestamp(os.stat(_ruta(ALIAS)).st_mtime, tz=datetime.timezone.utc)
+        except (OSError, ValueError): # No copy yet (or an in-memory test mirror)
+            return None
+    elif conexion.vendor == 'postgresql':
+        al = cache.get(CACHE_ESTADO)
+        if al is None:
+            with conexion.cursor() as cursor:
+                cursor.execute("SELECT COALESCE(pg_last_xact_replay_timestamp(), now())")
+                al = cursor.fetchone()[0]
+            cache.set(CACHE_ESTADO, al, 30)
+    else:
+        return None
+    return al if timezone.now() - al <= MAX_RETRASO else None
+
+
+def refrescar(origen=None, destino=None):
+    """Copies the primary SQLite file onto the replica path with the backup API. Returns the snapshot time."""
+    origen = origen or _ruta(DEFAULT_DB_ALIAS)
+    destino = destino or _ruta(ALIAS)
+    temporal = f"{destino}.tmp"
+    inicio = time.time()
+    fuente, copia = sqlite3.connect(origen), sqlite3.connect(temporal)
+    try:
+        fuente.backup(copia, pages=PAGINAS_POR_PASO, sleep=0.005)
+        copia.execute("PRAGMA journal_mode=DELETE") # Read-only copy: no -wal file to go stale on swap
+    finally:
+        copia.close()
+        fuente.close()
+    os.utime(temporal, (inicio, inicio)) # Age = when the copy started
+    os.replace(temporal, destino)
+    return datetime.datetime.fromtimestamp(inicio, tz=datetime.timezone.utc)
+
+
+def usar_replica(vista):
+    """Runs a read-only view against the replica when it is usable (sets request.replica_al)."""
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        al = estado() if request.method in ('GET', 'HEAD') else None
+        if al is None:
+            return vista(request, *args, **kwargs)
+        request.replica_al = al
+        token = _en_replica.set(True)
+        try:
+            return vista(request, *args, **kwargs)
+        finally:
+            _en_replica.reset(token)
+    return envoltura
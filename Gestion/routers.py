@@ -0,0 +1,21 @@
+from django.db import DEFAULT_DB_ALIAS
+
+from . import replica
+
+
+class ReplicaRouter:
+    """
+    Reads go to the reporting replica only inside @replica.usar_replica views; writes
+    always go to the primary (also for instances that were read from the replica).
+    """
+    def db_for_read(self, model, **hints):
+        return replica.ALIAS if replica.activa() else None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != replica.ALIAS # A copy of the primary, never migrated on its own
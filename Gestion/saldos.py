@@ -0,0 +1,159 @@
+"""
+Accounts receivable (VENTA) / payable (COMPRA) per Entidad.
+
+SaldoEntidad holds the open balance of every entity and its aging buckets. Each change
+to a PENDIENTE transaction (created, total changed, paid, voided, deleted) posts its
+delta with one UPDATE on the entity row, in the same transaction. Buckets age with the
+calendar, so the first read of a new day re-ages every row with one grouped query over
+the pending transactions.
+"""
+import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Min, Q, Sum
+from django.utils import timezone
+
+from .models import CabeceraTransaccion, EstadoPago, SaldoEntidad
+
+TRAMOS = [
+    ('tramo_30', '0-30 días', 0, 30),
+    ('tramo_60', '31-60 días', 31, 60),
+    ('tramo_90', '61-90 días', 61, 90),
+    ('tramo_mas_90', '+90 días', 91, None),
+]
+
+
+def tramo(fecha, al):
+    """Bucket field of a transaction dated `fecha`, aged as of `al` (future dates count as current)."""
+    dias = (al - fecha).days
+    for campo, _, _, hasta in TRAMOS:
+        if hasta is None or dias <= hasta:
+            return campo
+
+
+def aporte(entidad_id, tipo_operacion, fecha, monto, estado_pago):
+    """What a transaction contributes to the balances: (entidad, tipo, fecha, monto) or None."""
+    if estado_pago != EstadoPago.PENDIENTE or not monto:
+        return None
+    if isinstance(fecha, datetime.datetime): # Unsaved default (timezone.now)
+        fecha = timezone.localdate(fecha)
+    return (entidad_id, tipo_operacion, fecha, Decimal(monto))
+
+
+def _aplicar(entidad_id, tipo_operacion, fecha, monto, pendientes):
+    fila, _ = SaldoEntidad.objects.get_or_create(
+        entidad_id=entidad_id, tipo_operacion=tipo_operacion, defaults={'al': timezone.localdate()}
+    )
+    cambios = {
+        'saldo': F('saldo') + monto,
+        'pendientes': F('pendientes') + pendientes,
+        tramo(fecha, fila.al): F(tramo(fecha, fila.al)) + monto,
+    }
+    if pendientes > 0 and (fila.mas_antigua is None or fecha < fila.mas_antigua):
+        cambios['mas_antigua'] = fecha
+    SaldoEntidad.objects.filter(pk=fila.pk).update(**cambios)
+
+    if pendientes < 0 and fila.mas_antigua is not None and fecha <= fila.mas_antigua:
+        # The oldest one may have just been settled: look up the next oldest pending one
+        SaldoEntidad.objects.filter(pk=fila.pk).update(mas_antigua=_pendientes().filter(
+            entidad_id=entidad_id, tipo_operacion=tipo_operacion
+        ).aggregate(m=Min('fecha'))['m'])
+
+
+def registrar_cambio(previo, actual):
+    """
+    Posts the difference between the old and new contribution of a transaction
+    (either may be None, see `aporte`).
+    """
+    if previo == actual:
+        return
+    with transaction.atomic():
+        if previo and actual and previo[:3] == actual[:3]:
+            _aplicar(*actual[:3], actual[3] - previo[3], 0)
+            return
+        if previo:
+            _aplicar(*previo[:3], -previo[3], -1)
+        if actual:
+            _aplicar(*actual[:3], actual[3], 1)
+
+
+def retirar(aportes):
+    """
+    Takes many contributions out at once (bulk pay / void, after the rows have been
+    updated): one UPDATE per entity row, then one grouped query for the oldest pending.
+    """
+    grupos = {}
+    for a in filter(None, aportes):
+        grupos.setdefault(a[:2], []).append(a)
+    if not grupos:
+        return
+    with transaction.atomic():
+        filas = SaldoEntidad.objects.filter(
+            entidad_id__in={e for e, _ in grupos}, tipo_operacion__in={t for _, t in grupos}
+        )
+        filas = {(f.entidad_id, f.tipo_operacion): f for f in filas}
+        for clave, lista in grupos.items():
+            fila = filas.get(clave)
+            if fila is None:
+                continue
+            cambios = {'saldo': F('saldo') - sum(a[3] for a in lista), 'pendientes': F('pendientes') - len(lista)}
+            por_tramo = {}
+            for _, _, fecha, monto in lista:
+                campo = tramo(fecha, fila.al)
+                por_tramo[campo] = por_tramo.get(campo, 0) + monto
+            cambios.update({campo: F(campo) - monto for campo, monto in por_tramo.items()})
+            SaldoEntidad.objects.filter(pk=fila.pk).update(**cambios)
+
+        antiguas = {
+            (r['entidad_id'], r['tipo_operacion']): r['m'] for r in _pendientes().filter(
+                entidad_id__in={e for e, _ in grupos}, tipo_operacion__in={t for _, t in grupos}
+            ).values('entidad_id', 'tipo_operacion').annotate(m=Min('fecha'))
+        }
+        for clave, fila in filas.items():
+            if clave in grupos and antiguas.get(clave) != fila.mas_antigua:
+                SaldoEntidad.objects.filter(pk=fila.pk).update(mas_antigua=antiguas.get(clave))
+
+
+def _pendientes():
+    return CabeceraTransaccion.objects.filter(estado_pago=EstadoPago.PENDIENTE).exclude(monto_total=0)
+
+
+def recalcular(hoy=None):
+    """Rebuilds every balance row, aged as of `hoy`, with one grouped query. Returns the number of rows."""
+    hoy = hoy or timezone.localdate()
+    limites = {}
+    for campo, _, desde, hasta in TRAMOS:
+        q = Q()
+        if desde:
+            q &= Q(fecha__lte=hoy - datetime.timedelta(days=desde))
+        if hasta is not None:
+            q &= Q(fecha__gt=hoy - datetime.timedelta(days=hasta + 1))
+        limites[campo] = Sum('monto_total', filter=q, default=0)
+
+    grupos = _pendientes().values('entidad_id', 'tipo_operacion').annotate(
+        saldo=Sum('monto_total'), pendientes=Count('pk'), mas_antigua=Min('fecha'), **limites
+    )
+    filas = [SaldoEntidad(al=hoy, **g) for g in grupos]
+    with transaction.atomic():
+        SaldoEntidad.objects.all().delete()
+        SaldoEntidad.objects.bulk_create(filas)
+    return len(filas)
+
+
+def actualizar(hoy=None):
+    """Re-ages the buckets if they were computed on a previous day (first read of the day)."""
+    hoy = hoy or timezone.localdate()
+    if SaldoEntidad.objects.filter(al__lt=hoy).exists():
+        recalcular(hoy)
+
+
+def saldos(tipo_operacion, hoy=None):
+    """Open balances of one side (VENTA = receivable, COMPRA = payable), largest first, with bucket totals."""
+    actualizar(hoy)
+    filas = SaldoEntidad.objects.filter(tipo_operacion=tipo_operacion).exclude(saldo=0).select_related('entidad').order_by('-saldo')
+    totales = filas.aggregate(
+        saldo=Sum('saldo', default=0), pendientes=Sum('pendientes', default=0), entidades=Count('pk'),
+        **{campo: Sum(campo, default=0) for campo, *_ in TRAMOS}
+    )
+    return filas, totales
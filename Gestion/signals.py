@@ -1,13 +1,22 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
 from django.core.exceptions import ValidationError
-from django.db.models import F
+from django.db.models import Sum
+from django.db.models.query import QuerySet
+from django.utils.dateparse import parse_datetime
+from decimal import Decimal
 from .models import (
-    DetalleTransaccion, CabeceraTransaccion, TipoOperacion,
+    DetalleTransaccion, CabeceraTransaccion, TipoOperacion, EstadoPago,
     MovimientoInterno, TipoMovimiento,
-    RegistroBajas, Lote,
-    Articulo, LogArticulo
+    RegistroBajas, Lote, TipoEventoPoblacion, Galpon, ResumenGalponMes, CierreLote,
+    Articulo, LogArticulo, LogArticuloArchivo, Granja
 )
+from . import poblacion, kardex, outbox, alertas, curvas, ocupacion, costos, saldos, fragmentos, cierres, granjas
+
+def is_cascade(sender, origin):
+    """True when the deletion was started by another model (e.g. deleting the whole Lote)"""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin is not None and model is not sender
 
 def create_log_entry(articulo, tipo, cantidad, saldo_ant, saldo_post, descripcion):
     """Helper to create log entry"""
@@ -22,166 +31,458 @@ def create_log_entry(articulo, tipo, cantidad, saldo_ant, saldo_post, descripcio
 
 # --- STOCK AUTOMATION ---
 
-@receiver(post_save, sender=DetalleTransaccion)
-def update_stock_transaction(sender, instance, created, **kwargs):
+def post_transaction_detail(instance):
     """
-    Updates stock based on purchase/sale details.
+    Posts a purchase/sale detail to stock and kardex at the transaction date.
     Only if controls_stock is True for the article.
     """
-    if not created:
-        return # For now simplify, handle updates later if needed
-
     transaccion = instance.transaccion
-    
-    # Update Transaction Total
-    transaccion.monto_total = transaccion.monto_total + instance.subtotal
-    transaccion.save(update_fields=['monto_total'])
-
     articulo = instance.articulo
-    stock_inicial = articulo.stock_actual
+    cantidad = Decimal(str(instance.cantidad))
+    fecha = kardex.fecha_transaccion(transaccion.fecha)
 
-    # Update Stock Logic
     if transaccion.tipo_operacion == TipoOperacion.COMPRA:
         # Only update stock if control is enabled
         if articulo.controlar_stock:
-            articulo.stock_actual = F('stock_actual') + instance.cantidad
-            articulo.save()
-            
-            # Log Purchase
-            articulo.refresh_from_db()
-            create_log_entry(
-                articulo, 'COMPRA', instance.cantidad, 
-                stock_inicial, articulo.stock_actual, 
-                f"Compra a {transaccion.entidad} (Doc: {transaccion.numero_documento})"
+            costos.registrar_compra(articulo, cantidad, instance.precio_unitario)
+            kardex.registrar(
+                articulo, 'COMPRA', cantidad, cantidad,
+                f"Compra a {transaccion.entidad} (Doc: {transaccion.numero_documento})",
+                fecha=fecha, detalle=instance, costo_unitario=instance.precio_unitario
             )
-        
+
     elif transaccion.tipo_operacion == TipoOperacion.VENTA:
         # Check if this article has a recipe (ALWAYS check this, regardless of own stock control)
-        receta = articulo.ingredientes_receta.all()
+        receta = list(articulo.ingredientes_receta.select_related('ingrediente'))
 
-        if receta.exists():
+        if receta:
             # It's a configured product/pack -> deducted ingredients
-            
+
             # Log the Pack Sale event (Just for history, even if stock doesn't move)
-            create_log_entry(
-                articulo, 'VENTA', instance.cantidad, 
-                stock_inicial, stock_inicial, 
-                f"Venta Pack a {transaccion.entidad} (Doc: {transaccion.numero_documento})"
+            kardex.registrar(
+                articulo, 'VENTA', cantidad, 0,
+                f"Venta Pack a {transaccion.entidad} (Doc: {transaccion.numero_documento})",
+                fecha=fecha, detalle=instance
             )
 
             # Deduct ingredients
             for ingrediente_receta in receta:
                 ingrediente = ingrediente_receta.ingrediente
-                
-                # Fix: Cast float to Decimal for multiplication
-                from decimal import Decimal
-                cantidad_receta = Decimal(str(ingrediente_receta.cantidad))
-                cantidad_a_descontar = instance.cantidad * cantidad_receta
-                
+                cantidad_a_descontar = cantidad * ingrediente_receta.cantidad
+
                 if ingrediente.controlar_stock:
-                    ing_stock_inicial = ingrediente.stock_actual
-                    ingrediente.stock_actual = F('stock_actual') - cantidad_a_descontar
-                    ingrediente.save()
-                    
-                    ingrediente.refresh_from_db()
                     # Using 'VENTA' for ingredients too, so it's clear it left via a sale
-                    create_log_entry(
-                        ingrediente, 'VENTA', cantidad_a_descontar,
-                        ing_stock_inicial, ingrediente.stock_actual,
-                        f"Venta en Pack: {articulo.nombre} (Doc: {transaccion.numero_documento})"
+                    kardex.registrar(
+                        ingrediente, 'VENTA', cantidad_a_descontar, -cantidad_a_descontar,
+                        f"Venta en Pack: {articulo.nombre} (Doc: {transaccion.numero_documento})",
+                        fecha=fecha, detalle=instance
                     )
 
         else:
-            # Standard Sale (No recipe) -> Only deduct if control is enabled
-            if articulo.controlar_stock:
-                articulo.stock_actual = F('stock_actual') - instance.cantidad
-                articulo.save()
-                
-                # Log Sale
-
-            articulo.refresh_from_db()
-            create_log_entry(
-                articulo, 'VENTA', instance.cantidad,
-                stock_inicial, articulo.stock_actual,
-                f"Venta a {transaccion.entidad} (Doc: {transaccion.numero_documento})"
+            # Standard Sale (No recipe) -> Only deduct if control is enabled (logged either way)
+            kardex.registrar(
+                articulo, 'VENTA', cantidad, -cantidad,
+                f"Venta a {transaccion.entidad} (Doc: {transaccion.numero_documento})",
+                fecha=fecha, detalle=instance
             )
 
-@receiver(post_save, sender=MovimientoInterno)
-def update_stock_internal(sender, instance, created, **kwargs):
+def revert_detail_entries(instance):
+    """Removes a detail's kardex entries (taking purchases back out of the average cost)."""
+    for entrada in instance.kardex.select_related('articulo'):
+        if entrada.tipo == 'COMPRA':
+            costos.revertir_compra(entrada.articulo, entrada.cantidad, entrada.costo_unitario)
+        kardex.revertir(entrada)
+
+def update_transaction_total(transaccion):
+    """Recomputes monto_total from the details (after edits/deletions)."""
+    transaccion.monto_total = transaccion.detalles.aggregate(total=Sum('subtotal'))['total'] or 0
+    transaccion.save(update_fields=['monto_total'])
+
+@receiver(pre_save, sender=DetalleTransaccion)
+def protect_archived_detail(sender, instance, **kwargs):
+    """
+    Once archivo.archivar() moved a detail's kardex entries to the archive there is
+    nothing left to reverse in the hot chain, so the detail can no longer be edited.
+    """
+    if not instance._state.adding and LogArticuloArchivo.objects.filter(detalle_id=instance.pk).exists():
+        raise ValidationError(f"El detalle #{instance.pk} tiene su kardex archivado; no se puede modificar.")
+
+@receiver(pre_delete, sender=DetalleTransaccion)
+def protect_archived_detail_delete(sender, instance, origin=None, **kwargs):
+    if not is_cascade(sender, origin) and LogArticuloArchivo.objects.filter(detalle_id=instance.pk).exists():
+        raise ValidationError(f"El detalle #{instance.pk} tiene su kardex archivado; no se puede eliminar.")
+
+@receiver(post_save, sender=DetalleTransaccion)
+def update_stock_transaction(sender, instance, created, **kwargs):
     """
-    Updates stock based on internal usage/production.
+    Updates stock based on purchase/sale details.
+    Edits reverse the detail's kardex entries and post it again at the same chain position.
     """
+    transaccion = instance.transaccion
+
+    if created:
+        # Update Transaction Total
+        transaccion.monto_total = transaccion.monto_total + instance.subtotal
+        transaccion.save(update_fields=['monto_total'])
+    else:
+        update_transaction_total(transaccion)
+
+    # Annulled transactions were already reversed; their details no longer move stock
+    if transaccion.estado_pago == EstadoPago.ANULADO:
+        return
+
     if not created:
+        revert_detail_entries(instance)
+
+    post_transaction_detail(instance)
+
+@receiver(pre_delete, sender=DetalleTransaccion)
+def reverse_stock_transaction(sender, instance, origin=None, **kwargs):
+    """Undoes the detail's kardex entries before it is deleted (history is kept on cascades)."""
+    if is_cascade(sender, origin) or instance.transaccion.estado_pago == EstadoPago.ANULADO:
         return
+    revert_detail_entries(instance)
+
+@receiver(post_delete, sender=DetalleTransaccion)
+def update_total_after_delete(sender, instance, origin=None, **kwargs):
+    if is_cascade(sender, origin):
+        return # Whole transaction is going away
+    update_transaction_total(instance.transaccion)
+
+# --- RECEIVABLES / PAYABLES ---
+
+BALANCE_FIELDS = ('entidad_id', 'tipo_operacion', 'fecha', 'monto_total', 'estado_pago')
+
+@receiver(pre_save, sender=CabeceraTransaccion)
+def remember_balance_contribution(sender, instance, **kwargs):
+    """What the stored row contributes to SaldoEntidad (from the load snapshot when available)."""
+    instance._aporte_previo = None
+    if instance._state.adding:
+        return
+    cargados = instance.valores_cargados
+    if cargados is None or any(f not in cargados for f in BALANCE_FIELDS):
+        cargados = CabeceraTransaccion.objects.filter(pk=instance.pk).values(*BALANCE_FIELDS).first() or {}
+    if cargados:
+        instance._aporte_previo = saldos.aporte(*(cargados[f] for f in BALANCE_FIELDS))
+
+@receiver(post_save, sender=CabeceraTransaccion)
+def update_entity_balance(sender, instance, **kwargs):
+    saldos.registrar_cambio(
+        getattr(instance, '_aporte_previo', None),
+        saldos.aporte(*(getattr(instance, f) for f in BALANCE_FIELDS))
+    )
+
+@receiver(post_delete, sender=CabeceraTransaccion)
+def remove_entity_balance(sender, instance, **kwargs):
+    saldos.registrar_cambio(saldos.aporte(*(getattr(instance, f) for f in BALANCE_FIELDS)), None)
+
+def internal_movement_delta(instance):
+    """(kardex tipo, signed stock delta) of an internal movement"""
+    cantidad = Decimal(str(instance.cantidad))
+    if instance.tipo_movimiento == TipoMovimiento.CONSUMO:
+        return 'CONSUMO', -cantidad
+    return 'PRODUCCION', cantidad
 
+def apply_internal_movement(instance, created):
+    """
+    Posts an internal movement to stock and kardex.
+    The entry is placed at the movement date, so backdated movements re-thread the later saldos.
+    Edits adjust the existing entry in place by the difference.
+    """
     articulo = instance.articulo
+    tipo_log, delta = internal_movement_delta(instance)
+
+    if not created:
+        entradas = list(instance.kardex.select_related('articulo'))
+        if len(entradas) == 1 and entradas[0].articulo_id == articulo.pk and entradas[0].fecha == instance.fecha:
+            kardex.ajustar(entradas[0], abs(delta), delta, tipo=tipo_log)
+            return
+        for entrada in entradas:
+            kardex.revertir(entrada)
+
+    costos.estampar_consumo(instance)
     if not articulo.controlar_stock:
         return
 
-    stock_inicial = articulo.stock_actual
-    
-    tipo_log = 'OTRO'
     # More descriptive message for internal movements
     desc = f"{instance.get_tipo_movimiento_display()}: {instance.lote.galpon.nombre} - {instance.lote.raza}"
+    kardex.registrar(articulo, tipo_log, abs(delta), delta, desc, fecha=instance.fecha, movimiento=instance)
 
-    if instance.tipo_movimiento == TipoMovimiento.CONSUMO:
-        articulo.stock_actual = F('stock_actual') - instance.cantidad
-        tipo_log = 'CONSUMO'
-    elif instance.tipo_movimiento == TipoMovimiento.PRODUCCION:
-        articulo.stock_actual = F('stock_actual') + instance.cantidad
-        tipo_log = 'PRODUCCION'
-    
-    articulo.save()
-    
-    articulo.refresh_from_db()
-    create_log_entry(
-        articulo, tipo_log, instance.cantidad,
-        stock_inicial, articulo.stock_actual,
-        desc
+@outbox.handler('MOVIMIENTO')
+def apply_deferred_movement(payload):
+    instance = MovimientoInterno.objects.select_related('articulo', 'lote__galpon').filter(pk=payload['id']).first()
+    if instance: # Deleted before the worker got to it: nothing left to post
+        apply_internal_movement(instance, payload['created'])
+        fragmentos.invalidar('articulos', granja=instance.articulo.granja_id)
+
+@receiver(post_save, sender=MovimientoInterno)
+def update_stock_internal(sender, instance, created, **kwargs):
+    """
+    Updates stock based on internal usage/production (deferred to the outbox inside outbox.diferir()).
+    """
+    clave = f"articulo:{instance.articulo_id}"
+    if outbox.diferido():
+        outbox.encolar('MOVIMIENTO', clave, {'id': instance.pk, 'created': created})
+        return
+    if not created:
+        outbox.drenar(clave)
+    apply_internal_movement(instance, created)
+
+@receiver(pre_delete, sender=MovimientoInterno)
+def reverse_stock_internal(sender, instance, origin=None, **kwargs):
+    """Removes the movement from its article's kardex chain before it is deleted (history is kept on cascades)."""
+    if is_cascade(sender, origin):
+        return
+    outbox.drenar(f"articulo:{instance.articulo_id}")
+    for entrada in instance.kardex.select_related('articulo'):
+        kardex.revertir(entrada)
+
+# --- FRAGMENT CACHE ---
+
+@receiver(post_save, sender=Articulo)
+@receiver(post_delete, sender=Articulo)
+@receiver(post_save, sender=DetalleTransaccion)
+@receiver(post_delete, sender=DetalleTransaccion)
+def invalidate_article_fragments(sender, instance, **kwargs):
+    """Article tables show stock, which purchases/sales move without saving the Articulo."""
+    fragmentos.invalidar('articulos', granja=granjas.de_fila(instance))
+
+@receiver(post_save, sender=Lote)
+@receiver(post_delete, sender=Lote)
+@receiver(post_save, sender=Galpon)
+@receiver(post_delete, sender=Galpon)
+def invalidate_lote_fragments(sender, instance, **kwargs):
+    fragmentos.invalidar(instance, 'lotes' if sender is Lote else 'galpones', granja=granjas.de_fila(instance))
+
+@receiver(post_save, sender=MovimientoInterno)
+@receiver(post_delete, sender=MovimientoInterno)
+@receiver(post_save, sender=RegistroBajas)
+@receiver(post_delete, sender=RegistroBajas)
+def invalidate_movement_fragments(sender, instance, **kwargs):
+    """Lote cards show today's movements and the birds alive; movements also move stock."""
+    fragmentos.invalidar(
+        f"lote:{instance.lote_id}", 'lotes', *(['articulos'] if sender is MovimientoInterno else []),
+        granja=granjas.de_fila(instance),
     )
 
+# --- FARMS ---
+
+@receiver(post_save, sender=Granja)
+@receiver(post_delete, sender=Granja)
+@receiver(m2m_changed, sender=Granja.usuarios.through)
+def invalidate_farm_lists(sender, **kwargs):
+    """The farms each user may work on and the default farm are cached (granjas.py)."""
+    granjas.invalidar_usuarios()
+    granjas.olvidar_predeterminada()
+
 # --- METADATA LOGGING ---
 
 @receiver(pre_save, sender=Articulo)
-def log_article_changes(sender, instance, **kwargs):
+def log_article_changes(sender, instance, update_fields=None, **kwargs):
     """
     Log changes to critical metadata (Min Stock, Name, etc.)
+    Diffs against the values the instance was loaded with (no extra SELECT).
     """
-    if instance.pk:
-        try:
-            old_instance = Articulo.objects.get(pk=instance.pk)
-            changes = []
-            
-            if old_instance.stock_minimo != instance.stock_minimo:
-                changes.append(f"Stock Min: {old_instance.stock_minimo} -> {instance.stock_minimo}")
-            
-            if old_instance.nombre != instance.nombre:
-                changes.append(f"Nombre: {old_instance.nombre} -> {instance.nombre}")
-                
-            if changes:
-                # We can't easily get post-save saldo here without double save, 
-                # using current stock as "no change" to stock
-                create_log_entry(
-                    instance, 'EDICION', 0,
-                    instance.stock_actual, instance.stock_actual,
-                    "; ".join(changes)
-                )
-        except Articulo.DoesNotExist:
-            pass # New article creation
+    if not instance.pk:
+        return # New article creation
+    if update_fields is not None and not {'stock_minimo', 'nombre'} & set(update_fields):
+        return
+
+    previo = instance.valores_cargados
+    if previo is None: # Instance built by hand, never loaded: fall back to reading the row
+        previo = Articulo.objects.filter(pk=instance.pk).values('stock_minimo', 'nombre').first()
+        if previo is None:
+            return # New article creation
+
+    changes = []
+    if 'stock_minimo' in previo and previo['stock_minimo'] != instance.stock_minimo:
+        changes.append(f"Stock Min: {previo['stock_minimo']} -> {instance.stock_minimo}")
+
+    if 'nombre' in previo and previo['nombre'] != instance.nombre:
+        changes.append(f"Nombre: {previo['nombre']} -> {instance.nombre}")
+
+    if changes:
+        # We can't easily get post-save saldo here without double save,
+        # using current stock as "no change" to stock
+        create_log_entry(
+            instance, 'EDICION', 0,
+            instance.stock_actual, instance.stock_actual,
+            "; ".join(changes)
+        )
+
+@receiver(post_save, sender=Articulo)
+def refresh_stock_alert(sender, instance, created, update_fields=None, **kwargs):
+    """Stock or minimum edited directly (form, manual adjustment): recompute its reorder row."""
+    if created or update_fields is None or {'stock_actual', 'stock_minimo', 'controlar_stock'} & set(update_fields):
+        alertas.marcar(instance.pk, instance.granja_id)
 
 # --- POPULATION AUTOMATION ---
 
+@receiver(post_save, sender=Lote)
+def post_initial_population(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Posts the initial placement to the population ledger, and the difference
+    when aves_iniciales is edited afterwards.
+    """
+    if created:
+        poblacion.registrar_evento(
+            instance.pk, TipoEventoPoblacion.INICIAL, instance.aves_iniciales,
+            poblacion.inicio_lote(instance),
+            actualizar_lote=False
+        )
+        return
+
+    if update_fields is not None and 'aves_iniciales' not in update_fields:
+        return
+
+    registrado = instance.eventos_poblacion.filter(
+        tipo__in=[TipoEventoPoblacion.INICIAL, TipoEventoPoblacion.AJUSTE]
+    ).aggregate(total=Sum('delta'))['total'] or 0
+    if registrado != instance.aves_iniciales:
+        poblacion.registrar_evento(
+            instance.pk, TipoEventoPoblacion.AJUSTE, instance.aves_iniciales - registrado,
+            poblacion.inicio_lote(instance)
+        )
+
+@receiver(post_save, sender=Lote)
+def close_out_lote(sender, instance, created, update_fields=None, **kwargs):
+    """Closing a lote freezes its summary (cierres.py); reopening it drops the summary."""
+    if update_fields is not None and 'estado' not in update_fields:
+        return
+    previo = (instance.valores_cargados or {}).get('estado')
+    if instance.estado:
+        if previo is False:
+            cierres.reabrir(instance)
+    elif created or previo is not False:
+        cierres.cerrar(instance)
+
+@receiver(post_save, sender=Lote)
+@receiver(post_delete, sender=Lote)
+def invalidate_laying_curves(sender, instance, **kwargs):
+    """Lotes added, closed or re-dated change the rows/alignment of the curve matrix."""
+    curvas.invalidar(granjas.de_fila(instance))
+
+@receiver(pre_save, sender=RegistroBajas)
+def remember_baja_values(sender, instance, **kwargs):
+    """Keeps the stored cantidad/fecha so post_save can post the edit as a delta."""
+    instance._valores_previos = None
+    if instance.pk:
+        instance._valores_previos = RegistroBajas.objects.filter(pk=instance.pk).values('cantidad', 'fecha').first()
+
+def apply_population_change(instance, previo, nuevo=None):
+    """
+    Updates bird population in the Lote through the population ledger.
+    Edits post the difference (reversing at the old date if the date moved).
+    `nuevo` ({cantidad, fecha}) is the state being posted; default: the instance's.
+    """
+    cantidad = int(nuevo['cantidad'] if nuevo else instance.cantidad)
+    fecha = nuevo['fecha'] if nuevo else instance.fecha
+
+    if previo is None:
+        poblacion.registrar_evento(instance.lote_id, TipoEventoPoblacion.BAJA, -cantidad, fecha, baja=instance)
+    elif previo['fecha'] != fecha:
+        poblacion.registrar_evento(instance.lote_id, TipoEventoPoblacion.EDICION, previo['cantidad'], previo['fecha'], baja=instance)
+        poblacion.registrar_evento(instance.lote_id, TipoEventoPoblacion.EDICION, -cantidad, fecha, baja=instance)
+    else:
+        poblacion.registrar_evento(instance.lote_id, TipoEventoPoblacion.EDICION, previo['cantidad'] - cantidad, fecha, baja=instance)
+
+def _valores_baja(valores):
+    return valores and {'cantidad': valores['cantidad'], 'fecha': parse_datetime(valores['fecha'])}
+
+@outbox.handler('BAJA')
+def apply_deferred_baja(payload):
+    """
+    Posts the change recorded in the event (previo -> nuevo), not the row's current
+    state: a create and later edits queued for the same baja each post their own step.
+    """
+    instance = RegistroBajas.objects.filter(pk=payload['id']).first()
+    if instance:
+        # Events queued before 'nuevo' was recorded fall back to the current row
+        apply_population_change(instance, _valores_baja(payload['previo']), _valores_baja(payload.get('nuevo')))
+        fragmentos.invalidar(f"lote:{instance.lote_id}", 'lotes', granja=granjas.de_fila(instance))
+
 @receiver(post_save, sender=RegistroBajas)
 def update_population(sender, instance, created, **kwargs):
     """
-    Updates bird population in the Lote.
+    Updates bird population in the Lote (deferred to the outbox inside outbox.diferir()).
+    """
+    previo = None if created else getattr(instance, '_valores_previos', None)
+    clave = f"lote:{instance.lote_id}"
+    if outbox.diferido():
+        outbox.encolar('BAJA', clave, {
+            'id': instance.pk,
+            'previo': previo and {'cantidad': previo['cantidad'], 'fecha': previo['fecha'].isoformat()},
+            'nuevo': {'cantidad': int(instance.cantidad), 'fecha': instance.fecha.isoformat()},
+        })
+        return
+    if previo:
+        outbox.drenar(clave)
+    apply_population_change(instance, previo)
+
+@receiver(pre_delete, sender=RegistroBajas)
+def flush_pending_baja(sender, instance, origin=None, **kwargs):
+    """Deferred posts of this lote must land before the deletion gives the birds back."""
+    if not is_cascade(sender, origin):
+        outbox.drenar(f"lote:{instance.lote_id}")
+
+@receiver(post_delete, sender=RegistroBajas)
+def restore_population(sender, instance, origin=None, **kwargs):
+    """
+    Gives the birds back when a baja is deleted (not when its whole Lote/Galpon is being deleted).
     """
+    if is_cascade(sender, origin):
+        return
+    poblacion.registrar_evento(instance.lote_id, TipoEventoPoblacion.ELIMINACION, instance.cantidad, instance.fecha)
+
+# --- GALPON ROLLUPS ---
+# Writes only flag the affected (galpon, month) rows; ocupacion.actualizar() rebuilds them on read.
+
+@receiver(pre_save, sender=MovimientoInterno)
+def remember_movement_month(sender, instance, **kwargs):
+    instance._galpon_mes_previo = None
+    if instance.pk:
+        instance._galpon_mes_previo = MovimientoInterno.objects.filter(pk=instance.pk).values_list('lote__galpon_id', 'fecha').first()
+
+@receiver(post_save, sender=MovimientoInterno)
+def flag_movement_month(sender, instance, **kwargs):
+    ocupacion.marcar(instance.lote.galpon_id, instance.fecha)
+    previo = getattr(instance, '_galpon_mes_previo', None)
+    if previo and previo != (instance.lote.galpon_id, instance.fecha):
+        ocupacion.marcar(*previo)
+
+@receiver(post_delete, sender=MovimientoInterno)
+def flag_deleted_movement_month(sender, instance, origin=None, **kwargs):
+    if not is_cascade(sender, origin):
+        ocupacion.marcar(instance.lote.galpon_id, instance.fecha)
+
+@receiver(post_save, sender=RegistroBajas)
+def flag_population_months(sender, instance, created, **kwargs):
+    """Bajas change the birds alive from their date on: flag that month and every later one."""
+    previo = None if created else getattr(instance, '_valores_previos', None)
+    fecha = min(instance.fecha, previo['fecha']) if previo else instance.fecha
+    ocupacion.marcar(instance.lote.galpon_id, fecha, en_adelante=True)
+
+@receiver(post_delete, sender=RegistroBajas)
+def flag_deleted_baja_months(sender, instance, origin=None, **kwargs):
+    if not is_cascade(sender, origin):
+        ocupacion.marcar(instance.lote.galpon_id, instance.fecha, en_adelante=True)
+
+@receiver(post_save, sender=Galpon)
+def flag_galpon_months(sender, instance, created, **kwargs):
+    """capacidad_max is snapshotted into every month row."""
     if not created:
+        ResumenGalponMes.objects.filter(galpon=instance).update(pendiente=True)
+
+@receiver(post_save, sender=Lote)
+def flag_lote_months(sender, instance, created, update_fields=None, **kwargs):
+    """Placement, closing or moving a lote changes every month of its galpon from fecha_inicio on."""
+    campos = {'galpon', 'fecha_inicio', 'aves_iniciales', 'estado'}
+    if not created and update_fields is not None and not campos & set(update_fields):
         return
-    
-    lote = instance.lote
-    lote.aves_actuales = F('aves_actuales') - instance.cantidad
-    lote.save()
+    ocupacion.marcar(instance.galpon_id, instance.fecha_inicio, en_adelante=True)
+    previo = instance.valores_cargados or {}
+    if not created and previo.get('galpon_id') not in (None, instance.galpon_id):
+        ocupacion.marcar(previo['galpon_id'], previo.get('fecha_inicio') or instance.fecha_inicio, en_adelante=True)
 
 # --- INTEGRITY RULES ---
 
@@ -194,6 +495,25 @@ def validate_batch_status(sender, instance, **kwargs):
         if not instance.lote.estado: # False = CERRADO
             raise ValidationError(f"Cannot register consumption for a CLOSED batch (Lote {instance.lote.id_lote})")
 
+@receiver(pre_save, sender=MovimientoInterno)
+@receiver(pre_save, sender=RegistroBajas)
+def protect_archived_summary(sender, instance, **kwargs):
+    """Daily summary rows left by archivo.archivar() stand for archived detail: read-only."""
+    if instance.pk and instance.archivado:
+        raise ValidationError("Los registros archivados (resumen diario) no se pueden modificar.")
+
+@receiver(pre_save, sender=CierreLote)
+def protect_close_out_summary(sender, instance, **kwargs):
+    """Close-out summaries are frozen: cierres.recalcular() replaces them, nothing edits them."""
+    if not instance._state.adding:
+        raise ValidationError("El resumen de cierre del lote no se puede modificar; use Recalcular.")
+
+@receiver(pre_delete, sender=MovimientoInterno)
+@receiver(pre_delete, sender=RegistroBajas)
+def protect_archived_summary_delete(sender, instance, origin=None, **kwargs):
+    if instance.archivado and not is_cascade(sender, origin):
+        raise ValidationError("Los registros archivados (resumen diario) no se pueden eliminar.")
+
 from .models import RegistroVacunacion
 
 @receiver(post_save, sender=RegistroVacunacion)
@@ -1,6 +1,7 @@
 from django import template
 from django.utils.safestring import mark_safe
 from django.utils.http import urlencode
+from Gestion import fragmentos, estaticos
 
 register = template.Library()
 
@@ -39,3 +40,41 @@ def sort_header(context, label, field):
     
     html = f'<a href="{url}" class="text-decoration-none text-dark fw-bold" style="cursor: pointer;">{label} {icon}</a>'
     return mark_safe(html)
+
+
+@register.simple_tag
+def vendor(nombre):
+    """
+    URL of a vendored third-party asset (see estaticos.VENDOR).
+    Usage: <link href="{% vendor 'bootstrap-css' %}" rel="stylesheet">
+    """
+    return estaticos.url(nombre)
+
+
+class FragmentoNode(template.Node):
+    def __init__(self, nodelist, nombre, dependencias):
+        self.nodelist = nodelist
+        self.nombre = nombre
+        self.dependencias = dependencias
+
+    def render(self, context):
+        return fragmentos.render(
+            self.nombre.resolve(context),
+            [d.resolve(context) for d in self.dependencias],
+            lambda: self.nodelist.render(context),
+        )
+
+@register.tag
+def fragmento(parser, token):
+    """
+    Caches the enclosed template fragment until one of its dependencies changes.
+    Usage: {% fragmento 'lote-card' lote lote.galpon fecha %}...{% endfragmento %}
+    Model instances and the scopes in fragmentos.AMBITOS ('articulos', ...) are versioned
+    (bumped by the signal handlers); any other value just varies the key.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' requiere al menos el nombre del fragmento")
+    nodelist = parser.parse(('endfragmento',))
+    parser.delete_first_token()
+    return FragmentoNode(nodelist, parser.compile_filter(bits[1]), [parser.compile_filter(b) for b in bits[2:]])
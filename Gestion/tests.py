@@ -1,12 +1,28 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from .models import (
     Articulo, TipoArticulo,
     Galpon, Lote, RegistroBajas, MotivoBaja,
     MovimientoInterno, TipoMovimiento,
-    Entidad, CabeceraTransaccion, DetalleTransaccion, TipoOperacion, EstadoPago
+    Entidad, CabeceraTransaccion, DetalleTransaccion, TipoOperacion, EstadoPago,
+    OutboxEvento, EstadoOutbox, PronosticoConsumo, CurvaEstandar, ResumenGalponMes, LogArticulo, SaldoEntidad,
+    PerfilPeticion, Receta, MovimientoInternoArchivo, RegistroBajasArchivo, LogArticuloArchivo, Granja, CierreLote
 )
+import datetime
+import numpy as np
+from decimal import Decimal
+from . import outbox, alertas, pronostico, curvas, ocupacion, costos, saldos, fragmentos, estaticos, perfilado, transacciones, replica, archivo, cantidades, granjas, graficos
+from .forms import LoteForm
+from .cache_sqlite import SQLiteCache
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.core.cache import cache
+from unittest import mock
 from django.core.exceptions import ValidationError
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
 
 class GestionTests(TestCase):
     def setUp(self):
@@ -114,3 +130,1300 @@ class GestionTests(TestCase):
                 tipo_movimiento=TipoMovimiento.CONSUMO,
                 cantidad=10
             )
+
+class LoteDetailTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        cache.clear()
+        self.user = User.objects.create_user('tester', password='x')
+        self.client.force_login(self.user)
+        self.galpon = Galpon.objects.create(nombre="Galpon 1", capacidad_max=1000)
+        self.lote = Lote.objects.create(galpon=self.galpon, raza="Raza 1", aves_iniciales=100)
+
+    def test_summary_header(self):
+        """Test that the summary totals are annotated on the lote."""
+        RegistroBajas.objects.create(lote=self.lote, cantidad=3)
+        RegistroBajas.objects.create(lote=self.lote, cantidad=2)
+        response = self.client.get(f'/lotes/{self.lote.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['lote'].total_bajas, 5)
+        self.assertEqual(response.context['lote'].total_produccion, 0)
+
+    def test_historial_keyset_pagination(self):
+        """Test that tab fragments page through every row exactly once."""
+        from .views import LOTE_TAB_PAGE_SIZE
+        fecha = timezone.now()
+        for i in range(LOTE_TAB_PAGE_SIZE + 5):
+            # Same timestamp on several rows: the pk tiebreaker must keep pages disjoint
+            RegistroBajas.objects.create(lote=self.lote, cantidad=1, fecha=fecha - timezone.timedelta(hours=i // 3))
+
+        url = f'/lotes/{self.lote.pk}/historial/bajas/'
+        first = self.client.get(url)
+        self.assertEqual(len(first.context['rows']), LOTE_TAB_PAGE_SIZE)
+        self.assertIsNotNone(first.context['next_cursor'])
+
+        second = self.client.get(url, {'cursor': first.context['next_cursor']})
+        self.assertEqual(len(second.context['rows']), 5)
+        self.assertIsNone(second.context['next_cursor'])
+
+        seen = [r.pk for r in first.context['rows']] + [r.pk for r in second.context['rows']]
+        self.assertEqual(len(set(seen)), LOTE_TAB_PAGE_SIZE + 5)
+
+    def test_historial_unknown_tab(self):
+        response = self.client.get(f'/lotes/{self.lote.pk}/historial/otro/')
+        self.assertEqual(response.status_code, 404)
+
+class PoblacionLedgerTests(TestCase):
+    def setUp(self):
+        self.galpon = Galpon.objects.create(nombre="Galpon 1", capacidad_max=1000)
+        self.lote = Lote.objects.create(
+            galpon=self.galpon, raza="Raza 1", aves_iniciales=100,
+            fecha_inicio=timezone.localdate() - timezone.timedelta(days=10)
+        )
+
+    def test_edit_adjusts_population_by_delta(self):
+        """Test that editing a baja's cantidad updates aves_actuales by the difference."""
+        baja = RegistroBajas.objects.create(lote=self.lote, cantidad=5)
+        baja.cantidad = 8
+        baja.save()
+        self.lote.refresh_from_db()
+        self.assertEqual(self.lote.aves_actuales, 92)
+
+    def test_delete_restores_population(self):
+        baja = RegistroBajas.objects.create(lote=self.lote, cantidad=5)
+        baja.delete()
+        self.lote.refresh_from_db()
+        self.assertEqual(self.lote.aves_actuales, 100)
+
+    def test_backdated_baja_updates_later_snapshots(self):
+        """Test that birds alive on a date reflect backdated bajas."""
+        from .poblacion import aves_vivas_en
+        hoy = timezone.now()
+        RegistroBajas.objects.create(lote=self.lote, cantidad=3, fecha=hoy)
+        RegistroBajas.objects.create(lote=self.lote, cantidad=4, fecha=hoy - timezone.timedelta(days=5))
+
+        self.assertEqual(aves_vivas_en(self.lote.pk, hoy - timezone.timedelta(days=6)), 100)
+        self.assertEqual(aves_vivas_en(self.lote.pk, hoy - timezone.timedelta(days=5)), 96)
+        self.assertEqual(aves_vivas_en(self.lote.pk, hoy), 93)
+
+    def test_moving_baja_date(self):
+        from .poblacion import aves_vivas_en
+        hoy = timezone.now()
+        baja = RegistroBajas.objects.create(lote=self.lote, cantidad=3, fecha=hoy)
+        baja.fecha = hoy - timezone.timedelta(days=3)
+        baja.save()
+        self.assertEqual(aves_vivas_en(self.lote.pk, hoy - timezone.timedelta(days=4)), 100)
+        self.assertEqual(aves_vivas_en(self.lote.pk, hoy - timezone.timedelta(days=3)), 97)
+        self.assertEqual(aves_vivas_en(self.lote.pk, hoy), 97)
+
+    def test_rebuild_matches_incremental(self):
+        from .models import PoblacionDiaria
+        from .poblacion import reconstruir
+        RegistroBajas.objects.create(lote=self.lote, cantidad=2, fecha=timezone.now() - timezone.timedelta(days=2))
+        RegistroBajas.objects.create(lote=self.lote, cantidad=6)
+        incremental = list(PoblacionDiaria.objects.filter(lote=self.lote).order_by('fecha').values_list('fecha', 'aves_vivas', 'bajas'))
+        reconstruir([self.lote])
+        rebuilt = list(PoblacionDiaria.objects.filter(lote=self.lote).order_by('fecha').values_list('fecha', 'aves_vivas', 'bajas'))
+        self.assertEqual(incremental, rebuilt)
+
+class KardexRethreadingTests(TestCase):
+    def setUp(self):
+        self.articulo = Articulo.objects.create(nombre="Alimento", tipo=TipoArticulo.INSUMO, stock_actual=0)
+        self.galpon = Galpon.objects.create(nombre="Galpon 1", capacidad_max=1000)
+        self.lote = Lote.objects.create(galpon=self.galpon, raza="Raza 1", aves_iniciales=100)
+        self.entidad = Entidad.objects.create(nombre_razon_social="Proveedor 1", es_proveedor=True)
+        self.compra = CabeceraTransaccion.objects.create(tipo_operacion=TipoOperacion.COMPRA, entidad=self.entidad)
+        self.detalle = DetalleTransaccion.objects.create(transaccion=self.compra, articulo=self.articulo, cantidad=100, precio_unitario=10)
+
+    def consumir(self, cantidad, **kwargs):
+        return MovimientoInterno.objects.create(
+            lote=self.lote, articulo=self.articulo, tipo_movimiento=TipoMovimiento.CONSUMO, cantidad=cantidad, **kwargs
+        )
+
+    def assertChainConsistent(self):
+        """Every saldo_anterior equals the previous saldo_posterior and the chain ends at stock_actual."""
+        self.articulo.refresh_from_db()
+        saldo = None
+        for log in self.articulo.logs.order_by('fecha', 'pk'):
+            if saldo is not None:
+                self.assertEqual(log.saldo_anterior, saldo)
+            saldo = log.saldo_posterior
+        self.assertEqual(saldo, self.articulo.stock_actual)
+
+    def test_edit_movement_rethreads_suffix(self):
+        mov = self.consumir(10)
+        self.consumir(5)
+        mov.cantidad = 30
+        mov.save()
+        self.articulo.refresh_from_db()
+        self.assertEqual(self.articulo.stock_actual, 65) # 100 - 30 - 5
+        self.assertChainConsistent()
+
+    def test_delete_movement_restores_stock(self):
+        mov = self.consumir(10)
+        self.consumir(5)
+        mov.delete()
+        self.articulo.refresh_from_db()
+        self.assertEqual(self.articulo.stock_actual, 95)
+        self.assertEqual(self.articulo.logs.count(), 2)
+        self.assertChainConsistent()
+
+    def test_backdated_movement_is_threaded_in_place(self):
+        self.consumir(10)
+        backdated = self.consumir(20, fecha=timezone.now() - timezone.timedelta(days=3))
+        self.articulo.refresh_from_db()
+        self.assertEqual(self.articulo.stock_actual, 70)
+        # The backdated entry is first in the chain, before the purchase
+        primero = self.articulo.logs.order_by('fecha', 'pk').first()
+        self.assertEqual(primero.movimiento, backdated)
+        self.assertChainConsistent()
+
+    def test_edit_transaction_detail(self):
+        self.detalle.cantidad = 150
+        self.detalle.save()
+        self.compra.refresh_from_db()
+        self.articulo.refresh_from_db()
+        self.assertEqual(self.articulo.stock_actual, 150)
+        self.assertEqual(self.compra.monto_total, 1500)
+        self.assertChainConsistent()
+
+@override_settings(GESTION_OUTBOX_KIOSCO=True)
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.articulo = Articulo.objects.create(nombre="Alimento", tipo=TipoArticulo.INSUMO, stock_actual=100)
+        self.galpon = Galpon.objects.create(nombre="Galpon 1", capacidad_max=1000)
+        self.lote = Lote.objects.create(galpon=self.galpon, raza="Raza 1", aves_iniciales=100)
+
+    def consumir(self, cantidad):
+        with outbox.diferir():
+            return MovimientoInterno.objects.create(
+                lote=self.lote, articulo=self.articulo, tipo_movimiento=TipoMovimiento.CONSUMO, cantidad=cantidad
+            )
+
+    def test_deferred_writes_apply_on_process(self):
+        self.consumir(10)
+        with outbox.diferir():
+            RegistroBajas.objects.create(lote=self.lote, cantidad=5, motivo=MotivoBaja.MUERTE_NATURAL)
+
+        self.articulo.refresh_from_db()
+        self.lote.refresh_from_db()
+        self.assertEqual(self.articulo.stock_actual, 100)
+        self.assertEqual(self.lote.aves_actuales, 100)
+        self.assertEqual(OutboxEvento.objects.filter(estado=EstadoOutbox.PENDIENTE).count(), 2)
+
+        self.assertEqual(outbox.procesar(), (2, 0))
+        self.articulo.refresh_from_db()
+        self.lote.refresh_from_db()
+        self.assertEqual(self.articulo.stock_actual, 90)
+        self.assertEqual(self.lote.aves_actuales, 95)
+        self.assertEqual(self.articulo.logs.get().saldo_posterior, 90)
+
+    def test_deferred_create_and_edit_post_each_step_once(self):
+        with outbox.diferir():
+            baja = RegistroBajas.objects.create(lote=self.lote, cantidad=5, motivo=MotivoBaja.MUERTE_NATURAL)
+            baja.cantidad = 8
+            baja.save()
+            baja.cantidad = 6
+            baja.save()
+        self.assertEqual(outbox.procesar(), (3, 0))
+        self.lote.refresh_from_db()
+        self.assertEqual(self.lote.aves_actuales, 94)
+
+    def test_failure_blocks_key_and_retries(self):
+        self.consumir(10)
+        self.consumir(5)
+        original = outbox._handlers['MOVIMIENTO']
+        with mock.patch.dict(outbox._handlers, {'MOVIMIENTO': mock.Mock(side_effect=RuntimeError('boom'))}):
+            self.assertEqual(outbox.procesar(), (0, 1))
+        fallido = OutboxEvento.objects.order_by('pk').first()
+        self.assertEqual(fallido.intentos, 1)
+        self.assertIn('boom', fallido.error)
+
+        # Still in backoff: the second event must not overtake the first
+        self.assertEqual(outbox.procesar(), (0, 0))
+        self.articulo.refresh_from_db()
+        self.assertEqual(self.articulo.stock_actual, 100)
+
+        OutboxEvento.objects.update(disponible_desde=timezone.now())
+        self.assertIs(outbox._handlers['MOVIMIENTO'], original)
+        self.assertEqual(outbox.procesar(), (2, 0))
+        self.articulo.refresh_from_db()
+        self.assertEqual(self.articulo.stock_actual, 85)
+
+    def test_stuck_key_does_not_starve_the_others(self):
+        for _ in range(3):
+            self.consumir(1)
+        OutboxEvento.objects.update(disponible_desde=timezone.now() + datetime.timedelta(minutes=5)) # Head backed off
+        with outbox.diferir():
+            RegistroBajas.objects.create(lote=self.lote, cantidad=5, motivo=MotivoBaja.MUERTE_NATURAL)
+        self.assertEqual(outbox.procesar(limite=2), (1, 0))
+        self.lote.refresh_from_db()
+        self.assertEqual(self.lote.aves_actuales, 95)
+
+    def test_failed_event_keeps_its_key_blocked(self):
+        self.consumir(10)
+        self.consumir(5)
+        OutboxEvento.objects.filter(pk=OutboxEvento.objects.order_by('pk').first().pk).update(estado=EstadoOutbox.FALLIDO)
+        self.assertEqual(outbox.procesar(), (0, 0))
+        outbox.drenar(f"articulo:{self.articulo.pk}")
+        self.articulo.refresh_from_db()
+        self.assertEqual(self.articulo.stock_actual, 100)
+        self.assertEqual(OutboxEvento.objects.filter(estado=EstadoOutbox.PENDIENTE).count(), 1)
+
+    def test_sync_edit_drains_pending_events(self):
+        mov = self.consumir(10)
+        mov.cantidad = 30
+        mov.save()
+        self.articulo.refresh_from_db()
+        self.assertEqual(self.articulo.stock_actual, 70)
+        self.assertEqual(self.articulo.logs.count(), 1)
+        self.assertFalse(OutboxEvento.objects.filter(estado=EstadoOutbox.PENDIENTE).exists())
+
+        mov.delete()
+        self.articulo.refresh_from_db()
+        self.assertEqual(self.articulo.stock_actual, 100)
+
+class ChangeTrackingTests(TestCase):
+    def setUp(self):
+        Articulo.objects.create(nombre="Alimento", tipo=TipoArticulo.INSUMO, stock_actual=50)
+        self.articulo = Articulo.objects.get()
+
+    def test_unchanged_save_is_a_noop(self):
+        with self.assertNumQueries(0):
+            self.articulo.save()
+
+    def test_metadata_edit_logged_without_select(self):
+        self.articulo.stock_minimo = 10
+        self.assertEqual(self.articulo.campos_modificados(), ['stock_minimo'])
+        # UPDATE of the dirty column + the EDICION entry
+        with self.assertNumQueries(2):
+            self.articulo.save()
+        log = self.articulo.logs.get(tipo='EDICION')
+        self.assertIn("Stock Min: 0.00 -> 10", log.descripcion)
+        self.assertFalse(self.articulo.tiene_cambios())
+
+    def test_save_does_not_overwrite_untouched_columns(self):
+        galpon = Galpon.objects.create(nombre="Galpon 1", capacidad_max=1000)
+        Lote.objects.create(galpon=galpon, raza="Raza 1", aves_iniciales=100)
+        lote = Lote.objects.get()
+        RegistroBajas.objects.create(lote=lote, cantidad=10)
+
+        # The stale in-memory aves_actuales (100) must not clobber the ledger's 90
+        lote.estado = False
+        lote.save()
+        lote.refresh_from_db()
+        self.assertEqual(lote.aves_actuales, 90)
+        self.assertFalse(lote.estado)
+
+class StockAlertTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.articulo = Articulo.objects.create(nombre="Alimento", tipo=TipoArticulo.INSUMO, stock_actual=100, stock_minimo=20)
+        self.galpon = Galpon.objects.create(nombre="Galpon 1", capacidad_max=1000)
+        self.lote = Lote.objects.create(galpon=self.galpon, raza="Raza 1", aves_iniciales=100)
+
+    def consumir(self, cantidad, dias_atras=0):
+        with self.captureOnCommitCallbacks(execute=True):
+            MovimientoInterno.objects.create(
+                lote=self.lote, articulo=self.articulo, tipo_movimiento=TipoMovimiento.CONSUMO, cantidad=cantidad,
+                fecha=timezone.now() - timezone.timedelta(days=dias_atras)
+            )
+
+    def test_flag_follows_stock(self):
+        self.assertFalse(self.articulo.bajo_minimo)
+        self.consumir(85)
+        self.articulo.refresh_from_db()
+        self.assertTrue(self.articulo.bajo_minimo)
+        self.assertTrue(Articulo.objects.filter(bajo_minimo=True).exists())
+
+        self.articulo.stock_minimo = 10
+        self.articulo.save()
+        self.articulo.refresh_from_db()
+        self.assertFalse(self.articulo.bajo_minimo)
+
+    def test_reorder_list_days_of_cover(self):
+        self.assertEqual(alertas.lista_reorden(), [])
+        # 10/day over the last week: 30 left lasts 3 days
+        for dia in range(7):
+            self.consumir(10, dias_atras=dia)
+
+        reorden = alertas.lista_reorden()
+        self.assertEqual(len(reorden), 1)
+        fila = reorden[0]
+        self.assertEqual(fila['articulo_id'], self.articulo.pk)
+        self.assertEqual(fila['consumo_diario'], 10)
+        self.assertEqual(fila['dias_cobertura'], 3)
+        self.assertEqual(fila['sugerido'], 10 * alertas.COBERTURA_OBJETIVO_DIAS + 20 - 30)
+
+    def test_cached_list_only_recomputes_dirty_articles(self):
+        alertas.lista_reorden()
+        with self.assertNumQueries(0):
+            alertas.lista_reorden()
+        self.consumir(85)
+        # Reload of the dirty article + its kardex window
+        with self.assertNumQueries(2):
+            self.assertTrue(alertas.lista_reorden()[0]['bajo_minimo'])
+
+    def test_marks_made_while_reading_are_not_lost(self):
+        alertas.lista_reorden()
+        otro = Articulo.objects.create(nombre="Vitaminas", tipo=TipoArticulo.INSUMO, stock_actual=100, stock_minimo=20)
+        filas = alertas._filas
+
+        def _filas_con_escritura(articulos):
+            # Another worker posts a stock change while this read recomputes the dirty rows
+            resultado = filas(articulos)
+            if otro.pk not in resultado:
+                with self.captureOnCommitCallbacks(execute=True):
+                    Articulo.objects.filter(pk=otro.pk).update(stock_actual=5, bajo_minimo=True)
+                    alertas.marcar(otro.pk, otro.granja_id)
+            return resultado
+
+        self.consumir(85)
+        with mock.patch('Gestion.alertas._filas', side_effect=_filas_con_escritura):
+            self.assertEqual([f['articulo_id'] for f in alertas.lista_reorden()], [self.articulo.pk])
+        self.assertEqual({f['articulo_id'] for f in alertas.lista_reorden()}, {self.articulo.pk, otro.pk})
+
+class PronosticoConsumoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alimento = Articulo.objects.create(nombre="Alimento", tipo=TipoArticulo.INSUMO, stock_actual=10000)
+        self.hoy = timezone.localdate()
+        inicio = self.hoy - timezone.timedelta(days=90)
+        self.lotes = [
+            Lote.objects.create(galpon=Galpon.objects.create(nombre=f"Galpon {i}", capacidad_max=1000), raza="Raza", aves_iniciales=100, fecha_inicio=inicio)
+            for i in (1, 2)
+        ]
+
+    def consumir(self, lote, cantidad, dias_atras):
+        MovimientoInterno.objects.create(
+            lote=lote, articulo=self.alimento, tipo_movimiento=TipoMovimiento.CONSUMO, cantidad=cantidad,
+            fecha=timezone.now() - timezone.timedelta(days=dias_atras)
+        )
+
+    def test_flat_consumption_projects_rate_times_birds(self):
+        for dia in range(1, 15):
+            self.consumir(self.lotes[0], 10, dia)
+        self.assertEqual(pronostico.calcular(), 1)
+
+        p = PronosticoConsumo.objects.get()
+        self.assertAlmostEqual(p.consumo_ave_dia, 0.1)
+        self.assertAlmostEqual(p.tendencia, 0)
+        self.assertEqual(p.dias_historia, 14)
+        self.assertEqual(p.semanas[0], 70)
+        self.assertEqual(p.semanas[-1], 420)
+
+    def test_trend_is_extrapolated(self):
+        # One more kilo every day: 10 days ago 1 kg ... yesterday 10 kg
+        for dia in range(1, 11):
+            self.consumir(self.lotes[0], 11 - dia, dia)
+        pronostico.calcular()
+        p = PronosticoConsumo.objects.get()
+        self.assertAlmostEqual(p.tendencia, 0.01)
+        # Today's fitted consumption is 11 kg for 100 birds, then 12, 13...
+        self.assertAlmostEqual(p.consumo_ave_dia, 0.11)
+        self.assertAlmostEqual(p.semanas[0], sum(range(11, 18)))
+
+    def test_planning_aggregates_active_lotes(self):
+        for lote in self.lotes:
+            for dia in range(1, 8):
+                self.consumir(lote, 10, dia)
+        pronostico.calcular()
+
+        plan = pronostico.planificacion()
+        self.assertEqual(len(plan['lotes']), 2)
+        self.assertEqual(plan['articulos'][0]['semanas'][0], 140)
+        self.assertIsNone(plan['articulos'][0]['quiebre_semana'])
+
+        self.client.force_login(User.objects.create_user('u'))
+        response = self.client.get(reverse('planificacion-alimento'))
+        self.assertContains(response, "Alimento")
+
+class CurvasPuestaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.huevo = Articulo.objects.create(nombre="Huevo", tipo=TipoArticulo.PRODUCTO, controlar_stock=False)
+        inicio = timezone.localdate() - timezone.timedelta(days=21)
+        galpon = Galpon.objects.create(nombre="Galpon 1", capacidad_max=1000)
+        self.lote = Lote.objects.create(galpon=galpon, raza="Hy-Line", aves_iniciales=100, fecha_inicio=inicio)
+        self.par = Lote.objects.create(galpon=galpon, raza="hy-line", aves_iniciales=200, fecha_inicio=inicio - timezone.timedelta(days=70), estado=False)
+        self.otra = Lote.objects.create(galpon=galpon, raza="Isa Brown", aves_iniciales=100, fecha_inicio=inicio)
+        self.inicio = inicio
+
+    def producir(self, lote, cantidad, dia):
+        fecha = timezone.make_aware(datetime.datetime.combine(lote.fecha_inicio + timezone.timedelta(days=dia), datetime.time(12)))
+        MovimientoInterno.objects.create(lote=lote, articulo=self.huevo, tipo_movimiento=TipoMovimiento.PRODUCCION, cantidad=cantidad, fecha=fecha)
+
+    def test_weekly_rate_aligned_by_age(self):
+        for dia in range(7):
+            self.producir(self.lote, 50, dia)        # Week 1: 50%
+            self.producir(self.lote, 80, dia + 7)    # Week 2: 80%
+            self.producir(self.par, 140, dia + 7)    # Week 2 of the older lote: 70%
+        RegistroBajas.objects.create(lote=self.lote, cantidad=10, fecha=timezone.make_aware(
+            datetime.datetime.combine(self.inicio + timezone.timedelta(days=14), datetime.time(8))))
+
+        comp = curvas.comparar(self.lote.pk)
+        self.assertEqual(comp['lote_curva'][:2], [50, 80])
+        self.assertEqual(comp['raza_lotes'], 1)
+        self.assertEqual(comp['raza_curva'][1], 70)
+        self.assertEqual(curvas.comparar(self.lote.pk, 'mortalidad')['lote_curva'][2], 10)
+
+        resumen = {f['id']: f for f in curvas.resumen_lotes()}
+        self.assertEqual(resumen[self.lote.pk]['semana_pico'], 2)
+
+    def test_view_overlays_breed_standard(self):
+        CurvaEstandar.objects.create(raza="Hy-Line", semana=2, tasa_puesta=85)
+        self.producir(self.lote, 50, 0)
+        self.client.force_login(User.objects.create_user('u'))
+        response = self.client.get(reverse('curvas-puesta'), {'lote': self.lote.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['comparacion']['estandar'][:2], [None, 85])
+        self.assertEqual(self.client.get(reverse('curvas-puesta'), {'lote': 999}).status_code, 404)
+        self.assertEqual(self.client.get(reverse('curvas-puesta'), {'lote': 'abc'}).status_code, 404)
+
+class GalponRollupTests(TestCase):
+    def setUp(self):
+        self.hoy = timezone.localdate()
+        self.mes = self.hoy.replace(day=1)
+        self.galpon = Galpon.objects.create(nombre="Galpon 1", capacidad_max=200)
+        self.huevo = Articulo.objects.create(nombre="Huevo", tipo=TipoArticulo.PRODUCTO, controlar_stock=False)
+        self.lote = Lote.objects.create(galpon=self.galpon, raza="Raza", aves_iniciales=100, fecha_inicio=self.mes)
+
+    def test_month_rollup(self):
+        MovimientoInterno.objects.create(lote=self.lote, articulo=self.huevo, tipo_movimiento=TipoMovimiento.PRODUCCION, cantidad=90)
+        ocupacion.actualizar()
+
+        r = ResumenGalponMes.objects.get(galpon=self.galpon, mes=self.mes)
+        dias = self.hoy.day
+        self.assertEqual(r.lotes, 1)
+        self.assertEqual(r.aves_dia, 100 * dias)
+        self.assertEqual(r.capacidad_dia, 200 * dias)
+        self.assertEqual(r.ocupacion, 50)
+        self.assertEqual(r.huevos, 90)
+        self.assertFalse(r.pendiente)
+
+    def test_writes_only_flag_and_read_rebuilds(self):
+        ocupacion.actualizar()
+        RegistroBajas.objects.create(lote=self.lote, cantidad=10, fecha=timezone.now())
+        r = ResumenGalponMes.objects.get(galpon=self.galpon, mes=self.mes)
+        self.assertTrue(r.pendiente)
+        self.assertEqual(r.bajas, 0)
+
+        self.assertEqual(ocupacion.actualizar(), 1)
+        r.refresh_from_db()
+        self.assertEqual(r.bajas, 10)
+        # Nothing flagged, current month already rebuilt today: no work
+        self.assertEqual(ocupacion.actualizar(), 0)
+
+    def test_views(self):
+        self.client.force_login(User.objects.create_user('u'))
+        response = self.client.get(reverse('galpon-dashboard'))
+        self.assertContains(response, "Galpon 1")
+        response = self.client.get(reverse('galpon-historial', args=[self.galpon.pk]))
+        self.assertEqual(len(response.context['resumenes']), 1)
+
+class CostosTests(TestCase):
+    def setUp(self):
+        self.alimento = Articulo.objects.create(nombre="Alimento", tipo=TipoArticulo.INSUMO, stock_actual=0)
+        self.huevos = Articulo.objects.create(nombre="Huevos", tipo=TipoArticulo.PRODUCTO, stock_actual=0)
+        self.galpon = Galpon.objects.create(nombre="Galpon 1", capacidad_max=1000)
+        self.lote = Lote.objects.create(galpon=self.galpon, raza="Raza 1", aves_iniciales=100)
+        self.entidad = Entidad.objects.create(nombre_razon_social="Proveedor 1", es_proveedor=True, es_cliente=True)
+
+    def comprar(self, cantidad, precio):
+        compra = CabeceraTransaccion.objects.create(tipo_operacion=TipoOperacion.COMPRA, entidad=self.entidad)
+        return DetalleTransaccion.objects.create(transaccion=compra, articulo=self.alimento, cantidad=cantidad, precio_unitario=precio)
+
+    def test_moving_average_and_reversal(self):
+        self.comprar(100, 10)
+        detalle = self.comprar(100, 20)
+        self.alimento.refresh_from_db()
+        self.assertEqual(self.alimento.costo_promedio, 15)
+
+        detalle.delete()
+        self.alimento.refresh_from_db()
+        self.assertEqual(self.alimento.stock_actual, 100)
+        self.assertEqual(self.alimento.costo_promedio, 10)
+
+    def test_consumption_stamped_at_posting_cost(self):
+        self.comprar(100, 10)
+        consumo = MovimientoInterno.objects.create(lote=self.lote, articulo=self.alimento, tipo_movimiento=TipoMovimiento.CONSUMO, cantidad=10)
+        self.comprar(100, 30)
+        consumo.refresh_from_db()
+        self.assertEqual(consumo.costo_unitario, 10)
+        self.assertEqual(LogArticulo.objects.get(movimiento=consumo).costo_unitario, 10)
+
+    def test_lote_cost_per_egg_and_margin(self):
+        self.comprar(100, 10)
+        MovimientoInterno.objects.create(lote=self.lote, articulo=self.alimento, tipo_movimiento=TipoMovimiento.CONSUMO, cantidad=12)
+        MovimientoInterno.objects.create(lote=self.lote, articulo=self.huevos, tipo_movimiento=TipoMovimiento.PRODUCCION, cantidad=240)
+        venta = CabeceraTransaccion.objects.create(tipo_operacion=TipoOperacion.VENTA, entidad=self.entidad)
+        DetalleTransaccion.objects.create(transaccion=venta, articulo=self.huevos, cantidad=120, precio_unitario=1)
+
+        r = costos.resumen_lotes([self.lote])[self.lote.pk]
+        self.assertEqual(r['costo'], 120)
+        self.assertEqual(r['costo_huevo'], Decimal('0.5'))
+        self.assertEqual(r['costo_docena'], 6)
+        self.assertEqual(r['precio_huevo'], 1)
+        self.assertEqual(r['margen'], 120)
+
+        self.client.force_login(User.objects.create_user('u'))
+        self.assertContains(self.client.get(reverse('costos-lotes')), "Lote %d" % self.lote.pk)
+        self.assertEqual(self.client.get(reverse('lote-detail', args=[self.lote.pk])).status_code, 200)
+
+    def test_sales_price_over_each_lote_life_in_constant_queries(self):
+        hoy = timezone.localdate()
+        Lote.objects.filter(pk=self.lote.pk).update(fecha_inicio=hoy - datetime.timedelta(days=10))
+        viejo = Lote.objects.create(galpon=self.galpon, raza="Raza 1", aves_iniciales=100, fecha_inicio=hoy - datetime.timedelta(days=60), estado=False)
+        MovimientoInterno.objects.create(lote=viejo, articulo=self.huevos, tipo_movimiento=TipoMovimiento.PRODUCCION, cantidad=10, fecha=timezone.now() - datetime.timedelta(days=50))
+        MovimientoInterno.objects.create(lote=self.lote, articulo=self.huevos, tipo_movimiento=TipoMovimiento.PRODUCCION, cantidad=10)
+        for dias, precio in ((55, 3), (1, 1)):
+            venta = CabeceraTransaccion.objects.create(tipo_operacion=TipoOperacion.VENTA, entidad=self.entidad, fecha=hoy - datetime.timedelta(days=dias))
+            DetalleTransaccion.objects.create(transaccion=venta, articulo=self.huevos, cantidad=10, precio_unitario=precio)
+
+        with self.assertNumQueries(5): # Lotes, movements, production, direct and pack sales
+            r = costos.resumen_lotes(Lote.objects.filter(pk__in=[viejo.pk, self.lote.pk]))
+        self.assertEqual(r[viejo.pk]['precio_huevo'], 3) # Closed: its life ends with its last movement
+        self.assertEqual(r[self.lote.pk]['precio_huevo'], 1)
+
+class SaldoEntidadTests(TestCase):
+    def setUp(self):
+        self.articulo = Articulo.objects.create(nombre="Huevos", tipo=TipoArticulo.PRODUCTO, controlar_stock=False)
+        self.cliente = Entidad.objects.create(nombre_razon_social="Cliente 1", es_cliente=True)
+        self.hoy = timezone.localdate()
+
+    def vender(self, monto, dias_atras=0):
+        venta = CabeceraTransaccion.objects.create(
+            tipo_operacion=TipoOperacion.VENTA, entidad=self.cliente, fecha=self.hoy - datetime.timedelta(days=dias_atras)
+        )
+        DetalleTransaccion.objects.create(transaccion=venta, articulo=self.articulo, cantidad=1, precio_unitario=monto)
+        return venta
+
+    def saldo(self):
+        return SaldoEntidad.objects.get(entidad=self.cliente, tipo_operacion=TipoOperacion.VENTA)
+
+    def assertMatchesRebuild(self):
+        incremental = list(SaldoEntidad.objects.exclude(saldo=0).order_by('pk').values_list(
+            'entidad_id', 'saldo', 'pendientes', 'tramo_30', 'tramo_60', 'tramo_90', 'tramo_mas_90', 'mas_antigua'))
+        saldos.recalcular(self.hoy)
+        rebuilt = list(SaldoEntidad.objects.order_by('pk').values_list(
+            'entidad_id', 'saldo', 'pendientes', 'tramo_30', 'tramo_60', 'tramo_90', 'tramo_mas_90', 'mas_antigua'))
+        self.assertEqual(incremental, rebuilt)
+
+    def test_incremental_balance_and_aging(self):
+        self.vender(100)
+        antigua = self.vender(50, dias_atras=100)
+        s = self.saldo()
+        self.assertEqual((s.saldo, s.pendientes, s.tramo_30, s.tramo_mas_90), (150, 2, 100, 50))
+        self.assertEqual(s.mas_antigua, antigua.fecha)
+
+        antigua.estado_pago = EstadoPago.PAGADO
+        antigua.save()
+        s = self.saldo()
+        self.assertEqual((s.saldo, s.pendientes, s.tramo_mas_90), (100, 1, 0))
+        self.assertEqual(s.mas_antigua, self.hoy)
+        self.assertMatchesRebuild()
+
+    def test_void_and_delete_through_views(self):
+        venta = self.vender(100)
+        otra = self.vender(40, dias_atras=45)
+        self.client.force_login(User.objects.create_user('u'))
+        self.client.get(reverse('transaccion-cambiar-estado', args=[venta.pk, 'ANULADO']))
+        self.assertEqual(self.saldo().saldo, 40)
+        self.assertEqual(self.saldo().tramo_60, 40)
+
+        otra.delete()
+        self.assertEqual(self.saldo().saldo, 0)
+        self.assertEqual(self.saldo().pendientes, 0)
+        self.assertMatchesRebuild()
+
+    def test_buckets_reaged_on_new_day_and_views(self):
+        self.vender(100, dias_atras=25)
+        self.assertEqual(self.saldo().tramo_30, 100)
+        filas, totales = saldos.saldos(TipoOperacion.VENTA, hoy=self.hoy + datetime.timedelta(days=10))
+        self.assertEqual(totales['tramo_60'], 100)
+        self.assertEqual(totales['tramo_30'], 0)
+
+        self.client.force_login(User.objects.create_user('u'))
+        self.assertContains(self.client.get(reverse('cuentas-saldos')), "Cliente 1")
+        self.assertContains(self.client.get(reverse('entidad-detail', args=[self.cliente.pk])), "Por cobrar")
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        fragmentos.volcar_estadisticas() # Counts of earlier tests go to the cache being cleared
+        cache.clear()
+        self.client.force_login(User.objects.create_user('u'))
+        self.articulo = Articulo.objects.create(nombre="Alimento", tipo=TipoArticulo.INSUMO, stock_actual=100)
+        self.galpon = Galpon.objects.create(nombre="Galpon 1", capacidad_max=1000)
+        self.lote = Lote.objects.create(galpon=self.galpon, raza="Raza 1", aves_iniciales=100)
+
+    def stats(self):
+        return {nombre: (hits, misses) for nombre, hits, misses, _ in fragmentos.estadisticas()}
+
+    def test_article_table_hit_until_stock_moves(self):
+        self.client.get(reverse('articulo-list'))
+        response = self.client.get(reverse('articulo-list'))
+        self.assertContains(response, "100,00")
+        self.assertEqual(self.stats()['articulo-tabla'], (1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MovimientoInterno.objects.create(lote=self.lote, articulo=self.articulo, tipo_movimiento=TipoMovimiento.CONSUMO, cantidad=10)
+        response = self.client.get(reverse('articulo-list'))
+        self.assertContains(response, "90,00")
+        self.assertEqual(self.stats()['articulo-tabla'], (1, 2))
+
+    def test_lote_card_skips_queries_on_hit(self):
+        self.client.get(reverse('index'))
+        with self.assertNumQueries(0), granjas.activar(self.galpon.granja_id): # Cached under the user's farm
+            # Rendering only: the card's consumption queryset is never evaluated on a hit
+            fragmentos.render('lote-card', [self.lote, self.galpon, timezone.localdate()], lambda: list(MovimientoInterno.objects.all()))
+        self.assertEqual(self.stats()['lote-card'], (1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RegistroBajas.objects.create(lote=self.lote, cantidad=5, motivo=MotivoBaja.ACCIDENTE)
+        self.assertContains(self.client.get(reverse('index')), "<strong>95</strong>")
+
+    @override_settings(GESTION_FRAGMENTOS_STATS_SEGUNDOS=3600)
+    def test_hits_are_counted_without_writing_to_the_cache(self):
+        fragmentos.render('prueba', [], lambda: 'html')
+        fragmentos.volcar_estadisticas()
+        with mock.patch.object(cache, 'incr') as incr, mock.patch.object(cache, 'add') as add, mock.patch.object(cache, 'set') as set_:
+            for _ in range(5):
+                self.assertEqual(fragmentos.render('prueba', [], lambda: 'otro'), 'html')
+        self.assertFalse(incr.called or add.called or set_.called)
+        self.assertEqual(self.stats()['prueba'], (5, 1))
+
+    def test_kiosk_menu_follows_galpon_name(self):
+        self.client.get(reverse('kiosco-menu', args=[self.lote.pk]))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.galpon.nombre = "Galpon Norte"
+            self.galpon.save()
+        self.assertContains(self.client.get(reverse('kiosco-menu', args=[self.lote.pk])), "Galpon Norte")
+        self.assertEqual(self.stats()['kiosco-menu'], (0, 2))
+
+class SQLiteCacheTests(TestCase):
+    def setUp(self):
+        import tempfile
+        self.tmp = tempfile.TemporaryDirectory()
+        self.ruta = f"{self.tmp.name}/cache.sqlite3"
+        self.cache = SQLiteCache(self.ruta, {'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2}})
+
+    def tearDown(self):
+        self.cache.cerrar()
+        self.tmp.cleanup()
+
+    def test_basic_api(self):
+        self.cache.set('a', {'x': 1})
+        self.assertEqual(self.cache.get('a'), {'x': 1})
+        self.assertFalse(self.cache.add('a', 2))
+        self.cache.set_many({'b': 1, 'c': [1, 2]})
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c', 'z']), {'a': {'x': 1}, 'b': 1, 'c': [1, 2]})
+        self.assertEqual(self.cache.incr('b', 5), 6)
+        with self.assertRaises(ValueError):
+            self.cache.incr('z')
+        self.cache.set('e', 1, timeout=-1)
+        self.assertIsNone(self.cache.get('e'))
+        self.assertTrue(self.cache.add('e', 2))
+        self.assertTrue(self.cache.delete('a'))
+        self.assertFalse(self.cache.has_key('a'))
+
+    def test_lru_eviction_keeps_recently_used(self):
+        with mock.patch('Gestion.cache_sqlite.time.time', side_effect=lambda: self.ahora):
+            for i in range(10):
+                self.ahora = 1000 + i * 10
+                self.cache.set(f'k{i}', i, timeout=None)
+            self.ahora = 2000
+            self.assertEqual(self.cache.get('k0'), 0) # Refreshes its LRU position
+            self.cache.set('nuevo', 1, timeout=None) # 11 entries: the oldest half goes
+        claves = self.cache.get_many([f'k{i}' for i in range(10)] + ['nuevo'])
+        self.assertIn('k0', claves)
+        self.assertIn('nuevo', claves)
+        self.assertNotIn('k1', claves)
+        self.assertLessEqual(len(claves), 10)
+
+    def test_shared_between_processes(self):
+        from multiprocessing import Pool
+        from Gestion.management.commands.benchmark_cache import _incrementar
+        self.cache.set('contador', 0)
+        with Pool(2) as pool:
+            pool.map(_incrementar, [(self.ruta, 50)] * 2)
+        self.assertEqual(self.cache.get('contador'), 100)
+
+    def test_close_keeps_connection_and_schema_runs_once(self):
+        self.cache.set('a', 1)
+        conn = self.cache._conn()
+        self.cache.close() # End of request
+        self.assertIs(self.cache._conn(), conn)
+        otra = SQLiteCache(self.ruta, {})
+        with mock.patch('Gestion.cache_sqlite.ESQUEMA', 'SELECT invalid syntax'):
+            self.assertEqual(otra.get('a'), 1) # Already set up in this process: not re-run
+        otra.cerrar()
+
+class StaticPipelineTests(TestCase):
+    def setUp(self):
+        import tempfile
+        from pathlib import Path
+        self.tmp = tempfile.TemporaryDirectory()
+        self.raiz = Path(self.tmp.name) / 'static'
+        fuente = Path(self.tmp.name) / 'src' / 'vendor' / 'bootstrap' / 'css'
+        fuente.mkdir(parents=True)
+        (fuente / 'bootstrap.min.css').write_text('.btn { color: red; }\n' * 200)
+        self.settings = self.settings(STATIC_ROOT=str(self.raiz), STATICFILES_DIRS=[str(Path(self.tmp.name) / 'src')])
+        self.settings.enable()
+        estaticos.url.cache_clear()
+
+    def tearDown(self):
+        self.settings.disable()
+        estaticos.url.cache_clear()
+        self.tmp.cleanup()
+
+    def test_cdn_fallback_until_collected(self):
+        self.assertTrue(estaticos.url('bootstrap-css').startswith(estaticos.CDN))
+
+    def test_collectstatic_hashes_precompresses_and_serves(self):
+        from django.core.management import call_command
+        from io import StringIO
+        call_command('collectstatic', interactive=False, verbosity=0, stdout=StringIO())
+        url = estaticos.url('bootstrap-css')
+        self.assertRegex(url, r'^/static/vendor/bootstrap/css/bootstrap\.min\.[0-9a-f]{12}\.css$')
+        self.assertTrue((self.raiz / url[len('/static/'):]).with_suffix('.css.gz').exists())
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertLess(int(response['Content-Length']), 1000)
+
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get('/static/../manage.py').status_code, 404)
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('admin', password='x', is_staff=True, is_superuser=True)
+        galpon = Galpon.objects.create(nombre="Galpon 1", capacidad_max=1000)
+        Lote.objects.create(galpon=galpon, raza="Raza 1", aves_iniciales=100)
+
+    def test_staff_request_is_profiled_on_demand(self):
+        self.client.force_login(self.staff)
+        self.client.get(reverse('salud-dashboard'))
+        self.assertFalse(PerfilPeticion.objects.exists())
+
+        response = self.client.get(reverse('salud-dashboard'), {perfilado.PARAMETRO: 1})
+        self.assertEqual(response.status_code, 200)
+        perfil = PerfilPeticion.objects.get()
+        self.assertEqual(response[perfilado.CABECERA], reverse('admin:Gestion_perfilpeticion_change', args=[perfil.pk]))
+        self.assertTrue(perfil.ruta.startswith(reverse('salud-dashboard')))
+        self.assertGreater(perfil.num_consultas, 0)
+        self.assertEqual(len(perfil.consultas), perfil.num_consultas)
+        self.assertGreater(perfil.plantillas_ms, 0)
+        self.assertTrue(perfil.funciones)
+        self.assertIn('Gestion/views.py', perfil.arbol)
+
+        self.client.get(reverse('index'), HTTP_X_PERFIL='1')
+        self.assertEqual(PerfilPeticion.objects.count(), 2)
+
+        # Admin CSS is only in the manifest after collectstatic
+        with self.settings(STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}}):
+            response = self.client.get(response[perfilado.CABECERA])
+        self.assertContains(response, 'Funciones (por tiempo propio)')
+
+    def test_non_staff_cannot_profile(self):
+        self.client.force_login(User.objects.create_user('operario', password='x'))
+        self.assertEqual(self.client.get(reverse('index'), {perfilado.PARAMETRO: 1}).status_code, 200)
+        self.assertFalse(PerfilPeticion.objects.exists())
+
+class BulkTransactionStateTests(TestCase):
+    def setUp(self):
+        self.huevos = Articulo.objects.create(nombre="Huevo", tipo=TipoArticulo.PRODUCTO, stock_actual=0)
+        self.caja = Articulo.objects.create(nombre="Caja", tipo=TipoArticulo.INSUMO, stock_actual=0, es_insumo_receta=True)
+        self.docena = Articulo.objects.create(nombre="Docena", tipo=TipoArticulo.PRODUCTO, controlar_stock=False)
+        Receta.objects.create(producto=self.docena, ingrediente=self.huevos, cantidad=12)
+        Receta.objects.create(producto=self.docena, ingrediente=self.caja, cantidad=1)
+        self.entidad = Entidad.objects.create(nombre_razon_social="Cliente 1", es_cliente=True, es_proveedor=True)
+        self.comprar(self.huevos, 500, 10)
+        self.comprar(self.caja, 50, 100)
+
+    def comprar(self, articulo, cantidad, precio):
+        compra = CabeceraTransaccion.objects.create(tipo_operacion=TipoOperacion.COMPRA, entidad=self.entidad)
+        DetalleTransaccion.objects.create(transaccion=compra, articulo=articulo, cantidad=cantidad, precio_unitario=precio)
+        return compra
+
+    def vender(self, docenas, huevos):
+        venta = CabeceraTransaccion.objects.create(tipo_operacion=TipoOperacion.VENTA, entidad=self.entidad)
+        DetalleTransaccion.objects.create(transaccion=venta, articulo=self.docena, cantidad=docenas, precio_unitario=200)
+        DetalleTransaccion.objects.create(transaccion=venta, articulo=self.huevos, cantidad=huevos, precio_unitario=20)
+        return venta
+
+    def stock(self, articulo):
+        articulo.refresh_from_db()
+        return articulo.stock_actual
+
+    def assertChained(self, articulo):
+        entradas = list(LogArticulo.objects.filter(articulo=articulo).order_by('fecha', 'pk'))
+        for previa, entrada in zip(entradas, entradas[1:]):
+            self.assertEqual(entrada.saldo_anterior, previa.saldo_posterior)
+        self.assertEqual(entradas[-1].saldo_posterior, self.stock(articulo))
+
+    def test_bulk_void_reverses_stock_cost_and_balances_set_based(self):
+        compra = self.comprar(self.huevos, 100, 40)
+        self.stock(self.huevos)
+        self.assertEqual(self.huevos.costo_promedio, 15)
+        ventas = [self.vender(2, 10), self.vender(1, 6)]
+        self.assertEqual(self.stock(self.huevos), 600 - 24 - 10 - 12 - 6)
+        self.assertEqual(self.stock(self.caja), 47)
+
+        self.client.force_login(User.objects.create_user('u'))
+        self.assertContains(self.client.get(reverse('transaccion-list')), f'name="seleccion" value="{compra.pk}"')
+        pks = [compra.pk] + [v.pk for v in ventas]
+        response = self.client.post(reverse('transaccion-bulk-estado'), {'seleccion': pks, 'accion': 'ANULADO'})
+        self.assertRedirects(response, reverse('transaccion-list'))
+
+        self.assertEqual(self.stock(self.huevos), 500)
+        self.assertEqual(self.stock(self.caja), 50)
+        self.assertEqual(self.huevos.costo_promedio, 10)
+        self.assertChained(self.huevos)
+        self.assertChained(self.caja)
+        self.assertEqual(LogArticulo.objects.filter(tipo='AJUSTE', articulo=self.huevos).count(), 3) # One per transaction
+        self.assertEqual(set(CabeceraTransaccion.objects.filter(pk__in=pks).values_list('estado_pago', flat=True)), {EstadoPago.ANULADO})
+        self.assertFalse(SaldoEntidad.objects.exclude(saldo=0).exclude(tipo_operacion=TipoOperacion.COMPRA).exists())
+
+        # Voiding again is a no-op
+        self.assertEqual(transacciones.anular(CabeceraTransaccion.objects.filter(pk__in=pks)), 0)
+        self.assertEqual(self.stock(self.huevos), 500)
+
+    def test_view_voids_mixed_selection_and_skips_malformed_values(self):
+        compra = self.comprar(self.huevos, 100, 10)
+        venta = self.vender(1, 6)
+        self.client.force_login(User.objects.create_user('u'))
+        response = self.client.post(reverse('transaccion-bulk-estado'), {
+            'seleccion': [compra.pk, venta.pk, 'abc', '', '1; DROP'], 'accion': 'ANULADO', 'filtros': 'tipo=VENTA',
+        })
+        self.assertRedirects(response, f"{reverse('transaccion-list')}?tipo=VENTA", fetch_redirect_response=False)
+        self.assertEqual(
+            set(CabeceraTransaccion.objects.filter(pk__in=[compra.pk, venta.pk]).values_list('estado_pago', flat=True)), {EstadoPago.ANULADO}
+        )
+        self.assertEqual(self.stock(self.huevos), 500)
+        self.assertEqual(self.stock(self.caja), 50)
+        self.assertChained(self.huevos)
+
+    def test_query_count_does_not_grow_with_the_selection(self):
+        pocas = [self.vender(1, 1) for _ in range(2)]
+        muchas = [self.vender(1, 1) for _ in range(8)]
+        with CaptureQueriesContext(connection) as dos:
+            transacciones.anular(CabeceraTransaccion.objects.filter(pk__in=[v.pk for v in pocas]))
+        with CaptureQueriesContext(connection) as ocho:
+            transacciones.anular(CabeceraTransaccion.objects.filter(pk__in=[v.pk for v in muchas]))
+        self.assertLessEqual(len(ocho), len(dos))
+
+        pendientes = CabeceraTransaccion.objects.filter(tipo_operacion=TipoOperacion.COMPRA)
+        with self.assertNumQueries(10): # Savepoints included; independent of the number of rows
+            self.assertEqual(transacciones.pagar(pendientes), 2)
+        saldo = SaldoEntidad.objects.get(entidad=self.entidad, tipo_operacion=TipoOperacion.COMPRA)
+        self.assertEqual((saldo.saldo, saldo.pendientes, saldo.mas_antigua), (0, 0, None))
+
+class ReplicaTests(TestCase):
+    def setUp(self):
+        import tempfile
+        self.tmp = tempfile.TemporaryDirectory()
+        self.origen = f"{self.tmp.name}/primaria.sqlite3"
+        self.destino = f"{self.tmp.name}/reportes.sqlite3"
+        import sqlite3
+        with sqlite3.connect(self.origen) as conn:
+            conn.execute("CREATE TABLE t (x INTEGER)")
+            conn.execute("INSERT INTO t VALUES (1)")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_backup_copy_and_staleness(self):
+        import os
+        import sqlite3
+        al = replica.refrescar(self.origen, self.destino)
+        with sqlite3.connect(self.destino) as conn:
+            self.assertEqual(conn.execute("SELECT x FROM t").fetchall(), [(1,)])
+        self.assertFalse(os.path.exists(self.destino + '.tmp'))
+
+        with mock.patch.object(replica, '_ruta', return_value=self.destino):
+            self.assertAlmostEqual(replica.estado().timestamp(), al.timestamp(), places=3)
+            viejo = (timezone.now() - replica.MAX_RETRASO - datetime.timedelta(minutes=1)).timestamp()
+            os.utime(self.destino, (viejo, viejo))
+            self.assertIsNone(replica.estado()) # Refresher stopped: views fall back to the primary
+
+    def test_only_decorated_views_read_from_replica(self):
+        from django.test import RequestFactory
+        from .routers import ReplicaRouter
+        router = ReplicaRouter()
+        ahora = timezone.now()
+
+        @replica.usar_replica
+        def vista(request):
+            return router.db_for_read(Lote), router.db_for_write(Lote)
+
+        request = RequestFactory().get('/')
+        with mock.patch.object(replica, 'estado', return_value=ahora):
+            self.assertEqual(vista(request), ('reportes', 'default'))
+            self.assertEqual(request.replica_al, ahora)
+            self.assertEqual(vista(RequestFactory().post('/')), (None, 'default'))
+        self.assertIsNone(router.db_for_read(Lote))
+        with mock.patch.object(replica, 'estado', return_value=None):
+            self.assertEqual(vista(RequestFactory().get('/')), (None, 'default'))
+
+    def test_staleness_shown_in_reports(self):
+        self.client.force_login(User.objects.create_user('u'))
+        self.assertNotContains(self.client.get(reverse('auditoria-dashboard')), 'Datos al')
+        # Route display only: the test database has no separate replica
+        with mock.patch.object(replica, 'estado', return_value=timezone.now() - datetime.timedelta(minutes=5)), \
+                mock.patch.object(replica, 'activa', return_value=False):
+            self.assertContains(self.client.get(reverse('auditoria-dashboard')), 'Datos al')
+
+class ArchivoTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('u'))
+        self.galpon = Galpon.objects.create(nombre="Galpon 1", capacidad_max=1000)
+        hoy = timezone.localdate()
+        self.lote = Lote.objects.create(galpon=self.galpon, raza="Raza 1", aves_iniciales=100, fecha_inicio=hoy - datetime.timedelta(days=800))
+        self.alimento = Articulo.objects.create(nombre="Alimento", tipo=TipoArticulo.INSUMO, stock_actual=1000, costo_promedio=2)
+        self.huevos = Articulo.objects.create(nombre="Huevo", tipo=TipoArticulo.PRODUCTO, stock_actual=0)
+
+        self.viejos = []
+        for d in range(3):
+            dia = hoy - datetime.timedelta(days=700 - d)
+            for h in range(2):
+                fecha = timezone.make_aware(datetime.datetime.combine(dia, datetime.time(8 + h)))
+                self.viejos.append(MovimientoInterno.objects.create(lote=self.lote, articulo=self.huevos, tipo_movimiento=TipoMovimiento.PRODUCCION, cantidad=10, fecha=fecha).pk)
+                self.viejos.append(MovimientoInterno.objects.create(lote=self.lote, articulo=self.alimento, tipo_movimiento=TipoMovimiento.CONSUMO, cantidad=5, fecha=fecha).pk)
+            for m in range(10):
+                RegistroBajas.objects.create(lote=self.lote, cantidad=1, fecha=timezone.make_aware(datetime.datetime.combine(dia, datetime.time(12, m))))
+        self.reciente = MovimientoInterno.objects.create(lote=self.lote, articulo=self.huevos, tipo_movimiento=TipoMovimiento.PRODUCCION, cantidad=7, fecha=timezone.now() - datetime.timedelta(days=10))
+        self.lote.estado = False
+        self.lote.save()
+
+    def totales(self):
+        lote = self.client.get(reverse('lote-detail', args=[self.lote.pk])).context['lote']
+        self.huevos.refresh_from_db()
+        self.alimento.refresh_from_db()
+        self.lote.refresh_from_db()
+        return (
+            lote.total_bajas, lote.total_produccion, lote.total_consumo, self.lote.aves_actuales,
+            self.huevos.stock_actual, self.alimento.stock_actual, costos.resumen_lotes([self.lote])[self.lote.pk],
+        )
+
+    def assertChained(self, articulo):
+        entradas = list(LogArticulo.objects.filter(articulo=articulo).order_by('fecha', 'pk'))
+        for previa, entrada in zip(entradas, entradas[1:]):
+            self.assertEqual(entrada.saldo_anterior, previa.saldo_posterior)
+        self.assertEqual(entradas[-1].saldo_posterior, articulo.stock_actual)
+
+    def test_archiving_keeps_totals_and_chain(self):
+        antes = self.totales()
+        self.assertEqual(archivo.archivar(), {'movimientos': 12, 'bajas': 30, 'kardex': 12})
+        self.assertEqual(self.totales(), antes)
+
+        # One summary row per day (and article / motive); the detail went to the archive tables
+        self.assertEqual(MovimientoInterno.objects.filter(lote=self.lote, archivado=True).count(), 6)
+        self.assertEqual(RegistroBajas.objects.filter(lote=self.lote, archivado=True).count(), 3)
+        self.assertEqual(sorted(MovimientoInternoArchivo.objects.values_list('id_original', flat=True)), sorted(self.viejos))
+        self.assertEqual(RegistroBajasArchivo.objects.count(), 30)
+        self.assertEqual(LogArticuloArchivo.objects.filter(articulo=self.huevos).count(), 6)
+        self.assertTrue(MovimientoInterno.objects.filter(pk=self.reciente.pk, archivado=False).exists())
+        for articulo in (self.huevos, self.alimento):
+            self.assertChained(articulo)
+            self.assertFalse(LogArticulo.objects.filter(articulo=articulo, fecha__lt=archivo.corte()).exclude(tipo='ARCHIVO').exists())
+
+        # Running again is a no-op
+        self.assertEqual(archivo.archivar(), {'movimientos': 0, 'bajas': 0, 'kardex': 0})
+        self.assertEqual(self.totales(), antes)
+
+    def test_summary_rows_are_read_only(self):
+        archivo.archivar()
+        resumen = RegistroBajas.objects.filter(archivado=True).first()
+        resumen.cantidad = 1
+        with self.assertRaises(ValidationError):
+            resumen.save()
+        with self.assertRaises(ValidationError):
+            MovimientoInterno.objects.filter(archivado=True).first().delete()
+
+    def test_paid_detail_with_archived_kardex_is_frozen(self):
+        entidad = Entidad.objects.create(nombre_razon_social="Proveedor 1", es_proveedor=True)
+        compra = CabeceraTransaccion.objects.create(
+            tipo_operacion=TipoOperacion.COMPRA, entidad=entidad, estado_pago=EstadoPago.PAGADO,
+            fecha=timezone.localdate() - datetime.timedelta(days=690),
+        )
+        detalle = DetalleTransaccion.objects.create(transaccion=compra, articulo=self.alimento, cantidad=100, precio_unitario=2)
+        archivo.archivar()
+        self.assertTrue(LogArticuloArchivo.objects.filter(detalle_id=detalle.pk).exists())
+        self.alimento.refresh_from_db()
+        stock = self.alimento.stock_actual
+
+        detalle.cantidad = 50
+        with self.assertRaises(ValidationError), transaction.atomic():
+            detalle.save()
+        with self.assertRaises(ValidationError), transaction.atomic():
+            DetalleTransaccion.objects.get(pk=detalle.pk).delete()
+        self.alimento.refresh_from_db()
+        self.assertEqual(self.alimento.stock_actual, stock)
+        self.assertChained(self.alimento)
+
+    def test_full_history_views(self):
+        archivo.archivar()
+        url = reverse('articulo-kardex', args=[self.huevos.pk])
+        resumido = list(self.client.get(url).context['history'])
+        self.assertIn('ARCHIVO', {e.tipo for e in resumido})
+        completo = list(self.client.get(url, {'completo': '1'}).context['history'])
+        self.assertNotIn('ARCHIVO', {e.tipo for e in completo})
+        self.assertEqual(len(completo), 7)
+        self.assertEqual([e.fecha for e in completo], sorted((e.fecha for e in completo), reverse=True))
+
+        response = self.client.get(reverse('lote-historial', args=[self.lote.pk, 'movimientos']), {'completo': '1'})
+        self.assertEqual({r.pk for r in response.context['rows']}, {*self.viejos, self.reciente.pk})
+        self.assertContains(response, 'Alimento')
+
+        # Keyset pages walk the archive exactly once
+        url = reverse('lote-historial', args=[self.lote.pk, 'bajas'])
+        primera = self.client.get(url, {'completo': '1'})
+        self.assertEqual(len(primera.context['rows']), 25)
+        self.assertContains(primera, '&amp;completo=1')
+        segunda = self.client.get(url, {'completo': '1', 'cursor': primera.context['next_cursor']})
+        self.assertIsNone(segunda.context['next_cursor'])
+        vistos = [r.pk for r in primera.context['rows'] + segunda.context['rows']]
+        self.assertEqual(sorted(vistos), sorted(RegistroBajasArchivo.objects.values_list('id_original', flat=True)))
+
+class CantidadFieldTests(TestCase):
+    def setUp(self):
+        self.galpon = Galpon.objects.create(nombre="Galpon 1", capacidad_max=1000)
+        self.lote = Lote.objects.create(galpon=self.galpon, raza="Raza 1", aves_iniciales=100)
+        self.alimento = Articulo.objects.create(nombre="Alimento", tipo=TipoArticulo.INSUMO, stock_actual=Decimal('100.25'))
+
+    def columna(self, modelo, campo, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT {campo} FROM {modelo._meta.db_table} WHERE {modelo._meta.pk.column} = %s", [pk])
+            return cursor.fetchone()[0]
+
+    def test_stored_as_integer_thousandths(self):
+        self.assertEqual(self.columna(Articulo, 'stock_actual', self.alimento.pk), 100250)
+        self.alimento.refresh_from_db()
+        self.assertEqual(self.alimento.stock_actual, Decimal('100.25'))
+        self.assertIsInstance(self.alimento.stock_actual, Decimal)
+
+        receta = Receta.objects.create(producto=Articulo.objects.create(nombre="Pack", tipo=TipoArticulo.PRODUCTO), ingrediente=self.alimento, cantidad='0.083')
+        self.assertEqual(self.columna(Receta, 'cantidad', receta.pk), 83)
+        self.assertEqual(Receta.objects.get(pk=receta.pk).cantidad, Decimal('0.083'))
+
+    def test_ledger_arithmetic_and_sums_are_exact(self):
+        for _ in range(3):
+            MovimientoInterno.objects.create(lote=self.lote, articulo=self.alimento, tipo_movimiento=TipoMovimiento.CONSUMO, cantidad='0.1')
+        self.alimento.refresh_from_db()
+        self.assertEqual(self.alimento.stock_actual, Decimal('99.95'))
+        self.assertEqual(MovimientoInterno.objects.aggregate(t=Sum('cantidad'))['t'], Decimal('0.3'))
+        self.assertEqual(Articulo.objects.filter(stock_actual__gt=Decimal('99.9')).count(), 1)
+        entrada = LogArticulo.objects.filter(articulo=self.alimento).order_by('fecha', 'pk').last()
+        self.assertEqual((entrada.saldo_anterior, entrada.saldo_posterior), (Decimal('100.05'), Decimal('99.95')))
+        self.assertEqual(cantidades.escalar('1.0005'), 1000) # Half-even to the thousandth
+
+
+class GranjaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.norte = Granja.objects.create(nombre="Norte")
+        self.sur = Granja.objects.create(nombre="Sur")
+        self.usuario_norte = User.objects.create_user('norte')
+        self.usuario_sur = User.objects.create_user('sur')
+        self.norte.usuarios.add(self.usuario_norte)
+        self.sur.usuarios.add(self.usuario_sur)
+        self.datos = {}
+        for granja in (self.norte, self.sur):
+            with granjas.activar(granja.pk):
+                galpon = Galpon.objects.create(nombre=f"Galpon {granja.nombre}", capacidad_max=1000)
+                lote = Lote.objects.create(galpon=galpon, raza="Raza 1", aves_iniciales=100)
+                articulo = Articulo.objects.create(nombre=f"Alimento {granja.nombre}", tipo=TipoArticulo.INSUMO, stock_actual=100)
+            self.datos[granja.pk] = (galpon, lote, articulo)
+
+    def test_new_rows_and_queries_follow_the_active_farm(self):
+        galpon_norte, lote_norte, articulo_norte = self.datos[self.norte.pk]
+        self.assertEqual((galpon_norte.granja, articulo_norte.granja), (self.norte, self.norte))
+        with granjas.activar(self.norte.pk):
+            self.assertEqual(list(Articulo.objects.all()), [articulo_norte])
+            self.assertEqual(list(Lote.objects.all()), [lote_norte])
+            self.assertEqual(list(LoteForm().fields['galpon'].queryset), [galpon_norte])
+        # No farm active (commands): every farm, and `todos` never filters
+        self.assertEqual(Articulo.objects.count(), 2)
+        with granjas.activar(self.sur.pk):
+            self.assertEqual(Articulo.todos.count(), 2)
+
+    def test_users_only_see_their_farm(self):
+        _, lote_sur, _ = self.datos[self.sur.pk]
+        self.client.force_login(self.usuario_norte)
+        response = self.client.get(reverse('articulo-list'))
+        self.assertContains(response, "Alimento Norte")
+        self.assertNotContains(response, "Alimento Sur")
+        self.assertEqual(self.client.get(reverse('lote-detail', args=[lote_sur.pk])).status_code, 404)
+
+        # Cached fragments are per farm too
+        self.client.force_login(self.usuario_sur)
+        response = self.client.get(reverse('articulo-list'))
+        self.assertContains(response, "Alimento Sur")
+        self.assertNotContains(response, "Alimento Norte")
+
+    def test_switch_farm(self):
+        self.norte.usuarios.add(self.usuario_sur)
+        self.client.force_login(self.usuario_sur)
+        self.assertContains(self.client.get(reverse('articulo-list')), "Alimento Norte") # First by name
+
+        response = self.client.post(reverse('granja-cambiar'), {'granja': self.sur.pk, 'next': reverse('galpon-list')})
+        self.assertRedirects(response, reverse('galpon-list'))
+        self.assertContains(self.client.get(reverse('articulo-list')), "Alimento Sur")
+
+        # A farm the user is not a member of is refused
+        otra = Granja.objects.create(nombre="Otra")
+        self.client.post(reverse('granja-cambiar'), {'granja': otra.pk, 'next': 'https://example.com/'})
+        self.assertEqual(self.client.session[granjas.SESION], self.sur.pk)
+
+    def test_owner_default_farm_resolved_once(self):
+        granjas.predeterminada()
+        with self.assertNumQueries(0):
+            filas = [CabeceraTransaccion() for _ in range(5)] + [Articulo(), Galpon(), Entidad()]
+        self.assertEqual({f.granja_id for f in filas}, {granjas.predeterminada()})
+        with granjas.activar(self.sur.pk):
+            self.assertEqual(Articulo().granja_id, self.sur.pk)
+
+    def test_farm_list_is_cached_until_membership_changes(self):
+        self.assertEqual(granjas.disponibles(self.usuario_sur), [self.sur])
+        with self.assertNumQueries(0):
+            self.assertEqual(granjas.disponibles(self.usuario_sur), [self.sur])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.norte.usuarios.add(self.usuario_sur)
+        self.assertEqual(granjas.disponibles(self.usuario_sur), [self.norte, self.sur])
+
+    def test_writes_only_invalidate_their_own_farm(self):
+        _, lote_norte, articulo_norte = self.datos[self.norte.pk]
+        claves = {}
+        for granja in (self.norte, self.sur):
+            with granjas.activar(granja.pk):
+                claves[granja.pk] = fragmentos.clave('tabla', ['articulos'])
+                alertas.lista_reorden()
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(0):
+            alertas.marcar(articulo_norte.pk, self.norte.pk)
+            fragmentos.invalidar('articulos', granja=self.norte.pk)
+        self.assertEqual(cache.get(f'{alertas.CACHE_SUCIOS}:g{self.norte.pk}'), 1)
+        self.assertEqual(cache.get(f'{alertas.CACHE_SUCIOS}:g{self.norte.pk}:1'), articulo_norte.pk)
+        self.assertEqual(cache.get(f'{alertas.CACHE_SUCIOS}:g{self.sur.pk}'), 0)
+        with granjas.activar(self.sur.pk):
+            self.assertEqual(fragmentos.clave('tabla', ['articulos']), claves[self.sur.pk])
+        with granjas.activar(self.norte.pk):
+            self.assertNotEqual(fragmentos.clave('tabla', ['articulos']), claves[self.norte.pk])
+        self.assertEqual(granjas.de_fila(MovimientoInterno(lote=lote_norte)), self.norte.pk)
+
+
+class CierreLoteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('u'))
+        self.huevo = Articulo.objects.create(nombre="Huevo", tipo=TipoArticulo.PRODUCTO, controlar_stock=False)
+        self.alimento = Articulo.objects.create(nombre="Alimento", tipo=TipoArticulo.INSUMO, stock_actual=1000, costo_promedio=2)
+        galpon = Galpon.objects.create(nombre="Galpon 1", capacidad_max=1000)
+        self.lote = Lote.objects.create(galpon=galpon, raza="Hy-Line", aves_iniciales=100, fecha_inicio=timezone.localdate() - timezone.timedelta(days=30))
+        for dia in range(14):
+            fecha = self.dia(dia)
+            MovimientoInterno.objects.create(lote=self.lote, articulo=self.huevo, tipo_movimiento=TipoMovimiento.PRODUCCION, cantidad=50 if dia < 7 else 80, fecha=fecha)
+            MovimientoInterno.objects.create(lote=self.lote, articulo=self.alimento, tipo_movimiento=TipoMovimiento.CONSUMO, cantidad=10, fecha=fecha)
+        RegistroBajas.objects.create(lote=self.lote, cantidad=3, motivo=MotivoBaja.ACCIDENTE, fecha=self.dia(15))
+        RegistroBajas.objects.create(lote=self.lote, cantidad=2, motivo=MotivoBaja.DEPREDADOR, fecha=self.dia(15))
+
+    def dia(self, n):
+        return timezone.make_aware(datetime.datetime.combine(self.lote.fecha_inicio + timezone.timedelta(days=n), datetime.time(12)))
+
+    def cerrar(self):
+        self.lote = Lote.objects.get(pk=self.lote.pk)
+        self.lote.estado = False
+        self.lote.save()
+        return CierreLote.objects.get(lote=self.lote)
+
+    def test_closing_freezes_the_summary(self):
+        cierre = self.cerrar()
+        self.assertEqual(cierre.fecha_cierre, self.lote.fecha_inicio + timezone.timedelta(days=15))
+        self.assertEqual(cierre.dias, 16)
+        self.assertEqual((cierre.huevos, cierre.alimento), (Decimal(910), Decimal(140)))
+        self.assertEqual(cierre.bajas_motivo, {MotivoBaja.ACCIDENTE: 3, MotivoBaja.DEPREDADOR: 2})
+        self.assertEqual((cierre.bajas, cierre.aves_finales, cierre.mortalidad), (5, 95, 5.0))
+        self.assertEqual((cierre.puesta_pico, cierre.semana_pico), (80, 2))
+        self.assertEqual(cierre.gramos_huevo, 153.8)
+        self.assertEqual(cierre.costo, Decimal(280))
+
+        # Late data does not touch it; only an explicit recalculation does
+        MovimientoInterno.objects.create(lote=self.lote, articulo=self.huevo, tipo_movimiento=TipoMovimiento.PRODUCCION, cantidad=90, fecha=self.dia(14))
+        self.lote.save()
+        self.assertEqual(CierreLote.objects.get(lote=self.lote).huevos, 910)
+        with self.assertRaises(ValidationError):
+            cierre.huevos = 1000
+            cierre.save()
+
+        self.client.post(reverse('lote-cierre-recalcular', args=[self.lote.pk]))
+        self.assertEqual(CierreLote.objects.get(lote=self.lote).huevos, 1000)
+        self.assertContains(self.client.get(reverse('lote-detail', args=[self.lote.pk])), "Resumen de cierre")
+
+        self.lote.estado = True
+        self.lote.save()
+        self.assertFalse(CierreLote.objects.filter(lote=self.lote).exists())
+
+    def test_comparison_reads_only_summaries(self):
+        self.cerrar()
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('lotes-cerrados'))
+        self.assertContains(response, "80,0%")
+        self.assertContains(response, "153,8")
+        tablas = ' '.join(c['sql'] for c in consultas.captured_queries)
+        self.assertNotIn('movimientointerno', tablas)
+        self.assertNotIn('registrobajas', tablas)
+
+
+class GraficosSaludTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('u'))
+        self.huevo = Articulo.objects.create(nombre="Huevo", tipo=TipoArticulo.PRODUCTO, controlar_stock=False)
+        galpon = Galpon.objects.create(nombre="Galpon 1", capacidad_max=1000)
+        self.hoy = timezone.localdate()
+        self.lote = Lote.objects.create(galpon=galpon, raza="Hy-Line", aves_iniciales=100, fecha_inicio=self.hoy - timezone.timedelta(days=120))
+
+    def test_downsampling_keeps_ends_and_spikes(self):
+        y = np.sin(np.arange(730) / 20) + 1
+        y[400] = 50
+        for reducir in (graficos.lttb, graficos.minmax):
+            indices = reducir(y, 100)
+            self.assertLessEqual(len(indices), 102)
+            self.assertEqual((indices[0], indices[-1]), (0, 729))
+            self.assertIn(400, indices)
+            self.assertTrue((np.diff(indices) > 0).all())
+        self.assertEqual(len(graficos.lttb(y, 100)), 100)
+        self.assertEqual(list(graficos.lttb(y[:50], 100)), list(range(50)))
+
+    def test_compact_columnar_payload(self):
+        for d in range(60):
+            fecha = timezone.make_aware(datetime.datetime.combine(self.hoy - timezone.timedelta(days=d), datetime.time(12)))
+            MovimientoInterno.objects.create(lote=self.lote, articulo=self.huevo, tipo_movimiento=TipoMovimiento.PRODUCCION, cantidad=80, fecha=fecha)
+        RegistroBajas.objects.create(lote=self.lote, cantidad=7, fecha=timezone.now() - timezone.timedelta(days=33))
+
+        response = self.client.get(reverse('salud-datos'), {'dias': 90, 'puntos': 20})
+        self.assertNotIn(b'": ', response.content) # No whitespace between items
+        datos = response.json()
+        self.assertEqual((datos['inicio'], datos['dias']), ((self.hoy - timezone.timedelta(days=90)).isoformat(), 91))
+        self.assertEqual(datos['lotes'][0]['label'], "Galpon 1 (Hy-Line)")
+        x, y = datos['series']['puesta'][0]
+        self.assertEqual((len(x), len(y), x[0], x[-1]), (20, 20, 0, 90))
+        self.assertEqual(y[-1], 86.0) # 80 eggs / 93 birds
+        x, y = datos['series']['mortalidad'][0]
+        self.assertEqual(y[x.index(90 - 33)], 7)
+        self.assertContains(self.client.get(reverse('salud-dashboard'), {'dias': 730}), reverse('salud-datos'))
+
+
+class PopulateDbTests(TestCase):
+    def test_scale_headers_keep_their_total_when_flushed_early(self):
+        from io import StringIO
+        from django.core.management import call_command
+        # chunk=1 flushes every header as soon as it is queued
+        call_command('populate_db', scale=True, galpones=1, anios=1, entidades=2, aves=100, consumos_dia=1, chunk=1, stdout=StringIO())
+        cabeceras = CabeceraTransaccion.objects.annotate(suma=Sum('detalles__subtotal'))
+        self.assertTrue(cabeceras.exists())
+        for c in cabeceras:
+            self.assertEqual(c.monto_total, c.suma)
@@ -0,0 +1,151 @@
+"""
+State changes of transactions, applied to a whole set at once (bulk actions in
+transaccion_list and the admin; the buttons of a single transaction are the
+one-element case).
+
+- pagar: one UPDATE over the PENDIENTE ones.
+- anular: the details of the whole set are read with one query and their stock effect
+  is reversed per article: a single UPDATE moves the stock of every article touched
+  (taking voided purchases back out of the average cost in the same statement), and
+  the AJUSTE kardex entries (one per transaction and article) go in one bulk_create.
+
+Receivable / payable balances are adjusted per entity in the same transaction.
+"""
+from django.db import transaction
+from django.db.models import BooleanField, Case, ExpressionWrapper, F, Q, When
+from django.utils import timezone
+
+from . import alertas, fragmentos, saldos
+from .cantidades import valor
+from .costos import COSTO
+from .models import Articulo, CabeceraTransaccion, DetalleTransaccion, EstadoPago, LogArticulo, Receta, TipoOperacion
+
+CAMPOS_SALDO = ('entidad_id', 'tipo_operacion', 'fecha', 'monto_total', 'estado_pago')
+STOCK = Articulo._meta.get_field('stock_actual')
+
+
+def pagar(transacciones):
+    """Marks the PENDIENTE transactions of the queryset as PAGADO. Returns how many changed."""
+    with transaction.atomic():
+        filas = list(transacciones.select_for_update().filter(estado_pago=EstadoPago.PENDIENTE).values('pk', *CAMPOS_SALDO))
+        if filas:
+            CabeceraTransaccion.objects.filter(pk__in=[f['pk'] for f in filas]).update(estado_pago=EstadoPago.PAGADO)
+            saldos.retirar([saldos.aporte(*(f[c] for c in CAMPOS_SALDO)) for f in filas])
+    return len(filas)
+
+
+def _reversiones(cabeceras):
+    """
+    Stock to give back per (transaction, article), in posting order, plus the voided
+    purchases per article as (quantity, quantity x price, stock coming back from voided
+    sales). Only stock-controlled articles.
+    """
+    detalles = list(
+        DetalleTransaccion.objects.filter(transaccion_id__in=cabeceras)
+        .order_by('transaccion_id', 'pk').values_list('transaccion_id', 'articulo_id', 'cantidad', 'precio_unitario')
+    )
+    vendidos = {a for t, a, _, _ in detalles if cabeceras[t]['tipo_operacion'] == TipoOperacion.VENTA}
+    recetas = {}
+    for producto, ingrediente, cantidad in Receta.objects.filter(producto_id__in=vendidos).values_list('producto_id', 'ingrediente_id', 'cantidad'):
+        recetas.setdefault(producto, []).append((ingrediente, cantidad))
+
+    deltas, compras = {}, {}
+    for t, articulo, cantidad, precio in detalles:
+        if cabeceras[t]['tipo_operacion'] == TipoOperacion.COMPRA:
+            deltas[t, articulo] = deltas.get((t, articulo), 0) - cantidad
+            q, qp = compras.get(articulo, (0, 0))
+            compras[articulo] = (q + cantidad, qp + cantidad * precio)
+        elif articulo in recetas: # Pack sale: its ingredients come back
+            for ingrediente, por_unidad in recetas[articulo]:
+                deltas[t, ingrediente] = deltas.get((t, ingrediente), 0) + cantidad * por_unidad
+        else:
+            deltas[t, articulo] = deltas.get((t, articulo), 0) + cantidad
+
+    controlados = set(Articulo.objects.filter(pk__in={a for _, a in deltas}, controlar_stock=True).values_list('pk', flat=True))
+    deltas = {k: d for k, d in deltas.items() if k[1] in controlados and d}
+    devueltos = {}
+    for (t, a), d in deltas.items():
+        if cabeceras[t]['tipo_operacion'] == TipoOperacion.VENTA:
+            devueltos[a] = devueltos.get(a, 0) + d
+    compras = {a: (q, qp, devueltos.get(a, 0)) for a, (q, qp) in compras.items() if a in controlados}
+    return deltas, compras
+
+
+def _mover_stock(por_articulo, compras):
+    """
+    One UPDATE for every article: stock, below-minimum flag and (for voided purchases)
+    average cost. Purchases are taken out of the average as if the voided sales had been
+    undone first, which makes voiding a purchase and its later sales an exact undo.
+    Stock is in thousandths, so quantity x price (qp) is scaled the same way.
+    """
+    delta = Case(*[When(pk=a, then=valor(d)) for a, d in por_articulo.items()], default=valor(0), output_field=STOCK)
+    cambios = {
+        'stock_actual': F('stock_actual') + delta,
+        'bajo_minimo': ExpressionWrapper(Q(stock_actual__lte=F('stock_minimo') - delta), output_field=BooleanField()),
+    }
+    if compras:
+        cambios['costo_promedio'] = Case(
+            *[
+                When(
+                    pk=a, stock_actual__gt=q - v,
+                    then=((F('stock_actual') + valor(v)) * F('costo_promedio') - valor(qp)) / (F('stock_actual') + valor(v) - valor(q)),
+                )
+                for a, (q, qp, v) in compras.items()
+            ],
+            default=F('costo_promedio'), output_field=COSTO,
+        )
+    Articulo.objects.filter(pk__in=por_articulo).update(**cambios)
+
+
+def _kardex(deltas, cabeceras, por_articulo, ahora):
+    """AJUSTE entries at `ahora`, chained per article; later-dated entries are shifted by the total."""
+    actuales = {pk: (stock, costo) for pk, stock, costo in Articulo.objects.filter(pk__in=por_articulo).values_list('pk', 'stock_actual', 'costo_promedio')}
+    antes = {a: actuales[a][0] - d for a, d in por_articulo.items()}
+
+    # Rare: entries dated after now (future-dated transactions) sit after the new ones
+    for a in set(LogArticulo.objects.filter(articulo_id__in=por_articulo, fecha__gt=ahora).values_list('articulo_id', flat=True)):
+        posteriores = LogArticulo.objects.filter(articulo_id=a, fecha__gt=ahora)
+        previo = LogArticulo.objects.filter(articulo_id=a, fecha__lte=ahora).order_by('-fecha', '-pk').first()
+        antes[a] = previo.saldo_posterior if previo else posteriores.order_by('fecha', 'pk').first().saldo_anterior
+        posteriores.update(saldo_anterior=F('saldo_anterior') + valor(por_articulo[a]), saldo_posterior=F('saldo_posterior') + valor(por_articulo[a]))
+
+    entradas = []
+    for (t, a), d in deltas.items():
+        cabecera = cabeceras[t]
+        descripcion = f"ANULACIÓN {TipoOperacion(cabecera['tipo_operacion']).label.upper()} #{t}"
+        if cabecera['numero_documento']:
+            descripcion += f" (Doc: {cabecera['numero_documento']})"
+        entradas.append(LogArticulo(
+            articulo_id=a, fecha=ahora, tipo='AJUSTE', cantidad=d,
+            saldo_anterior=antes[a], saldo_posterior=antes[a] + d, costo_unitario=actuales[a][1], descripcion=descripcion,
+        ))
+        antes[a] += d
+    LogArticulo.objects.bulk_create(entradas)
+
+
+def anular(transacciones):
+    """Voids the transactions of the queryset that are not ANULADO yet, reversing their stock. Returns how many."""
+    with transaction.atomic():
+        cabeceras = {
+            c['pk']: c for c in transacciones.select_for_update().exclude(estado_pago=EstadoPago.ANULADO)
+            .values('pk', 'numero_documento', 'granja_id', *CAMPOS_SALDO)
+        }
+        if not cabeceras:
+            return 0
+
+        deltas, compras = _reversiones(cabeceras)
+        por_articulo = {}
+        for (_, a), d in deltas.items():
+            por_articulo[a] = por_articulo.get(a, 0) + d
+        if por_articulo:
+            _mover_stock(por_articulo, compras)
+            _kardex(deltas, cabeceras, por_articulo, timezone.now())
+            granja = {a: cabeceras[t]['granja_id'] for t, a in deltas}
+            for a in por_articulo:
+                alertas.marcar(a, granja[a])
+            for g in set(granja.values()):
+                fragmentos.invalidar('articulos', granja=g)
+
+        CabeceraTransaccion.objects.filter(pk__in=cabeceras).update(estado_pago=EstadoPago.ANULADO)
+        saldos.retirar([saldos.aporte(*(c[f] for f in CAMPOS_SALDO)) for c in cabeceras.values()])
+    return len(cabeceras)
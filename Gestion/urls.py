@@ -4,8 +4,13 @@ from . import views
 urlpatterns = [
     # Dashboard
     path('', views.index, name='index'),
+    path('granja/', views.granja_cambiar, name='granja-cambiar'),
     path('auditoria/', views.auditoria_dashboard, name='auditoria-dashboard'),
     path('salud/', views.salud_dashboard, name='salud-dashboard'),
+    path('salud/datos/', views.salud_datos, name='salud-datos'),
+    path('curvas/', views.curvas_puesta, name='curvas-puesta'),
+    path('costos/', views.costos_lotes, name='costos-lotes'),
+    path('planificacion/', views.planificacion_alimento, name='planificacion-alimento'),
     
     # Articulos
     path('articulos/', views.articulo_list, name='articulo-list'),
@@ -18,6 +23,8 @@ urlpatterns = [
     
     # Galpones
     path('galpones/', views.galpon_list, name='galpon-list'),
+    path('galpones/resumen/', views.galpon_dashboard, name='galpon-dashboard'),
+    path('galpones/<int:pk>/historial/', views.galpon_historial, name='galpon-historial'),
     path('galpones/nuevo/', views.galpon_create, name='galpon-create'),
     path('galpones/<int:pk>/editar/', views.galpon_update, name='galpon-update'),
     path('galpones/<int:pk>/eliminar/', views.galpon_delete, name='galpon-delete'),
@@ -27,7 +34,10 @@ urlpatterns = [
     path('lotes/resumen/', views.lote_overview, name='lote-overview'),
     path('lotes/nuevo/', views.lote_create, name='lote-create'),
     path('lotes/<int:pk>/', views.lote_detail, name='lote-detail'),
+    path('lotes/<int:pk>/historial/<str:tab>/', views.lote_historial, name='lote-historial'),
     path('lotes/<int:pk>/editar/', views.lote_update, name='lote-update'),
+    path('lotes/<int:pk>/cierre/recalcular/', views.lote_cierre_recalcular, name='lote-cierre-recalcular'),
+    path('lotes/cerrados/', views.lotes_cerrados, name='lotes-cerrados'),
     
     # Movimientos & Bajas (linked usually from Lote Detail)
     path('movimientos/nuevo/', views.movimiento_interno_create, name='movimiento-interno-create'),
@@ -39,11 +49,13 @@ urlpatterns = [
     path('entidades/nueva/', views.entidad_create, name='entidad-create'),
     path('entidades/<int:pk>/editar/', views.entidad_update, name='entidad-update'),
     path('entidades/<int:pk>/', views.entidad_detail, name='entidad-detail'),
+    path('cuentas/', views.cuentas_saldos, name='cuentas-saldos'),
     path('transacciones/', views.transaccion_list, name='transaccion-list'),
     path('transacciones/nueva/compra/', views.compra_create, name='compra-create'),
     path('transacciones/nueva/simple/', views.transaccion_simple_create, name='transaccion-simple-create'),
     path('transacciones/nueva/venta/', views.venta_create, name='venta-create'),
     path('transacciones/<int:pk>/editar/', views.transaccion_update, name='transaccion-update'),
+    path('transacciones/estado/', views.transaccion_bulk_estado, name='transaccion-bulk-estado'),
     path('transacciones/<int:pk>/estado/<str:nuevo_estado>/', views.transaccion_cambiar_estado, name='transaccion-cambiar-estado'),
     path('transacciones/<int:pk>/', views.transaccion_detail, name='transaccion-detail'), # Changed from delete
 ]
@@ -1,3 +1,6 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
 def get_ordering(request, allowed_fields, default_field='-pk'):
     """
     Helper to determine ordering field based on request params.
@@ -15,3 +18,29 @@ def get_ordering(request, allowed_fields, default_field='-pk'):
             ordering = sort_by
             
     return ordering
+
+def keyset_paginate(queryset, cursor=None, page_size=25, field='fecha', tiebreak='pk'):
+    """
+    Seek pagination over (-field, -tiebreak): cost depends on the page size, not on the offset.
+    cursor: "<value>|<tiebreak>" of the last row already shown (None for the first page).
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    queryset = queryset.order_by(f'-{field}', f'-{tiebreak}')
+
+    if cursor:
+        try:
+            value, last_pk = cursor.rsplit('|', 1)
+            value = queryset.model._meta.get_field(field).to_python(value)
+            last_pk = int(last_pk)
+        except (ValueError, ValidationError):
+            value = None
+        if value is not None:
+            queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, f'{tiebreak}__lt': last_pk}))
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = f"{getattr(last, field).isoformat()}|{getattr(last, tiebreak)}"
+    return rows, next_cursor
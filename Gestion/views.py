@@ -1,18 +1,24 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.db import models
-from django.db.models import Sum
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Sum, Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import Http404, JsonResponse
+from django.urls import reverse
+from django.utils.http import url_has_allowed_host_and_scheme
 from django.utils import timezone
 import datetime
 from django.core.paginator import Paginator
 from django.db.models import Q
-from .models import Articulo, Galpon, Lote, RegistroBajas, MovimientoInterno, Entidad, CabeceraTransaccion, RegistroVacunacion, TipoMovimiento, Receta, DetalleTransaccion, TipoOperacion
+from .models import Articulo, LogArticulo, Galpon, Lote, RegistroBajas, MovimientoInterno, Entidad, CabeceraTransaccion, RegistroVacunacion, TipoMovimiento, Receta, DetalleTransaccion, TipoOperacion, EstadoPago, ResumenGalponMes, CierreLote, MotivoBaja
 from .forms import (
     ArticuloForm, GalponForm, LoteForm, RegistroBajasForm, MovimientoInternoForm,
     EntidadForm, CabeceraTransaccionForm, DetalleTransaccionFormSet, RegistroVacunacionForm, RecetaForm,
     CabeceraTransaccionSimpleForm
 )
-from .utils import get_ordering
+from .utils import get_ordering, keyset_paginate
+from . import alertas, pronostico, curvas, ocupacion, costos, saldos, transacciones, replica, archivo, granjas, cierres, graficos
 from django.contrib.auth.decorators import login_required
 
 @login_required
@@ -22,34 +28,24 @@ def index(request):
     total_aves = Lote.objects.filter(estado=True).aggregate(Sum('aves_actuales'))['aves_actuales__sum'] or 0
     # Lote Status Logic
     lotes_activos = Lote.objects.filter(estado=True).count()
-    alertas_stock = Articulo.objects.filter(controlar_stock=True, stock_actual__lte=models.F('stock_minimo'))
+    alertas_stock = alertas.lista_reorden()
     
-    lotes = Lote.objects.filter(estado=True).order_by('galpon__nombre')
+    lotes = Lote.objects.filter(estado=True).select_related('galpon').order_by('galpon__nombre')
     today =  timezone.localdate()
     
     lotes_status = []
     for lote in lotes:
-        # Get ALL feed consumption for today
+        # Today's feed consumption; the queryset is lazy, so it only runs when the card
+        # is not in the fragment cache
         consumos_hoy = MovimientoInterno.objects.filter(
             lote=lote, 
             tipo_movimiento=TipoMovimiento.CONSUMO,
             fecha__date=today
-        ).order_by('fecha')
-        
-        alimentado = consumos_hoy.exists()
-        detalles_alim = []
-        for consumo in consumos_hoy:
-            detalles_alim.append({
-                'cantidad': consumo.cantidad,
-                'unidad': consumo.articulo.unidad_medida,
-                'nombre': consumo.articulo.nombre,
-                'hora': consumo.fecha  # DateTime object
-            })
+        ).select_related('articulo').order_by('fecha')
 
         lotes_status.append({
             'lote': lote,
-            'alimentado_hoy': alimentado,
-            'detalles': detalles_alim
+            'consumos_hoy': consumos_hoy,
         })
 
     context = {
@@ -57,6 +53,7 @@ def index(request):
         'lotes_activos': lotes_activos,
         'alertas_stock': alertas_stock,
         'lotes_status': lotes_status,
+        'hoy': today,
     }
     return render(request, 'Gestion/index.html', context)
 
@@ -162,12 +159,15 @@ def articulo_detail(request, pk):
 def articulo_kardex(request, pk):
     articulo = get_object_or_404(Articulo, pk=pk)
     
-    # Unified List from LogArticulo (Real Kardex)
-    history = articulo.logs.all().order_by('-fecha')
+    # Unified List from LogArticulo (Real Kardex); ?completo=1 swaps the monthly archive summaries for their entries
+    completo = request.GET.get('completo') == '1'
+    history = archivo.historial(LogArticulo, completo, articulo_id=articulo.pk)
     
     return render(request, 'Gestion/articulo_kardex.html', {
         'articulo': articulo,
-        'history': history
+        'history': history,
+        'completo': completo,
+        'tiene_archivo': articulo.logs.filter(tipo='ARCHIVO').exists(),
     })
 
 # Remove standalone receta_manage if no longer needed, or keep for direct access?
@@ -204,6 +204,23 @@ def receta_delete(request, pk):
     messages.success(request, 'Ingrediente eliminado de la receta.')
     return redirect('receta-manage', pk=producto_pk)
 
+# --- GRANJAS ---
+
+@login_required
+def granja_cambiar(request):
+    """Switches the farm the session works on, back to the page it was called from"""
+    if request.method == 'POST':
+        elegida = next((g for g in request.granjas if str(g.pk) == request.POST.get('granja')), None)
+        if elegida:
+            request.session[granjas.SESION] = elegida.pk
+            messages.success(request, f'Trabajando en la granja {elegida.nombre}.')
+        else:
+            messages.error(request, 'Granja no válida.')
+    siguiente = request.POST.get('next') or request.GET.get('next')
+    if siguiente and url_has_allowed_host_and_scheme(siguiente, {request.get_host()}, request.is_secure()):
+        return redirect(siguiente)
+    return redirect('index')
+
 # --- GALPONES ---
 
 @login_required
@@ -218,6 +235,45 @@ def galpon_list(request):
     
     return render(request, 'Gestion/galpon_list.html', {'galpones': galpones})
 
+@login_required
+def galpon_dashboard(request):
+    """Occupancy and performance per galpón: current month and the last 12 months (from the monthly rollup)"""
+    ocupacion.actualizar()
+    mes_actual = timezone.localdate().replace(day=1)
+    meses = [mes_actual]
+    for _ in range(11):
+        meses.insert(0, (meses[0] - datetime.timedelta(days=1)).replace(day=1))
+
+    resumenes = {}
+    for r in ResumenGalponMes.objects.filter(mes__gte=meses[0]):
+        resumenes[(r.galpon_id, r.mes)] = r
+
+    filas = []
+    for galpon in Galpon.objects.order_by('nombre'):
+        filas.append({
+            'galpon': galpon,
+            'actual': resumenes.get((galpon.pk, mes_actual)),
+            'historia': [resumenes.get((galpon.pk, m)) for m in meses],
+        })
+    return render(request, 'Gestion/galpon_dashboard.html', {'filas': filas, 'meses': meses})
+
+@login_required
+def galpon_historial(request, pk):
+    """Every month of a galpón (occupancy, bird-days, eggs, feed)"""
+    import json
+
+    galpon = get_object_or_404(Galpon, pk=pk)
+    ocupacion.actualizar([galpon])
+    resumenes = list(galpon.resumenes.order_by('-mes'))
+    cronologico = resumenes[::-1]
+    return render(request, 'Gestion/galpon_historial.html', {
+        'galpon': galpon,
+        'resumenes': resumenes,
+        'chart_labels': json.dumps([r.mes.strftime("%m/%Y") for r in cronologico]),
+        'chart_ocupacion': json.dumps([r.ocupacion for r in cronologico]),
+        'chart_puesta': json.dumps([r.tasa_puesta for r in cronologico]),
+    })
+
 @login_required
 def galpon_create(request):
     if request.method == 'POST':
@@ -284,19 +340,72 @@ def lote_create(request):
         form = LoteForm()
     return render(request, 'Gestion/lote_form.html', {'form': form, 'title': 'Nuevo Lote'})
 
+def _total_por_lote(model, total, output_field=None, **filters):
+    """Correlated subquery with an aggregate of `model` rows belonging to the outer Lote."""
+    subquery = model.objects.filter(lote=OuterRef('pk'), **filters).values('lote').annotate(t=total).values('t')
+    return Coalesce(Subquery(subquery, output_field=output_field), 0, output_field=output_field)
+
+# tab -> (model, select_related, fragment template)
+LOTE_TABS = {
+    'bajas': (RegistroBajas, [], 'Gestion/lote_tab_bajas.html'),
+    'movimientos': (MovimientoInterno, ['articulo'], 'Gestion/lote_tab_movimientos.html'),
+    'vacunaciones': (RegistroVacunacion, [], 'Gestion/lote_tab_vacunaciones.html'),
+}
+LOTE_TAB_PAGE_SIZE = 25
+
 @login_required
 def lote_detail(request, pk):
-    lote = get_object_or_404(Lote, pk=pk)
-    bajas = RegistroBajas.objects.filter(lote=lote).order_by('-fecha')
-    movimientos = MovimientoInterno.objects.filter(lote=lote).order_by('-fecha')
-    vacunaciones = RegistroVacunacion.objects.filter(lote=lote).order_by('-fecha')
+    """Header + summary in a single query; history tabs are loaded on demand by lote_historial"""
+    cantidad = MovimientoInterno._meta.get_field('cantidad')
+    lote = get_object_or_404(
+        Lote.objects.select_related('galpon').annotate(
+            total_bajas=_total_por_lote(RegistroBajas, Sum('cantidad'), models.IntegerField()),
+            total_produccion=_total_por_lote(MovimientoInterno, Sum('cantidad'), cantidad, tipo_movimiento=TipoMovimiento.PRODUCCION),
+            total_consumo=_total_por_lote(MovimientoInterno, Sum('cantidad'), cantidad, tipo_movimiento=TipoMovimiento.CONSUMO),
+            total_vacunaciones=_total_por_lote(RegistroVacunacion, Count('pk'), models.IntegerField()),
+        ),
+        pk=pk
+    )
     return render(request, 'Gestion/lote_detail.html', {
         'lote': lote,
-        'bajas': bajas,
-        'movimientos': movimientos,
-        'vacunaciones': vacunaciones
+        'tabs': LOTE_TABS.keys(),
+        'tiene_archivo': archivo.tiene_archivo(lote.pk),
+        'completo': request.GET.get('completo') == '1',
+        'costos': costos.resumen_lotes([lote])[lote.pk],
+        'cierre': None if lote.estado else CierreLote.objects.filter(lote=lote).first(),
+    })
+
+@login_required
+def lote_historial(request, pk, tab):
+    """HTML fragment (table rows) with one keyset page of a lote_detail tab"""
+    if tab not in LOTE_TABS:
+        raise Http404
+    model, related, template_name = LOTE_TABS[tab]
+    completo = request.GET.get('completo') == '1' and model in archivo.ARCHIVOS
+
+    if completo: # Archived detail instead of the daily summary rows
+        rows, next_cursor = archivo.pagina(model, request.GET.get('cursor'), LOTE_TAB_PAGE_SIZE, related, lote_id=pk)
+    else:
+        queryset = model.objects.filter(lote_id=pk).select_related(*related)
+        rows, next_cursor = keyset_paginate(queryset, request.GET.get('cursor'), LOTE_TAB_PAGE_SIZE)
+
+    return render(request, template_name, {
+        'rows': rows,
+        'next_cursor': next_cursor,
+        'lote_id': pk,
+        'tab': tab,
+        'completo': completo,
     })
 
+@login_required
+def lote_cierre_recalcular(request, pk):
+    """Rebuilds the frozen close-out summary of a closed lote (only on this explicit request)"""
+    lote = get_object_or_404(Lote, pk=pk, estado=False)
+    if request.method == 'POST':
+        cierres.recalcular(lote)
+        messages.success(request, 'Resumen de cierre recalculado.')
+    return redirect('lote-detail', pk=pk)
+
 @login_required
 def lote_update(request, pk):
     lote = get_object_or_404(Lote, pk=pk)
@@ -456,7 +565,35 @@ def entidad_update(request, pk):
 @login_required
 def entidad_detail(request, pk):
     entidad = get_object_or_404(Entidad, pk=pk)
-    return render(request, 'Gestion/entidad_detail.html', {'entidad': entidad, 'title': entidad.nombre_razon_social})
+    saldos.actualizar()
+    return render(request, 'Gestion/entidad_detail.html', {
+        'entidad': entidad,
+        'title': entidad.nombre_razon_social,
+        'saldos': entidad.saldos.exclude(saldo=0).order_by('tipo_operacion'),
+        'pendientes': entidad.cabeceratransaccion_set.filter(estado_pago=EstadoPago.PENDIENTE).order_by('fecha')[:20],
+    })
+
+@login_required
+def cuentas_saldos(request):
+    """Receivables (clientes) / payables (proveedores) with aging, straight from SaldoEntidad"""
+    lado = 'pagar' if request.GET.get('lado') == 'pagar' else 'cobrar'
+    filas, totales = saldos.saldos(TipoOperacion.COMPRA if lado == 'pagar' else TipoOperacion.VENTA)
+
+    entidad_query = request.GET.get('entidad', '')
+    if entidad_query:
+        filas = filas.filter(entidad__nombre_razon_social__icontains=entidad_query)
+
+    paginator = Paginator(filas, 25)
+    page_obj = paginator.get_page(request.GET.get('page'))
+
+    return render(request, 'Gestion/cuentas_saldos.html', {
+        'filas': page_obj,
+        'page_obj': page_obj,
+        'is_paginated': page_obj.has_other_pages(),
+        'paginator': paginator,
+        'totales': totales,
+        'lado': lado,
+    })
 
 @login_required
 def transaccion_list(request):
@@ -611,8 +748,13 @@ def transaccion_update(request, pk):
         form = CabeceraTransaccionForm(request.POST, instance=transaccion)
         formset = DetalleTransaccionFormSet(request.POST, instance=transaccion)
         if form.is_valid() and formset.is_valid():
-            form.save()
-            formset.save()
+            try:
+                with transaction.atomic():
+                    form.save()
+                    formset.save()
+            except ValidationError as e: # Details whose kardex is archived are frozen
+                messages.error(request, e.messages[0])
+                return redirect('transaccion-detail', pk=transaccion.pk)
             messages.success(request, 'Transacción actualizada.')
             return redirect('transaccion-detail', pk=transaccion.pk)
     else:
@@ -649,65 +791,14 @@ def transaccion_cambiar_estado(request, pk, nuevo_estado):
          return redirect('transaccion-detail', pk=pk)
 
     try:
-        from .models import EstadoPago, TipoOperacion
-        from .signals import create_log_entry
-        from decimal import Decimal
-
+        # Same set-based path as the bulk actions, for a one-element set
+        seleccion = CabeceraTransaccion.objects.filter(pk=pk)
         if nuevo_estado == 'ANULADO':
-            # REVERSE STOCK LOGIC
-            is_purchase = transaccion.tipo_operacion == TipoOperacion.COMPRA
-            
-            for detalle in transaccion.detalles.all():
-                articulo = detalle.articulo
-                cantidad = detalle.cantidad
-                # We need Decimal for calculations
-                cantidad_dec = Decimal(str(cantidad))
-
-                # CHECK RECIPE (Only for Sales typically, but check mostly for products)
-                # If it's a Sale of a Product with Recipe -> Restore Ingredients
-                # If it's a Purchase -> Just remove what was added (Ingredients or Products)
-                
-                # Logic from signals.py reversed:
-                receta = articulo.ingredientes_receta.all()
-                has_recipe = receta.exists()
-
-                if not is_purchase and has_recipe:
-                    # REVERSE RECIPE SALE: Add back ingredients
-                    for ing_receta in receta:
-                        ingrediente = ing_receta.ingrediente
-                        qty_per_unit = Decimal(str(ing_receta.cantidad))
-                        total_restore = cantidad_dec * qty_per_unit
-                        
-                        if ingrediente.controlar_stock:
-                            ingrediente.stock_actual += total_restore
-                            ingrediente.save()
-                            create_log_entry(
-                                ingrediente, 'AJUSTE', total_restore, 
-                                ingrediente.stock_actual - total_restore, ingrediente.stock_actual, 
-                                f"ANULACIÓN VENTA Pack: {articulo.nombre} (Doc: {transaccion.numero_documento})"
-                            )
-                else:
-                    # STANDARD ITEM (Purchase or Sale without recipe)
-                    if articulo.controlar_stock:
-                        old_stock = articulo.stock_actual
-                        if is_purchase:
-                            # Was added, so subtract
-                            articulo.stock_actual -= cantidad_dec
-                        else:
-                            # Was removed, so add
-                            articulo.stock_actual += cantidad_dec
-                        
-                        articulo.save()
-                        
-                        create_log_entry(
-                            articulo, 'AJUSTE', 
-                            -cantidad_dec if is_purchase else cantidad_dec,
-                            old_stock, articulo.stock_actual,
-                            f"ANULACIÓN {transaccion.get_tipo_operacion_display().upper()} #{transaccion.pk}"
-                        )
-
-        transaccion.estado_pago = nuevo_estado
-        transaccion.save()
+            transacciones.anular(seleccion)
+        elif nuevo_estado == 'PAGADO':
+            transacciones.pagar(seleccion)
+        else:
+            raise ValueError(f'estado desconocido {nuevo_estado}')
         messages.success(request, f'Estado actualizado a {nuevo_estado}. Stock ajustado correctamente.')
         
     except Exception as e:
@@ -715,6 +806,25 @@ def transaccion_cambiar_estado(request, pk, nuevo_estado):
 
     return redirect('transaccion-detail', pk=pk)
 
+@login_required
+def transaccion_bulk_estado(request):
+    """Pays or voids the transactions selected in transaccion_list, in one pass"""
+    if request.method != 'POST':
+        return redirect('transaccion-list')
+    ids = [pk for pk in request.POST.getlist('seleccion') if pk.isdigit()]
+    seleccion = CabeceraTransaccion.objects.filter(pk__in=ids)
+    accion = request.POST.get('accion')
+    if accion == 'PAGADO':
+        n = transacciones.pagar(seleccion)
+        messages.success(request, f'{n} transacciones pendientes marcadas como PAGADAS.')
+    elif accion == 'ANULADO':
+        n = transacciones.anular(seleccion)
+        messages.success(request, f'{n} transacciones ANULADAS. Stock ajustado correctamente.')
+    else:
+        messages.error(request, 'Acción no válida.')
+    filtros = request.POST.get('filtros')
+    return redirect(f"{reverse('transaccion-list')}?{filtros}" if filtros else 'transaccion-list')
+
 
 @login_required
 def transaccion_detail(request, pk):
@@ -741,6 +851,7 @@ def transaccion_simple_create(request):
     })
 
 @login_required
+@replica.usar_replica
 def auditoria_dashboard(request):
     """General Audit Dashboard: Finance Overview"""
     today = timezone.now().date()
@@ -782,118 +893,129 @@ def auditoria_dashboard(request):
     }
     return render(request, 'Gestion/auditoria_dashboard.html', context)
 
-@login_required
-def salud_dashboard(request):
-    """Health & Performance Dashboard"""
-    import json
-    
-    # Filter controls
+def _salud_filtros(request):
+    """(active lotes for the selector, selected lote or None, lotes to chart, days, start, end)"""
     periodo_dias = int(request.GET.get('dias', 30))
-    lote_id = request.GET.get('lote')
-    
     end_date = timezone.now().date()
     start_date = end_date - timezone.timedelta(days=periodo_dias)
-    
-    # Get active lotes (or specific one)
-    lotes_qs = Lote.objects.filter(estado=True)
+
+    lotes_qs = Lote.objects.filter(estado=True).select_related('galpon')
+    lote_id = request.GET.get('lote')
     if lote_id:
-        selected_lote = get_object_or_404(Lote, pk=lote_id)
-        # Keep queryset for dropdown, but filtering logic changes
+        selected_lote = get_object_or_404(Lote.objects.select_related('galpon'), pk=lote_id)
         target_lotes = [selected_lote]
     else:
         selected_lote = None
         target_lotes = list(lotes_qs)
-        
-    # Prepare Data Structures
-    dates = [start_date + timezone.timedelta(days=x) for x in range((end_date - start_date).days + 1)]
-    chart_labels = [d.strftime("%d/%m") for d in dates]
-    
-    datasets_puesta = []
-    datasets_consumo = []
-    datasets_mortalidad = []
-    datasets_fcr = [] # Feed Conversion Ratio proxy
-    
-    colores = [
-        'rgba(255, 99, 132, 1)',
-        'rgba(54, 162, 235, 1)',
-        'rgba(255, 206, 86, 1)',
-        'rgba(75, 192, 192, 1)',
-        'rgba(153, 102, 255, 1)',
-        'rgba(255, 159, 64, 1)'
-    ]
-    
-    for idx, lote in enumerate(target_lotes):
-        data_puesta = []
-        data_consumo = []
-        data_mortalidad = []
-        data_fcr = []
-        
-        # Pre-fetch all relevant data to minimize queries in loop
-        movs = MovimientoInterno.objects.filter(lote=lote, fecha__date__range=[start_date, end_date])
-        bajas = RegistroBajas.objects.filter(lote=lote, fecha__date__lte=end_date) 
-        
-        current_color = colores[idx % len(colores)]
-        
-        for d in dates:
-            # 1. Birds Alive Calculation
-            bajas_acum = bajas.filter(fecha__date__lte=d).aggregate(total=Sum('cantidad'))['total'] or 0
-            aves_vivas = lote.aves_iniciales - bajas_acum
-            if aves_vivas <= 0: aves_vivas = 1 
-                
-            # 2. Daily Production & Consumption
-            daily_prod = movs.filter(fecha__date=d, tipo_movimiento=TipoMovimiento.PRODUCCION).aggregate(t=Sum('cantidad'))['t'] or 0
-            daily_cons = movs.filter(fecha__date=d, tipo_movimiento=TipoMovimiento.CONSUMO).aggregate(t=Sum('cantidad'))['t'] or 0
-            daily_fallecidos = bajas.filter(fecha__date=d).aggregate(t=Sum('cantidad'))['t'] or 0
-            
-            # 3. Metrics
-            tasa_puesta = float(daily_prod / aves_vivas) * 100
-            consumo_ave = float(daily_cons / aves_vivas) * 1000 
-            
-            # Efficiency: Grams of feed per egg
-            if daily_prod > 0:
-                g_per_egg = (float(daily_cons) * 1000) / float(daily_prod)
-            else:
-                g_per_egg = 0
-            
-            data_puesta.append(round(tasa_puesta, 1))
-            data_consumo.append(round(consumo_ave, 1))
-            data_mortalidad.append(int(daily_fallecidos))
-            data_fcr.append(round(g_per_egg, 1))
-
-        datasets_puesta.append({
-            'label': f"{lote.galpon.nombre} ({lote.raza})",
-            'data': data_puesta,
-            'borderColor': current_color,
-            'tension': 0.3,
-            'fill': False
-        })
-        
-        datasets_consumo.append({
-            'label': f"{lote.galpon.nombre}",
-            'data': data_consumo,
-            'borderColor': current_color,
-            'borderDash': [5, 5],
-            'tension': 0.3,
-            'fill': False
-        })
-        
-        datasets_fcr.append({
-            'label': f"Eficiencia {lote.galpon.nombre}",
-            'data': data_fcr,
-            'borderColor': current_color,
-            'backgroundColor': current_color.replace('1)', '0.1)'), # Transparent fill
-            'tension': 0.4, # Smooth curves
-            'fill': True # Area chart
-        })
+    return lotes_qs, selected_lote, target_lotes, periodo_dias, start_date, end_date
 
-    context = {
+@login_required
+@replica.usar_replica
+def salud_dashboard(request):
+    """Health & Performance Dashboard (the charts fetch their data from salud_datos)"""
+    lotes_qs, selected_lote, _, periodo_dias, _, _ = _salud_filtros(request)
+    return render(request, 'Gestion/salud_dashboard.html', {
         'lotes': lotes_qs,
         'selected_lote': selected_lote,
         'periodo': periodo_dias,
-        'chart_labels': json.dumps(chart_labels),
-        'datasets_puesta': json.dumps(datasets_puesta),
-        'datasets_consumo': json.dumps(datasets_consumo),
-        'datasets_fcr': json.dumps(datasets_fcr),
-    }
+    })
+
+@login_required
+@replica.usar_replica
+def salud_datos(request):
+    """Chart series of salud_dashboard, downsampled to ?puntos (the chart width) in compact columnar JSON"""
+    _, _, target_lotes, _, start_date, end_date = _salud_filtros(request)
+    try:
+        puntos = int(request.GET.get('puntos', graficos.PUNTOS_DEFECTO))
+    except ValueError:
+        puntos = graficos.PUNTOS_DEFECTO
+    return JsonResponse(graficos.salud(target_lotes, start_date, end_date, puntos), json_dumps_params={'separators': (',', ':')})
+
+@login_required
+def planificacion_alimento(request):
+    """Projected feed demand (2-6 weeks) across active lotes, from the nightly forecast"""
+    plan = pronostico.planificacion()
+    return render(request, 'Gestion/planificacion_alimento.html', {
+        'plan': plan,
+        'semanas': range(1, pronostico.SEMANAS + 1),
+    })
 
-    return render(request, 'Gestion/salud_dashboard.html', context)
+@login_required
+def curvas_puesta(request):
+    """Laying/feed/mortality curves by week of life: one lote vs its raza and the breed standard"""
+    import json
+
+    metrica = request.GET.get('metrica', 'puesta')
+    if metrica not in curvas.METRICAS:
+        metrica = 'puesta'
+    lotes = curvas.resumen_lotes()
+
+    lote_id = request.GET.get('lote')
+    if lote_id is None and lotes:
+        lote_id = lotes[-1]['id'] # Most recently placed
+    try:
+        lote_id = int(lote_id) if lote_id else None
+    except ValueError:
+        raise Http404("Lote no encontrado")
+    comparacion = curvas.comparar(lote_id, metrica) if lote_id else None
+    if lote_id and comparacion is None:
+        raise Http404("Lote no encontrado")
+
+    context = {
+        'lotes': lotes,
+        'metrica': metrica,
+        'metricas': curvas.METRICAS,
+        'metrica_label': curvas.METRICAS[metrica],
+        'comparacion': comparacion,
+    }
+    if comparacion:
+        context['chart_labels'] = json.dumps([f"S{s}" for s in range(1, comparacion['semanas'] + 1)])
+        context['chart_datasets'] = json.dumps([
+            {'label': f"Lote {comparacion['lote']['id']} - {comparacion['lote']['galpon']}", 'data': comparacion['lote_curva'],
+             'borderColor': 'rgba(54, 162, 235, 1)', 'tension': 0.3, 'fill': False},
+            {'label': f"Promedio {comparacion['lote']['raza']} ({comparacion['raza_lotes']} lotes)", 'data': comparacion['raza_curva'],
+             'borderColor': 'rgba(255, 159, 64, 1)', 'borderDash': [5, 5], 'tension': 0.3, 'fill': False},
+            {'label': "Estándar de la raza", 'data': comparacion['estandar'],
+             'borderColor': 'rgba(75, 192, 192, 1)', 'borderDash': [2, 2], 'tension': 0.3, 'fill': False, 'spanGaps': True},
+        ])
+    return render(request, 'Gestion/curvas_puesta.html', context)
+
+@login_required
+@replica.usar_replica
+def costos_lotes(request):
+    """Cost per egg/dozen and margin against sales prices for every lote"""
+    estado = request.GET.get('estado', 'activos')
+    lotes = Lote.objects.select_related('galpon').order_by('-estado', 'galpon__nombre', '-fecha_inicio')
+    if estado == 'activos':
+        lotes = lotes.filter(estado=True)
+    elif estado == 'cerrados':
+        lotes = lotes.filter(estado=False)
+    lotes = list(lotes)
+    resumen = costos.resumen_lotes(lotes)
+    filas = [{'lote': lote, **resumen[lote.pk]} for lote in lotes]
+    return render(request, 'Gestion/costos_lotes.html', {'filas': filas, 'estado': estado})
+
+@login_required
+@replica.usar_replica
+def lotes_cerrados(request):
+    """Closed lotes side by side, read only from their frozen close-out summaries"""
+    cierres_qs = CierreLote.objects.select_related('lote__galpon').order_by('-fecha_cierre', '-lote_id')
+    raza = request.GET.get('raza')
+    if raza:
+        cierres_qs = cierres_qs.filter(lote__raza=raza)
+    lista = list(cierres_qs)
+
+    def promedio(campo):
+        valores = [getattr(c, campo) for c in lista if getattr(c, campo) is not None]
+        return sum(valores) / len(valores) if valores else None
+
+    return render(request, 'Gestion/lotes_cerrados.html', {
+        'filas': [{'cierre': c, 'bajas': [c.bajas_motivo.get(m, 0) for m in MotivoBaja.values]} for c in lista],
+        'motivos': MotivoBaja.labels,
+        'promedio': {
+            campo: promedio(campo)
+            for campo in ('dias', 'huevos', 'alimento', 'mortalidad', 'puesta_pico', 'gramos_huevo', 'costo_huevo', 'margen')
+        },
+        'razas': CierreLote.objects.order_by('lote__raza').values_list('lote__raza', flat=True).distinct(),
+        'raza': raza,
+    })
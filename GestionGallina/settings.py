@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -48,10 +49,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'Gestion.middleware.StaticPrecomprimidoMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'Kiosco.middleware.DispositivoKioscoMiddleware',
+    'Gestion.middleware.GranjaMiddleware',
+    'Gestion.middleware.PerfilMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -83,8 +88,42 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    # Read-only copy for the reporting views, refreshed by `manage.py refresh_replica`
+    # (see Gestion/replica.py). Tests read everything from the primary.
+    'reportes': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('GESTION_REPLICA_PATH', str(BASE_DIR / 'db_reportes.sqlite3')),
+        'OPTIONS': {'init_command': 'PRAGMA query_only = ON;'},
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+if os.getenv('GESTION_REPLICA_HOST'): # PostgreSQL primary: use a hot standby instead
+    DATABASES['reportes'] = {
+        **DATABASES['default'],
+        'HOST': os.getenv('GESTION_REPLICA_HOST'),
+        'PORT': os.getenv('GESTION_REPLICA_PORT', ''),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['Gestion.routers.ReplicaRouter']
+
+
+# Cache shared by every worker process of the machine (SQLite file, LRU-bounded).
+# The test runner gets a private locmem cache so runs never see each other's data.
+CACHES = {
+    'default': {
+        'BACKEND': 'Gestion.cache_sqlite.SQLiteCache',
+        'LOCATION': os.getenv('GESTION_CACHE_PATH', str(BASE_DIR / 'cache.sqlite3')),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('GESTION_CACHE_MAX_ENTRIES', '20000')),
+            'MAX_BYTES': int(os.getenv('GESTION_CACHE_MAX_MB', '64')) * 1024 * 1024,
+            'CULL_FREQUENCY': 4,
+        },
     }
 }
+if 'test' in sys.argv[1:2]:
+    CACHES['default'] = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
 
 
 # Password validation
@@ -133,7 +172,22 @@ FORMAT_MODULE_PATH = [
 
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+# Fingerprinted names + .gz/.br written at collectstatic (see Gestion/estaticos.py)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'Gestion.estaticos.ComprimidoManifestStorage'},
+}
+
 # Authentication
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = 'login'
+
+# Kiosk writes leave kardex/population posting to the outbox worker. Off by default:
+# enable it only where `python manage.py process_outbox --loop` is running, otherwise
+# kiosk stock and population changes wait in the outbox and never post.
+GESTION_OUTBOX_KIOSCO = os.getenv('GESTION_OUTBOX_KIOSCO', 'False') == 'True'
+
+# Seconds each process keeps template fragment hit/miss counts in memory before adding
+# them to the shared cache (see Gestion/fragmentos.py).
+GESTION_FRAGMENTOS_STATS_SEGUNDOS = int(os.getenv('GESTION_FRAGMENTOS_STATS_SEGUNDOS', '60'))
@@ -1,3 +1,29 @@
 from django.contrib import admin
+from django.urls import reverse
 
-# Register your models here.
+from .models import DispositivoKiosco
+from . import dispositivos
+
+
+class DispositivoKioscoAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'usuario', 'activo', 'enrolado', 'ultimo_uso', 'revocado')
+    list_filter = ('activo',)
+    readonly_fields = ('creado', 'enrolado', 'codigo_vence', 'ultimo_uso', 'revocado')
+    actions = ['generar_codigo', 'revocar']
+
+    @admin.action(description='Generar código de enrolamiento')
+    def generar_codigo(self, request, queryset):
+        for dispositivo in queryset.filter(activo=True):
+            codigo = dispositivos.generar_codigo(dispositivo)
+            enlace = request.build_absolute_uri(reverse('kiosco-enrolar', args=[codigo]))
+            self.message_user(request, f"{dispositivo.nombre}: abrir {enlace} en la tablet (vence en 24 h).")
+
+    @admin.action(description='Revocar dispositivos seleccionados')
+    def revocar(self, request, queryset):
+        n = 0
+        for dispositivo in queryset.filter(activo=True):
+            dispositivos.revocar(dispositivo)
+            n += 1
+        self.message_user(request, f"{n} dispositivos revocados.")
+
+admin.site.register(DispositivoKiosco, DispositivoKioscoAdmin)
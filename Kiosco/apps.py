@@ -2,4 +2,8 @@ from django.apps import AppConfig
 
 
 class KioscoConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
     name = 'Kiosco'
+
+    def ready(self):
+        import Kiosco.signals
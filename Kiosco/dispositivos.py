@@ -0,0 +1,128 @@
+"""
+Device tokens for kiosk tablets.
+
+An admin generates a one-time enrolment code for a DispositivoKiosco; opening
+/kiosco/enrolar/<code>/ on the tablet issues a random token and stores it in a signed
+cookie ("<id>:<token>"). On Kiosco URLs, middleware.DispositivoKioscoMiddleware turns
+that cookie into request.user:
+
+- the signature is checked first, so forged cookies never reach the cache or the DB;
+- the device row (token hash, browser fingerprint, user) is cached, so an enrolled
+  tablet costs no session or auth_user query per tap;
+- revoking or editing the device (or its user) drops the cached row on commit, so
+  the next request is already rejected.
+
+The token is bound to the tablet's browser (User-Agent hash at enrolment): a copied
+cookie does not work from another browser. A browser update means enrolling again.
+"""
+import hashlib
+import secrets
+from datetime import timedelta
+from hmac import compare_digest
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DispositivoKiosco
+
+COOKIE = 'kiosco_dispositivo'
+SALT = 'Kiosco.dispositivos'
+COOKIE_MAX_AGE = 60 * 60 * 24 * 365
+CODIGO_VIGENCIA = timedelta(hours=24)
+CACHE_TIMEOUT = 60 * 5
+USO_RESOLUCION = 60 * 15 # ultimo_uso is written at most this often per device
+
+
+def _hash(valor):
+    return hashlib.sha256(valor.encode()).hexdigest()
+
+
+def huella(request):
+    return _hash(request.headers.get('User-Agent', ''))
+
+
+def _clave(pk):
+    return f'kiosco:dispositivo:{pk}'
+
+
+def generar_codigo(dispositivo):
+    """New one-time enrolment code for the device (replaces any previous one). Returns it in clear."""
+    codigo = secrets.token_urlsafe(12)
+    dispositivo.codigo_hash = _hash(codigo)
+    dispositivo.codigo_vence = timezone.now() + CODIGO_VIGENCIA
+    dispositivo.save(update_fields=['codigo_hash', 'codigo_vence'])
+    return codigo
+
+
+@transaction.atomic
+def enrolar(request, codigo):
+    """
+    Consumes an enrolment code and issues a fresh token bound to this browser.
+    Returns (dispositivo, cookie value), or None if the code is unknown or expired.
+    """
+    dispositivo = DispositivoKiosco.objects.select_for_update().filter(
+        codigo_hash=_hash(codigo), codigo_vence__gt=timezone.now(), activo=True
+    ).first()
+    if dispositivo is None:
+        return None
+    token = secrets.token_urlsafe(32)
+    dispositivo.token_hash = _hash(token)
+    dispositivo.huella = huella(request)
+    dispositivo.enrolado = timezone.now()
+    dispositivo.codigo_hash, dispositivo.codigo_vence = '', None
+    dispositivo.save()
+    return dispositivo, f"{dispositivo.pk}:{token}"
+
+
+def emitir_cookie(response, valor):
+    response.set_signed_cookie(
+        COOKIE, valor, salt=SALT, max_age=COOKIE_MAX_AGE,
+        httponly=True, samesite='Lax', secure=settings.SESSION_COOKIE_SECURE,
+    )
+
+
+def revocar(dispositivo):
+    """Disables the device and forgets its token; the tablet has to be enrolled again."""
+    dispositivo.activo = False
+    dispositivo.revocado = timezone.now()
+    dispositivo.token_hash = ''
+    dispositivo.codigo_hash, dispositivo.codigo_vence = '', None
+    dispositivo.save()
+
+
+def invalidar(*pks):
+    """Drops the cached device rows once the transaction commits."""
+    claves = [_clave(pk) for pk in pks]
+    transaction.on_commit(lambda: cache.delete_many(claves))
+
+
+def _registro(pk):
+    """Cached {'token_hash', 'huella', 'usuario'} of an active device, or False."""
+    registro = cache.get(_clave(pk))
+    if registro is None:
+        dispositivo = DispositivoKiosco.objects.select_related('usuario').filter(
+            pk=pk, activo=True, usuario__is_active=True
+        ).exclude(token_hash='').first()
+        registro = False
+        if dispositivo is not None:
+            registro = {'token_hash': dispositivo.token_hash, 'huella': dispositivo.huella, 'usuario': dispositivo.usuario}
+        cache.set(_clave(pk), registro, CACHE_TIMEOUT)
+    return registro
+
+
+def autenticar(request):
+    """(usuario, device id) for a valid device cookie on this request, or None."""
+    valor = request.get_signed_cookie(COOKIE, default=None, salt=SALT, max_age=COOKIE_MAX_AGE)
+    if not valor:
+        return None
+    pk, _, token = valor.partition(':')
+    if not pk.isdigit():
+        return None
+    registro = _registro(int(pk))
+    if not registro or not compare_digest(registro['token_hash'], _hash(token)) or registro['huella'] != huella(request):
+        return None
+    if cache.add(f'kiosco:uso:{pk}', 1, USO_RESOLUCION):
+        DispositivoKiosco.objects.filter(pk=pk).update(ultimo_uso=timezone.now())
+    return registro['usuario'], int(pk)
@@ -0,0 +1,34 @@
+from django.urls import reverse
+
+from . import dispositivos
+
+
+class DispositivoKioscoMiddleware:
+    """
+    Authenticates enrolled kiosk tablets by their device cookie (see Kiosco.dispositivos).
+    Only on Kiosco URLs: anywhere else the cookie is ignored and the normal session login
+    applies. Goes after AuthenticationMiddleware, whose lazy request.user it replaces
+    before anything reads the session.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.dispositivo_kiosco = None
+        if dispositivos.COOKIE not in request.COOKIES or not request.path.startswith(reverse('kiosco-index')):
+            return self.get_response(request)
+
+        autenticado = dispositivos.autenticar(request)
+        if autenticado is None:
+            respuesta = self.get_response(request)
+            if not respuesta.cookies.get(dispositivos.COOKIE): # Revoked / forged: stop sending it
+                respuesta.delete_cookie(dispositivos.COOKIE, samesite='Lax')
+            return respuesta
+
+        usuario, request.dispositivo_kiosco = autenticado
+        request.user = usuario
+
+        async def auser():
+            return usuario
+        request.auser = auser
+        return self.get_response(request)
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-19 14:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DispositivoKiosco',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(help_text='Ej: Tablet Galpon 1', max_length=100, unique=True)),
+                ('activo', models.BooleanField(default=True)),
+                ('token_hash', models.CharField(blank=True, default='', editable=False, max_length=64)),
+                ('huella', models.CharField(blank=True, default='', editable=False, help_text='Navegador de la tablet al enrolar', max_length=64)),
+                ('codigo_hash', models.CharField(blank=True, default='', editable=False, max_length=64)),
+                ('codigo_vence', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('enrolado', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('revocado', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('ultimo_uso', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('usuario', models.ForeignKey(help_text='Usuario con el que se registran las cargas hechas desde la tablet', on_delete=django.db.models.deletion.PROTECT, related_name='dispositivos_kiosco', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Dispositivo de kiosco',
+                'verbose_name_plural': 'Dispositivos de kiosco',
+            },
+        ),
+    ]
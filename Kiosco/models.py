@@ -1,3 +1,31 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class DispositivoKiosco(models.Model):
+    """
+    Tablet enrolled to use the kiosk without logging in. It authenticates with a signed
+    cookie (see Kiosco.dispositivos) that only opens the Kiosco URLs, acting as `usuario`.
+    Only hashes of the token and of the enrolment code are stored.
+    """
+    nombre = models.CharField(max_length=100, unique=True, help_text="Ej: Tablet Galpon 1")
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name='dispositivos_kiosco',
+        help_text="Usuario con el que se registran las cargas hechas desde la tablet"
+    )
+    activo = models.BooleanField(default=True)
+    token_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+    huella = models.CharField(max_length=64, blank=True, default='', editable=False, help_text="Navegador de la tablet al enrolar")
+    codigo_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+    codigo_vence = models.DateTimeField(null=True, blank=True, editable=False)
+    creado = models.DateTimeField(auto_now_add=True)
+    enrolado = models.DateTimeField(null=True, blank=True, editable=False)
+    revocado = models.DateTimeField(null=True, blank=True, editable=False)
+    ultimo_uso = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        verbose_name = "Dispositivo de kiosco"
+        verbose_name_plural = "Dispositivos de kiosco"
+
+    def __str__(self):
+        return self.nombre
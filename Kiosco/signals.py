@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import DispositivoKiosco
+from . import dispositivos
+
+# --- DEVICE TOKEN CACHE ---
+
+@receiver(post_save, sender=DispositivoKiosco)
+@receiver(post_delete, sender=DispositivoKiosco)
+def invalidate_device(sender, instance, **kwargs):
+    dispositivos.invalidar(instance.pk)
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_devices(sender, instance, created, update_fields=None, **kwargs):
+    """The cached device row embeds its user (is_active, permissions)"""
+    if not created and update_fields != frozenset({'last_login'}):
+        pks = list(DispositivoKiosco.objects.filter(usuario=instance).values_list('pk', flat=True))
+        if pks:
+            dispositivos.invalidar(*pks)
@@ -1,3 +1,67 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from Kiosco import dispositivos
+from Kiosco.models import DispositivoKiosco
+
+UA = 'Mozilla/5.0 (Linux; Android 13; Tablet Galpon)'
+
+
+class DispositivoKioscoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user('galponero', password='x')
+        self.dispositivo = DispositivoKiosco.objects.create(nombre='Tablet 1', usuario=self.usuario)
+
+    def enrolar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            codigo = dispositivos.generar_codigo(self.dispositivo)
+            response = self.client.get(reverse('kiosco-enrolar', args=[codigo]), HTTP_USER_AGENT=UA)
+        self.assertRedirects(response, reverse('kiosco-index'), fetch_redirect_response=False)
+        self.assertIn(dispositivos.COOKIE, response.cookies)
+        return codigo
+
+    def test_enrolled_tablet_uses_kiosk_without_session_or_user_queries(self):
+        codigo = self.enrolar()
+        # One-time code
+        self.assertEqual(self.client.get(reverse('kiosco-enrolar', args=[codigo]), HTTP_USER_AGENT=UA).status_code, 404)
+
+        self.client.get(reverse('kiosco-index'), HTTP_USER_AGENT=UA) # Warms the device cache
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('kiosco-index'), HTTP_USER_AGENT=UA)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.user, self.usuario)
+        sql = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('django_session', sql)
+        self.assertNotIn('auth_user', sql)
+        self.assertNotIn('kiosco_dispositivokiosco', sql.lower())
+
+        self.dispositivo.refresh_from_db()
+        self.assertIsNotNone(self.dispositivo.ultimo_uso)
+
+    def test_token_only_opens_kiosk_urls_from_the_enrolled_browser(self):
+        self.enrolar()
+        response = self.client.get(reverse('index'), HTTP_USER_AGENT=UA)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('login'), response['Location'])
+
+        response = self.client.get(reverse('kiosco-index'), HTTP_USER_AGENT='Otro navegador')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('login'), response['Location'])
+
+    def test_revoked_device_is_rejected_immediately(self):
+        self.enrolar()
+        self.assertEqual(self.client.get(reverse('kiosco-index'), HTTP_USER_AGENT=UA).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            dispositivos.revocar(self.dispositivo)
+        response = self.client.get(reverse('kiosco-index'), HTTP_USER_AGENT=UA)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.cookies[dispositivos.COOKIE].value, '')
+
+        # A revoked device cannot be enrolled again with an old or new code
+        self.assertEqual(self.client.get(reverse('kiosco-enrolar', args=['x']), HTTP_USER_AGENT=UA).status_code, 404)
@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path('', views.index, name='kiosco-index'),
+    path('enrolar/<str:codigo>/', views.enrolar, name='kiosco-enrolar'),
     path('lote/<int:lote_id>/', views.menu_acciones, name='kiosco-menu'),
     path('lote/<int:lote_id>/consumo/', views.registrar_consumo, name='kiosco-consumo'),
     path('lote/<int:lote_id>/produccion/', views.registrar_produccion, name='kiosco-produccion'),
@@ -1,10 +1,25 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404
 from django.contrib import messages
+from django.db import transaction
 from django.utils import timezone
+from Gestion import outbox
 from Gestion.models import Lote, Articulo, MovimientoInterno, TipoMovimiento, TipoArticulo, RegistroBajas
 
 from django.db.models import Sum
 from django.contrib.auth.decorators import login_required
+from . import dispositivos
+
+def enrolar(request, codigo):
+    """Enrols this tablet with a one-time code generated from the admin (no login needed)"""
+    resultado = dispositivos.enrolar(request, codigo)
+    if resultado is None:
+        raise Http404("Código de enrolamiento inválido o vencido")
+    dispositivo, valor = resultado
+    messages.success(request, f"Tablet enrolada como {dispositivo.nombre}")
+    response = redirect('kiosco-index')
+    dispositivos.emitir_cookie(response, valor)
+    return response
 
 @login_required
 def index(request):
@@ -62,13 +77,15 @@ def registrar_consumo(request, lote_id):
         if articulo_id and cantidad:
             try:
                 articulo = Articulo.objects.get(pk=articulo_id)
-                mov = MovimientoInterno.objects.create(
-                    lote=lote,
-                    articulo=articulo,
-                    tipo_movimiento=TipoMovimiento.CONSUMO,
-                    cantidad=cantidad,
-                    fecha=timezone.now()
-                )
+                # Kardex posting is left to the outbox worker (process_outbox)
+                with transaction.atomic(), outbox.diferir():
+                    mov = MovimientoInterno.objects.create(
+                        lote=lote,
+                        articulo=articulo,
+                        tipo_movimiento=TipoMovimiento.CONSUMO,
+                        cantidad=cantidad,
+                        fecha=timezone.now()
+                    )
                 print(f"DEBUG: Created {mov} with amount {mov.cantidad}")
                 messages.success(request, f'Consumo registrado: {cantidad} {articulo.unidad_medida} de {articulo.nombre}')
                 return redirect('kiosco-menu', lote_id=lote.id_lote)
@@ -101,13 +118,14 @@ def registrar_produccion(request, lote_id):
         if articulo_id and cantidad:
             try:
                 articulo = Articulo.objects.get(pk=articulo_id)
-                MovimientoInterno.objects.create(
-                    lote=lote,
-                    articulo=articulo,
-                    tipo_movimiento=TipoMovimiento.PRODUCCION,
-                    cantidad=cantidad,
-                    fecha=timezone.now()
-                )
+                with transaction.atomic(), outbox.diferir():
+                    MovimientoInterno.objects.create(
+                        lote=lote,
+                        articulo=articulo,
+                        tipo_movimiento=TipoMovimiento.PRODUCCION,
+                        cantidad=cantidad,
+                        fecha=timezone.now()
+                    )
                 messages.success(request, f'Producción registrada: {cantidad} {articulo.unidad_medida} de {articulo.nombre}')
                 return redirect('kiosco-menu', lote_id=lote.id_lote)
             except Exception as e:
@@ -135,12 +153,13 @@ def registrar_bajas(request, lote_id):
         
         if cantidad and motivo:
             try:
-                RegistroBajas.objects.create(
-                    lote=lote,
-                    cantidad=cantidad,
-                    motivo=motivo,
-                    fecha=timezone.now()
-                )
+                with transaction.atomic(), outbox.diferir():
+                    RegistroBajas.objects.create(
+                        lote=lote,
+                        cantidad=cantidad,
+                        motivo=motivo,
+                        fecha=timezone.now()
+                    )
                 messages.error(request, f'Baja registrada: {cantidad} aves por {motivo}') # Using error as it is a negative event, or success? Stick to success for UI feedback.
                 # Actually, stick to success messages for successful actions.
                 messages.success(request, f'Baja registrada: {cantidad} aves.')
@@ -170,7 +189,8 @@ def movimiento_edit(request, pk):
         # Allow article change? Maybe only for production/consumption mismatch. For now just quantity.
         if cantidad:
             movimiento.cantidad = cantidad
-            movimiento.save()
+            with transaction.atomic(), outbox.diferir():
+                movimiento.save()
             messages.success(request, 'Registro actualizado.')
             return redirect('kiosco-menu', lote_id=lote.id_lote)
     
@@ -188,7 +208,8 @@ def baja_edit(request, pk):
         if cantidad and motivo:
             baja.cantidad = cantidad
             baja.motivo = motivo
-            baja.save()
+            with transaction.atomic(), outbox.diferir():
+                baja.save()
             messages.success(request, 'Baja actualizada.')
             return redirect('kiosco-menu', lote_id=lote.id_lote)
             